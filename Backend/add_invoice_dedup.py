@@ -0,0 +1,88 @@
+"""
+Migration script to add content-hash and near-duplicate detection to uploaded_invoices
+Also backfills hashes for existing files and flags the byte-identical copies
+"""
+import hashlib
+import os
+
+from sqlalchemy import create_engine, text
+from app.config.database import DATABASE_URL
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def migrate_add_invoice_dedup():
+    """Add content_sha256/duplicate_of_id columns and the duplicate lookup indexes"""
+    engine = create_engine(DATABASE_URL)
+    
+    with engine.connect() as connection:
+        existing = {
+            row[0] for row in connection.execute(text("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name = 'uploaded_invoices'
+                AND column_name IN ('content_sha256', 'duplicate_of_id')
+            """))
+        }
+        
+        if 'content_sha256' not in existing:
+            connection.execute(text("ALTER TABLE uploaded_invoices ADD COLUMN content_sha256 VARCHAR(64)"))
+            print("✓ Added content_sha256 column")
+        if 'duplicate_of_id' not in existing:
+            connection.execute(text(
+                "ALTER TABLE uploaded_invoices ADD COLUMN duplicate_of_id INTEGER REFERENCES uploaded_invoices(id)"
+            ))
+            print("✓ Added duplicate_of_id column")
+        
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_uploaded_invoices_content_sha256 ON uploaded_invoices (content_sha256)"
+        ))
+        connection.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_uploaded_invoices_near_duplicate
+            ON uploaded_invoices (vendor_gstin, invoice_number, total_amount, invoice_date)
+        """))
+        connection.commit()
+        print("✓ Duplicate lookup indexes are present")
+        
+        # Backfill hashes; the earliest invoice for each hash stays the original
+        rows = connection.execute(text("""
+            SELECT id, file_path FROM uploaded_invoices
+            WHERE content_sha256 IS NULL
+            ORDER BY id
+        """)).fetchall()
+        
+        hashed = 0
+        for invoice_id, file_path in rows:
+            if not file_path or not os.path.exists(file_path):
+                continue
+            connection.execute(
+                text("UPDATE uploaded_invoices SET content_sha256 = :sha WHERE id = :id"),
+                {"sha": _file_sha256(file_path), "id": invoice_id}
+            )
+            hashed += 1
+        
+        flagged = connection.execute(text("""
+            UPDATE uploaded_invoices AS dup
+            SET is_duplicate = TRUE, duplicate_of_id = orig.first_id
+            FROM (
+                SELECT content_sha256, MIN(id) AS first_id
+                FROM uploaded_invoices
+                WHERE content_sha256 IS NOT NULL
+                GROUP BY content_sha256
+            ) AS orig
+            WHERE dup.content_sha256 = orig.content_sha256
+            AND dup.id <> orig.first_id
+            AND dup.duplicate_of_id IS NULL
+        """)).rowcount
+        connection.commit()
+        
+        print(f"✓ Hashed {hashed} existing invoice files, flagged {flagged} duplicates")
+
+if __name__ == "__main__":
+    print("Starting migration to add invoice duplicate detection...")
+    migrate_add_invoice_dedup()
+    print("Migration completed!")
@@ -0,0 +1,23 @@
+"""
+Migration script to add the keyset-pagination index to the promotions table
+"""
+from sqlalchemy import create_engine, text
+from app.config.database import DATABASE_URL
+
+def migrate_add_promotion_indexes():
+    """Add (project_id, id) index used by the paginated promotion listings"""
+    engine = create_engine(DATABASE_URL)
+    
+    with engine.connect() as connection:
+        connection.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_promotions_project_id_id
+            ON promotions (project_id, id)
+        """))
+        connection.commit()
+        
+        print("✓ ix_promotions_project_id_id index is present on promotions table")
+
+if __name__ == "__main__":
+    print("Starting migration to add promotion listing indexes...")
+    migrate_add_promotion_indexes()
+    print("Migration completed!")
@@ -1,17 +1,31 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
-from fastapi.responses import FileResponse
-from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import Dict, Any, List, Optional, Tuple
+from pathlib import PurePosixPath
+from datetime import datetime
 import logging
+import os
+import uuid
+import zipfile
 
+from sqlalchemy import and_, case, func
 from sqlalchemy.orm import Session
 from app.config.database import get_db
 from app.models import (
     InvoiceInput, InvoiceResponse, ErrorResponse,
     UploadedInvoice, InvoiceApprovalSettings,
-    InvoiceComment, InvoiceApprovalHistory
+    InvoiceComment, InvoiceApprovalHistory, CurrencyRate
 )
 from app.services.invoice_service import InvoiceService
-from app.services.invoice_processing_service import InvoiceProcessingService
+from app.services.invoice_processing_service import (
+    InvoiceProcessingService, MIME_TYPE_MAP, get_invoice_processing_service
+)
+from app.services.invoice_worker import invoice_worker
+from app.services.invoice_storage import invoice_storage, resolve_local_path
+from app.services.approval_policy_service import approval_policy_cache, currency_rates
+from app.services.invoice_analytics_service import GROUP_BY_FIELDS, spend_rollup, get_project_summary
+from app.utils.thumbnail_cache import ThumbnailCache
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
 # Set up logging
@@ -58,7 +72,7 @@ async def generate_invoice(data: InvoiceInput) -> InvoiceResponse:
             message="Invoice generated successfully",
             invoice_id=calculation.invoice_id,
             filename=filename,
-            download_url=f"/api/v1/invoice/download/{filename}"
+            download_url=f"/api/invoice/download/{filename}"
         )
         
     except Exception as e:
@@ -69,6 +83,53 @@ async def generate_invoice(data: InvoiceInput) -> InvoiceResponse:
         )
 
 
+class BatchInvoiceRequest(BaseModel):
+    """Request model for batch actor invoice generation"""
+    invoices: List[InvoiceInput]
+
+
+MAX_GENERATE_BATCH = int(os.getenv("INVOICE_MAX_GENERATE_BATCH", "1000"))
+
+
+@router.post("/generate/batch")
+async def generate_invoice_batch(request: BatchInvoiceRequest):
+    """
+    Generate invoices for many actors at once and download them as a ZIP
+    
+    - **invoices**: List of invoice inputs (same fields as /generate)
+    
+    The ZIP contains one PDF per actor plus a manifest.csv with the calculated
+    TDS and net amounts; its batch id is returned in the X-Batch-Id header.
+    """
+    if not request.invoices:
+        raise HTTPException(status_code=400, detail="No invoices provided")
+    if len(request.invoices) > MAX_GENERATE_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many invoices. Maximum {MAX_GENERATE_BATCH} per batch"
+        )
+    
+    try:
+        logger.info(f"Generating batch of {len(request.invoices)} invoices")
+        batch_id, results = await run_in_threadpool(InvoiceService.generate_pdf_batch, request.invoices)
+        
+        return StreamingResponse(
+            InvoiceService.iter_batch_zip(request.invoices, results),
+            media_type="application/zip",
+            headers={
+                "Content-Disposition": f"attachment; filename=invoices_{batch_id}.zip",
+                "X-Batch-Id": batch_id
+            }
+        )
+        
+    except Exception as e:
+        logger.error(f"Error generating invoice batch: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate invoices: {str(e)}"
+        )
+
+
 @router.get("/download/{filename}")
 async def download_invoice(filename: str):
     """
@@ -76,32 +137,32 @@ async def download_invoice(filename: str):
     
     - **filename**: Name of the PDF file to download
     """
-    try:
-        return FileResponse(
-            filename,
-            headers={"Content-Disposition": f"attachment; filename={filename}"},
-            media_type="application/pdf"
-        )
-    except FileNotFoundError:
+    file_path = InvoiceService.get_invoice_file_path(filename)
+    if not file_path:
         raise HTTPException(
             status_code=404,
             detail="Invoice file not found"
         )
-    except Exception as e:
-        logger.error(f"Error downloading file {filename}: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to download invoice: {str(e)}"
-        )
+    
+    return FileResponse(
+        file_path,
+        filename=filename,
+        media_type="application/pdf" if filename.endswith(".pdf") else "text/plain"
+    )
 
 
 @router.get("/health")
 async def health_check() -> Dict[str, Any]:
-    """Health check endpoint for the invoice service"""
+    """Health check endpoint for the invoice service, including Gemini reachability"""
+    try:
+        gemini = await run_in_threadpool(get_invoice_processing_service().probe)
+    except Exception as e:
+        gemini = {"status": "unhealthy", "error": str(e)}
     return {
-        "status": "healthy",
+        "status": "healthy" if gemini["status"] == "healthy" else "degraded",
         "service": "invoice-api",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "gemini": gemini
     }
 
 
@@ -119,6 +180,67 @@ class UploadInvoiceResponse(BaseModel):
     extracted_data: Optional[Dict[str, Any]] = None
 
 
+class AsyncUploadResponse(BaseModel):
+    """Response model for an upload whose extraction runs in the background"""
+    success: bool
+    message: str
+    invoice_id: int
+    extraction_status: str
+    status_url: str
+
+
+ALLOWED_UPLOAD_TYPES = ['image/jpeg', 'image/png', 'image/webp', 'application/pdf']
+ZIP_CONTENT_TYPES = {'application/zip', 'application/x-zip-compressed', 'multipart/x-zip'}
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_BATCH_FILES = 500
+
+# Requested thumbnail sizes are snapped to these so the cache stays small
+THUMBNAIL_SIZES = (128, 256, 512, 1024)
+thumbnail_cache = ThumbnailCache(
+    os.getenv("INVOICE_THUMBNAIL_DIR", "uploaded_invoices/thumbnails"),
+    max_bytes=int(os.getenv("INVOICE_THUMBNAIL_CACHE_MB", "256")) * 1024 * 1024
+)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match already names this ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+async def _save_validated_upload(
+    service: InvoiceProcessingService,
+    file: UploadFile,
+    project_id: int
+) -> Tuple[str, str, int, str]:
+    """
+    Check the upload's type and stream it to storage in fixed-size chunks
+    
+    The spooled upload is never read into memory as a whole; size (max 10MB)
+    and SHA-256 are computed while copying.
+    
+    Returns:
+        Tuple of (file_path, mime_type, file_size, content_sha256)
+    """
+    # Validate file type
+    if file.content_type not in ALLOWED_UPLOAD_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type. Allowed types: {', '.join(ALLOWED_UPLOAD_TYPES)}"
+        )
+    
+    try:
+        return await run_in_threadpool(
+            service.save_invoice_stream, file.file, file.filename, project_id, MAX_UPLOAD_SIZE
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 class ApprovalActionRequest(BaseModel):
     """Request model for approval actions"""
     comments: Optional[str] = None
@@ -130,6 +252,7 @@ class InvoiceListResponse(BaseModel):
     invoices: List[Dict[str, Any]]
     total_count: int
     pending_approval_count: int
+    next_cursor: Optional[int] = None
 
 
 @router.post("/upload", response_model=UploadInvoiceResponse)
@@ -157,39 +280,18 @@ async def upload_invoice(
     try:
         logger.info(f"Uploading invoice for project {project_id} by user {user_id}")
         
-        # Validate file type
-        allowed_types = ['image/jpeg', 'image/png', 'image/webp', 'application/pdf']
-        if file.content_type not in allowed_types:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid file type. Allowed types: {', '.join(allowed_types)}"
-            )
-        
-        # Read file content
-        file_bytes = await file.read()
-        file_size = len(file_bytes)
-        
-        # Validate file size (max 10MB)
-        max_size = 10 * 1024 * 1024  # 10MB
-        if file_size > max_size:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File size exceeds maximum allowed size of {max_size / (1024*1024)}MB"
-            )
-        
         # Initialize processing service
-        service = InvoiceProcessingService()
+        service = get_invoice_processing_service()
         
-        # Save file
-        file_path, mime_type = service.save_invoice_file(
-            file_bytes,
-            file.filename,
-            project_id
-        )
+        # Stream file to storage
+        file_path, mime_type, file_size, content_sha256 = await _save_validated_upload(service, file, project_id)
         
-        # Extract invoice details using AI
+        # Extract invoice details using AI (in the threadpool so the event loop stays free);
+        # a byte-identical earlier upload is reused instead
         logger.info("Extracting invoice details using Gemini AI...")
-        extracted_data = service.extract_invoice_details(file_path, mime_type)
+        extracted_data = await run_in_threadpool(
+            service.extract_or_reuse, db, file_path, mime_type, content_sha256
+        )
         
         # Override category if provided
         if category:
@@ -204,7 +306,8 @@ async def upload_invoice(
             original_filename=file.filename,
             mime_type=mime_type,
             file_size=file_size,
-            extracted_data=extracted_data
+            extracted_data=extracted_data,
+            content_sha256=content_sha256
         )
         
         # Update additional fields if provided
@@ -222,7 +325,10 @@ async def upload_invoice(
         
         return UploadInvoiceResponse(
             success=True,
-            message="Invoice uploaded and processed successfully",
+            message=(
+                f"Duplicate of invoice {invoice.duplicate_of_id}; uploaded and flagged"
+                if invoice.is_duplicate else "Invoice uploaded and processed successfully"
+            ),
             invoice_id=invoice.id,
             invoice_number=invoice.invoice_number,
             extraction_status=invoice.ai_extraction_status,
@@ -231,6 +337,8 @@ async def upload_invoice(
             extracted_data=extracted_data
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error uploading invoice: {str(e)}")
         raise HTTPException(
@@ -239,38 +347,320 @@ async def upload_invoice(
         )
 
 
+@router.post("/upload/async", response_model=AsyncUploadResponse, status_code=202)
+async def upload_invoice_async(
+    file: UploadFile = File(...),
+    project_id: int = Form(...),
+    user_id: int = Form(...),
+    category: Optional[str] = Form(None),
+    department: Optional[str] = Form(None),
+    purpose: Optional[str] = Form(None),
+    notes: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload an invoice and return immediately; AI extraction runs in the background
+    
+    The invoice is stored with ai_extraction_status "pending". Poll
+    **status_url** until the status is "completed" or "failed".
+    
+    Accepts the same fields as **/upload**.
+    """
+    try:
+        logger.info(f"Queueing invoice for project {project_id} by user {user_id}")
+        
+        service = get_invoice_processing_service()
+        file_path, mime_type, file_size, content_sha256 = await _save_validated_upload(service, file, project_id)
+        
+        invoice = service.create_pending_invoice(
+            db=db,
+            project_id=project_id,
+            user_id=user_id,
+            file_path=file_path,
+            original_filename=file.filename,
+            mime_type=mime_type,
+            file_size=file_size,
+            category=category,
+            content_sha256=content_sha256
+        )
+        invoice.department = department
+        invoice.purpose = purpose
+        invoice.notes = notes
+        db.commit()
+        
+        invoice_worker.submit(invoice.id)
+        
+        return AsyncUploadResponse(
+            success=True,
+            message="Invoice uploaded; extraction queued",
+            invoice_id=invoice.id,
+            extraction_status=invoice.ai_extraction_status,
+            status_url=f"/api/invoice/invoice/{invoice.id}/status"
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error queueing invoice: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to upload invoice: {str(e)}"
+        )
+
+
+def _save_batch_files(
+    service: InvoiceProcessingService,
+    files: List[UploadFile],
+    project_id: int
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Stream every uploaded file (and every member of uploaded ZIPs) to disk
+    
+    Returns:
+        (saved file dicts for create_pending_invoices, per-file results in upload order)
+    """
+    saved: List[Dict[str, Any]] = []
+    results: List[Dict[str, Any]] = []
+    
+    def save_one(stream, filename: str, content_type: str):
+        if len(results) >= MAX_BATCH_FILES:
+            results.append({"filename": filename, "status": "rejected", "reason": f"Batch limit of {MAX_BATCH_FILES} files reached"})
+            return
+        if content_type not in ALLOWED_UPLOAD_TYPES:
+            results.append({"filename": filename, "status": "rejected", "reason": "Unsupported file type"})
+            return
+        try:
+            file_path, mime_type, file_size, content_sha256 = service.save_invoice_stream(
+                stream, filename, project_id, MAX_UPLOAD_SIZE
+            )
+        except ValueError as e:
+            results.append({"filename": filename, "status": "rejected", "reason": str(e)})
+            return
+        result = {"filename": filename, "status": "queued"}
+        results.append(result)
+        saved.append({
+            "file_path": file_path,
+            "original_filename": filename,
+            "mime_type": mime_type,
+            "file_size": file_size,
+            "content_sha256": content_sha256,
+            "result": result
+        })
+    
+    for upload in files:
+        filename = upload.filename or "upload"
+        if upload.content_type in ZIP_CONTENT_TYPES or filename.lower().endswith(".zip"):
+            try:
+                archive = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile:
+                results.append({"filename": filename, "status": "rejected", "reason": "Invalid ZIP archive"})
+                continue
+            with archive:
+                for info in archive.infolist():
+                    member_name = PurePosixPath(info.filename).name
+                    if info.is_dir() or not member_name or member_name.startswith(".") or info.filename.startswith("__MACOSX/"):
+                        continue
+                    if info.file_size > MAX_UPLOAD_SIZE:
+                        results.append({"filename": member_name, "status": "rejected", "reason": "File exceeds maximum allowed size"})
+                        continue
+                    member_type = MIME_TYPE_MAP.get(PurePosixPath(member_name).suffix.lower(), "application/octet-stream")
+                    with archive.open(info) as member:
+                        save_one(member, member_name, member_type)
+        else:
+            save_one(upload.file, filename, upload.content_type)
+    
+    return saved, results
+
+
+@router.post("/upload/batch", status_code=202)
+async def upload_invoice_batch(
+    files: List[UploadFile] = File(...),
+    project_id: int = Form(...),
+    user_id: int = Form(...),
+    category: Optional[str] = Form(None),
+    department: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload many invoices at once; extraction runs concurrently in the background
+    
+    - **files**: Invoice images/PDFs and/or ZIP archives of them
+    - **project_id**: Associated project ID
+    - **user_id**: User uploading the invoices
+    - **category**: Optional category applied to every invoice
+    - **department**: Optional department applied to every invoice
+    
+    Poll **status_url** for per-file progress.
+    """
+    try:
+        batch_id = uuid.uuid4().hex
+        logger.info(f"Uploading invoice batch {batch_id} ({len(files)} files) for project {project_id}")
+        
+        service = get_invoice_processing_service()
+        saved, results = await run_in_threadpool(_save_batch_files, service, files, project_id)
+        
+        if saved:
+            invoices = service.create_pending_invoices(
+                db=db,
+                project_id=project_id,
+                user_id=user_id,
+                files=saved,
+                category=category,
+                department=department,
+                batch_id=batch_id
+            )
+            db.commit()
+            
+            for saved_file, invoice in zip(saved, invoices):
+                saved_file["result"]["invoice_id"] = invoice.id
+                invoice_worker.submit(invoice.id)
+        
+        return {
+            "success": bool(saved),
+            "batch_id": batch_id,
+            "status_url": f"/api/invoice/batch/{batch_id}",
+            "total_files": len(results),
+            "queued": len(saved),
+            "rejected": len(results) - len(saved),
+            "files": results
+        }
+        
+    except Exception as e:
+        logger.error(f"Error uploading invoice batch: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to upload invoice batch: {str(e)}"
+        )
+
+
+@router.get("/batch/{batch_id}")
+async def get_invoice_batch_status(batch_id: str, db: Session = Depends(get_db)):
+    """
+    Per-file extraction and approval status for a batch upload
+    
+    - **batch_id**: Batch ID returned by **/upload/batch**
+    """
+    rows = db.query(
+        UploadedInvoice.id,
+        UploadedInvoice.original_filename,
+        UploadedInvoice.invoice_number,
+        UploadedInvoice.ai_extraction_status,
+        UploadedInvoice.approval_status,
+        UploadedInvoice.total_amount,
+        UploadedInvoice.currency
+    ).filter(UploadedInvoice.batch_id == batch_id).order_by(UploadedInvoice.id).all()
+    
+    if not rows:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    counts: Dict[str, int] = {}
+    for row in rows:
+        counts[row.ai_extraction_status] = counts.get(row.ai_extraction_status, 0) + 1
+    
+    return {
+        "batch_id": batch_id,
+        "total": len(rows),
+        "done": counts.get("completed", 0) + counts.get("failed", 0) == len(rows),
+        "status_counts": counts,
+        "invoices": [
+            {
+                "invoice_id": row.id,
+                "filename": row.original_filename,
+                "invoice_number": row.invoice_number,
+                "extraction_status": row.ai_extraction_status,
+                "approval_status": row.approval_status if row.ai_extraction_status in ("completed", "failed") else None,
+                "total_amount": row.total_amount,
+                "currency": row.currency
+            }
+            for row in rows
+        ]
+    }
+
+
+@router.get("/invoice/{invoice_id}/status")
+async def get_invoice_processing_status(invoice_id: int, db: Session = Depends(get_db)):
+    """
+    Poll the extraction/approval state of an invoice uploaded via **/upload/async**
+    
+    - **invoice_id**: Invoice ID
+    """
+    invoice = db.query(UploadedInvoice).filter(UploadedInvoice.id == invoice_id).first()
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    
+    done = invoice.ai_extraction_status in ("completed", "failed")
+    return {
+        "invoice_id": invoice.id,
+        "invoice_number": invoice.invoice_number,
+        "extraction_status": invoice.ai_extraction_status,
+        "done": done,
+        "status": invoice.status,
+        "approval_required": invoice.approval_required if done else None,
+        "approval_status": invoice.approval_status if done else None,
+        "total_amount": invoice.total_amount if done else None,
+        "currency": invoice.currency if done else None,
+        "vendor_name": invoice.vendor_name,
+        "ai_confidence_score": invoice.ai_confidence_score
+    }
+
+
 @router.get("/invoices/{project_id}", response_model=InvoiceListResponse)
 async def get_project_invoices(
     project_id: int,
     status: Optional[str] = None,
     approval_status: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Get all invoices for a project with optional filters
+    Get a page of a project's invoices (newest first) with optional filters
     
     - **project_id**: Project ID
     - **status**: Filter by status (uploaded, approved, paid, etc.)
     - **approval_status**: Filter by approval status (pending, approved, rejected)
+    - **limit**: Page size
+    - **cursor**: next_cursor from the previous page
     """
     try:
-        query = db.query(UploadedInvoice).filter(
-            UploadedInvoice.project_id == project_id
-        )
-        
-        # Apply filters
+        filters = []
         if status:
-            query = query.filter(UploadedInvoice.status == status)
+            filters.append(UploadedInvoice.status == status)
         if approval_status:
-            query = query.filter(UploadedInvoice.approval_status == approval_status)
+            filters.append(UploadedInvoice.approval_status == approval_status)
         
-        invoices = query.order_by(UploadedInvoice.created_at.desc()).all()
+        # Filtered total and project-wide pending count in one conditional aggregate
+        counts = db.query(
+            func.coalesce(func.sum(case((and_(*filters), 1), else_=0)), 0).label("total_count")
+            if filters else func.count(UploadedInvoice.id).label("total_count"),
+            func.coalesce(func.sum(case((UploadedInvoice.approval_status == "pending", 1), else_=0)), 0).label("pending_count")
+        ).filter(UploadedInvoice.project_id == project_id).one()
         
-        # Count pending approvals
-        pending_count = db.query(UploadedInvoice).filter(
-            UploadedInvoice.project_id == project_id,
-            UploadedInvoice.approval_status == "pending"
-        ).count()
+        query = db.query(
+            UploadedInvoice.id,
+            UploadedInvoice.invoice_number,
+            UploadedInvoice.vendor_name,
+            UploadedInvoice.total_amount,
+            UploadedInvoice.currency,
+            UploadedInvoice.amount_in_base_currency,
+            UploadedInvoice.invoice_date,
+            UploadedInvoice.category,
+            UploadedInvoice.department,
+            UploadedInvoice.approval_required,
+            UploadedInvoice.approval_status,
+            UploadedInvoice.status,
+            UploadedInvoice.submitted_by,
+            UploadedInvoice.created_at,
+            UploadedInvoice.ai_confidence_score,
+            UploadedInvoice.is_duplicate,
+            UploadedInvoice.file_path,
+            UploadedInvoice.mime_type
+        ).filter(UploadedInvoice.project_id == project_id, *filters)
+        if cursor is not None:
+            query = query.filter(UploadedInvoice.id < cursor)
+        rows = query.order_by(UploadedInvoice.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
         # Format response
         invoice_list = [
@@ -280,6 +670,7 @@ async def get_project_invoices(
                 "vendor_name": inv.vendor_name,
                 "total_amount": inv.total_amount,
                 "currency": inv.currency,
+                "amount_in_base_currency": inv.amount_in_base_currency,
                 "invoice_date": inv.invoice_date.isoformat() if inv.invoice_date else None,
                 "category": inv.category,
                 "department": inv.department,
@@ -289,15 +680,21 @@ async def get_project_invoices(
                 "submitted_by": inv.submitted_by,
                 "created_at": inv.created_at.isoformat(),
                 "ai_confidence_score": inv.ai_confidence_score,
-                "file_path": inv.file_path
+                "is_duplicate": inv.is_duplicate,
+                "file_path": inv.file_path,
+                "thumbnail_url": (
+                    f"/api/invoice/invoice/{inv.id}/thumbnail"
+                    if (inv.mime_type or "").startswith("image/") else None
+                )
             }
-            for inv in invoices
+            for inv in rows
         ]
         
         return InvoiceListResponse(
             invoices=invoice_list,
-            total_count=len(invoice_list),
-            pending_approval_count=pending_count
+            total_count=counts.total_count,
+            pending_approval_count=counts.pending_count,
+            next_cursor=rows[-1].id if has_more and rows else None
         )
         
     except Exception as e:
@@ -308,6 +705,80 @@ async def get_project_invoices(
         )
 
 
+@router.get("/invoices/{project_id}/analytics")
+async def get_invoice_analytics(
+    project_id: int,
+    group_by: str = Query("category"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    include_rejected: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Spend rollup for a project, aggregated in the database (amounts in INR)
+    
+    - **group_by**: category, vendor, department, month or status
+    - **start_date** / **end_date**: Optional invoice date range (YYYY-MM-DD)
+    - **include_rejected**: Count rejected invoices too
+    """
+    if group_by not in GROUP_BY_FIELDS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(GROUP_BY_FIELDS)}")
+    try:
+        start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        end = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59) if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    
+    try:
+        groups = spend_rollup(db, project_id, group_by, start, end, include_rejected)
+        return {
+            "project_id": project_id,
+            "group_by": group_by,
+            "currency": "INR",
+            "groups": groups,
+            "total_amount": round(sum(g["total_amount"] for g in groups), 2),
+            "invoice_count": sum(g["invoice_count"] for g in groups)
+        }
+    except Exception as e:
+        logger.error(f"Error computing invoice analytics: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to compute invoice analytics: {str(e)}"
+        )
+
+
+@router.get("/invoices/{project_id}/summary")
+async def get_invoice_summary(project_id: int, db: Session = Depends(get_db)):
+    """
+    Materialized invoice totals for a project (amounts in INR)
+    
+    Served from a stored row that is only recomputed after the project's invoices change.
+    """
+    try:
+        summary = get_project_summary(db, project_id)
+        return {
+            "project_id": project_id,
+            "currency": "INR",
+            "invoice_count": summary.invoice_count,
+            "pending_approval_count": summary.pending_approval_count,
+            "approved_count": summary.approved_count,
+            "rejected_count": summary.rejected_count,
+            "duplicate_count": summary.duplicate_count,
+            "total_spend": summary.total_spend,
+            "pending_spend": summary.pending_spend,
+            "approved_spend": summary.approved_spend,
+            "paid_spend": summary.paid_spend,
+            "spend_by_category": summary.spend_by_category or {},
+            "refreshed_at": summary.refreshed_at.isoformat() if summary.refreshed_at else None
+        }
+    except Exception as e:
+        logger.error(f"Error fetching invoice summary: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch invoice summary: {str(e)}"
+        )
+
+
 @router.get("/invoice/{invoice_id}")
 async def get_invoice_details(
     invoice_id: int,
@@ -352,6 +823,8 @@ async def get_invoice_details(
                 "discount_amount": invoice.discount_amount,
                 "total_amount": invoice.total_amount,
                 "currency": invoice.currency,
+                "exchange_rate": invoice.exchange_rate,
+                "amount_in_base_currency": invoice.amount_in_base_currency,
                 "line_items": invoice.line_items,
                 "category": invoice.category,
                 "department": invoice.department,
@@ -370,6 +843,8 @@ async def get_invoice_details(
                 "original_filename": invoice.original_filename,
                 "ai_confidence_score": invoice.ai_confidence_score,
                 "ai_extraction_status": invoice.ai_extraction_status,
+                "is_duplicate": invoice.is_duplicate,
+                "duplicate_of_id": invoice.duplicate_of_id,
                 "created_at": invoice.created_at.isoformat(),
                 "updated_at": invoice.updated_at.isoformat()
             },
@@ -422,7 +897,7 @@ async def approve_invoice(
     - **request**: Approval comments (optional)
     """
     try:
-        service = InvoiceProcessingService()
+        service = get_invoice_processing_service()
         invoice = service.approve_invoice(
             db=db,
             invoice_id=invoice_id,
@@ -471,7 +946,7 @@ async def reject_invoice(
                 detail="Rejection reason is required"
             )
         
-        service = InvoiceProcessingService()
+        service = get_invoice_processing_service()
         invoice = service.reject_invoice(
             db=db,
             invoice_id=invoice_id,
@@ -501,10 +976,13 @@ async def reject_invoice(
 
 
 @router.get("/invoice/{invoice_id}/download")
-async def download_invoice_image(invoice_id: int, db: Session = Depends(get_db)):
+async def download_invoice_image(invoice_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Download the original invoice image/PDF
     
+    Stored files carry a strong ETag (the content hash) and support
+    If-None-Match and Range requests.
+    
     - **invoice_id**: Invoice ID
     """
     try:
@@ -515,13 +993,30 @@ async def download_invoice_image(invoice_id: int, db: Session = Depends(get_db))
         if not invoice:
             raise HTTPException(status_code=404, detail="Invoice not found")
         
-        return FileResponse(
-            invoice.file_path,
-            headers={
-                "Content-Disposition": f"attachment; filename={invoice.original_filename}"
-            },
-            media_type=invoice.mime_type
-        )
+        headers = {
+            "Content-Disposition": f"attachment; filename={invoice.original_filename}"
+        }
+        if invoice.content_sha256:
+            # An invoice's file never changes, so its hash is a strong validator
+            etag = f'"{invoice.content_sha256}"'
+            headers["ETag"] = etag
+            headers["Cache-Control"] = "private, max-age=31536000, immutable"
+            if _etag_matches(request, etag):
+                return Response(status_code=304, headers=headers)
+        
+        # Local storage and pre-storage uploads are plain files on disk
+        if invoice.file_path and os.path.exists(invoice.file_path):
+            return FileResponse(invoice.file_path, headers=headers, media_type=invoice.mime_type)
+        
+        # Remote storage is streamed through in chunks
+        if invoice.content_sha256 and invoice_storage.exists(invoice.content_sha256):
+            return StreamingResponse(
+                invoice_storage.iter_chunks(invoice.content_sha256),
+                headers=headers,
+                media_type=invoice.mime_type
+            )
+        
+        raise HTTPException(status_code=404, detail="Invoice file not found")
         
     except HTTPException:
         raise
@@ -533,6 +1028,59 @@ async def download_invoice_image(invoice_id: int, db: Session = Depends(get_db))
         )
 
 
+@router.get("/invoice/{invoice_id}/thumbnail")
+async def get_invoice_thumbnail(
+    invoice_id: int,
+    request: Request,
+    size: int = Query(256, ge=1, le=1024),
+    db: Session = Depends(get_db)
+):
+    """
+    Small WebP preview of an invoice image for list and approval screens
+    
+    Thumbnails are rendered on first request and kept in a size-bounded
+    on-disk LRU cache.
+    
+    - **invoice_id**: Invoice ID
+    - **size**: Longest edge in pixels (snapped up to 128, 256, 512 or 1024)
+    """
+    try:
+        invoice = db.query(
+            UploadedInvoice.id,
+            UploadedInvoice.file_path,
+            UploadedInvoice.mime_type,
+            UploadedInvoice.content_sha256
+        ).filter(UploadedInvoice.id == invoice_id).first()
+        
+        if not invoice:
+            raise HTTPException(status_code=404, detail="Invoice not found")
+        if not (invoice.mime_type or "").startswith("image/"):
+            raise HTTPException(status_code=415, detail="Preview is only available for image invoices")
+        
+        size = next(s for s in THUMBNAIL_SIZES if s >= size)
+        key = invoice.content_sha256 or f"invoice-{invoice.id}"
+        etag = f'"{key}-{size}"'
+        headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        
+        source_path = await run_in_threadpool(resolve_local_path, invoice.file_path, invoice.content_sha256)
+        if not source_path or not os.path.exists(source_path):
+            raise HTTPException(status_code=404, detail="Invoice file not found")
+        
+        thumbnail_path = await run_in_threadpool(thumbnail_cache.get_or_create, key, source_path, size)
+        return FileResponse(thumbnail_path, headers=headers, media_type="image/webp")
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating invoice thumbnail: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate invoice thumbnail: {str(e)}"
+        )
+
+
 @router.post("/invoice/{invoice_id}/comment")
 async def add_invoice_comment(
     invoice_id: int,
@@ -629,6 +1177,7 @@ async def update_approval_settings(
         
         db.commit()
         db.refresh(settings)
+        approval_policy_cache.invalidate(project_id)
         
         return {
             "success": True,
@@ -645,4 +1194,86 @@ async def update_approval_settings(
         raise HTTPException(
             status_code=500,
             detail=f"Failed to update settings: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/currency-rates")
+async def list_currency_rates(currency: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    List exchange rates to INR, newest first
+    
+    - **currency**: Optional currency code filter
+    """
+    query = db.query(CurrencyRate)
+    if currency:
+        query = query.filter(CurrencyRate.currency == currency.upper())
+    rates = query.order_by(CurrencyRate.currency, CurrencyRate.effective_from.desc()).all()
+    return {
+        "rates": [
+            {
+                "id": r.id,
+                "currency": r.currency,
+                "rate_to_base": r.rate_to_base,
+                "effective_from": r.effective_from.isoformat(),
+                "source": r.source
+            }
+            for r in rates
+        ]
+    }
+
+
+@router.post("/currency-rates")
+async def add_currency_rate(
+    currency: str = Form(...),
+    rate_to_base: float = Form(..., gt=0),
+    effective_from: str = Form(...),
+    source: Optional[str] = Form("manual"),
+    db: Session = Depends(get_db)
+):
+    """
+    Add (or replace) the INR rate for a currency from a date onwards
+    
+    - **currency**: ISO currency code, e.g. USD
+    - **rate_to_base**: Value of one unit in INR
+    - **effective_from**: Date the rate applies from (YYYY-MM-DD)
+    - **source**: Where the rate came from
+    """
+    try:
+        try:
+            effective_date = datetime.strptime(effective_from, '%Y-%m-%d')
+        except ValueError:
+            raise HTTPException(status_code=400, detail="effective_from must be YYYY-MM-DD")
+        
+        currency = currency.upper()
+        rate = db.query(CurrencyRate).filter(
+            CurrencyRate.currency == currency,
+            CurrencyRate.effective_from == effective_date
+        ).first()
+        if rate:
+            rate.rate_to_base = rate_to_base
+            rate.source = source
+        else:
+            rate = CurrencyRate(
+                currency=currency,
+                rate_to_base=rate_to_base,
+                effective_from=effective_date,
+                source=source
+            )
+            db.add(rate)
+        db.commit()
+        currency_rates.invalidate()
+        
+        return {
+            "success": True,
+            "message": f"Rate for {currency} effective {effective_from} saved",
+            "rate": {"currency": currency, "rate_to_base": rate_to_base, "effective_from": effective_from}
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error saving currency rate: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to save currency rate: {str(e)}"
+        )
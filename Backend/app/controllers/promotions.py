@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from app.config.database import get_db
 from app.services.youtube_service import youtube_service
 from app.services.llm_service import llm_service
-from app.models import Promotion
+from app.services.promotion_tracking_service import promotion_tracker
+from app.models import Promotion, PromotionTracking
+from datetime import datetime
 import json
 from google import genai
 
@@ -15,6 +17,24 @@ class PromotionCreate(BaseModel):
     film: str
     project_id: int | None = None
 
+class PromotionTrackingCreate(BaseModel):
+    film: str
+    project_id: int | None = None
+    refresh_interval_minutes: int = 360
+
+def _tracking_to_dict(t: PromotionTracking) -> dict:
+    return {
+        "id": t.id,
+        "project_id": t.project_id,
+        "film": t.film,
+        "is_active": t.is_active,
+        "refresh_interval_minutes": t.refresh_interval_minutes,
+        "video_ids": t.video_ids or [],
+        "last_refreshed_at": t.last_refreshed_at.isoformat() if t.last_refreshed_at else None,
+        "last_error": t.last_error,
+        "created_at": t.created_at.isoformat() if t.created_at else None
+    }
+
 @router.post("")
 async def create_promotion(payload: PromotionCreate, db: Session = Depends(get_db)):
     try:
@@ -72,23 +92,120 @@ async def create_promotion(payload: PromotionCreate, db: Session = Depends(get_d
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Columns for the default list shape; the heavy videos/sentiment/industry
+# blobs are never loaded here, only the overall sentiment label is extracted
+def _summary_query(db: Session):
+    return db.query(
+        Promotion.id,
+        Promotion.project_id,
+        Promotion.film,
+        Promotion.total_views,
+        Promotion.total_likes,
+        Promotion.total_comments,
+        Promotion.sentiment_analysis["overall_sentiment"].as_string().label("overall_sentiment"),
+        Promotion.created_at
+    )
+
+def _paginate_summaries(query, limit: int, cursor: int | None) -> dict:
+    """Keyset pagination on id (newest first); pass next_cursor back as cursor for the next page."""
+    if cursor is not None:
+        query = query.filter(Promotion.id < cursor)
+    rows = query.order_by(Promotion.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "promotions": [
+            {
+                "id": r.id,
+                "project_id": r.project_id,
+                "film": r.film,
+                "total_views": r.total_views,
+                "total_likes": r.total_likes,
+                "total_comments": r.total_comments,
+                "overall_sentiment": r.overall_sentiment,
+                "created_at": r.created_at.isoformat() if r.created_at else None
+            } for r in rows
+        ],
+        "next_cursor": rows[-1].id if has_more and rows else None
+    }
+
 @router.get("")
-async def list_promotions(db: Session = Depends(get_db)):
-    promos = db.query(Promotion).order_by(Promotion.created_at.desc()).all()
-    return {"promotions": [
-        {
-            "id": p.id,
-            "project_id": p.project_id,
-            "film": p.film,
-            "total_views": p.total_views,
-            "total_likes": p.total_likes,
-            "total_comments": p.total_comments,
-            "videos": p.videos,
-            "industry_progress": p.industry_progress,
-            "sentiment_analysis": p.sentiment_analysis,
-            "created_at": p.created_at.isoformat() if p.created_at else None
-        } for p in promos
-    ]}
+async def list_promotions(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: int | None = None,
+    db: Session = Depends(get_db)
+):
+    """List promotion summaries, newest first. Use GET /promotions/{id} for videos and sentiment detail."""
+    return _paginate_summaries(_summary_query(db), limit, cursor)
+
+@router.post("/tracking")
+async def create_promotion_tracking(payload: PromotionTrackingCreate, db: Session = Depends(get_db)):
+    """Start (or resume) scheduled tracking of a film; the background tracker picks it up on its next poll."""
+    if payload.refresh_interval_minutes < 5:
+        raise HTTPException(status_code=400, detail="refresh_interval_minutes must be at least 5")
+
+    tracking = db.query(PromotionTracking).filter(
+        PromotionTracking.film == payload.film,
+        PromotionTracking.project_id == payload.project_id
+    ).first()
+    if tracking:
+        tracking.is_active = True
+        tracking.refresh_interval_minutes = payload.refresh_interval_minutes
+    else:
+        tracking = PromotionTracking(
+            project_id=payload.project_id,
+            film=payload.film,
+            refresh_interval_minutes=payload.refresh_interval_minutes
+        )
+        db.add(tracking)
+    db.commit()
+    db.refresh(tracking)
+    return {"success": True, "tracking": _tracking_to_dict(tracking)}
+
+@router.get("/tracking")
+async def list_promotion_trackings(project_id: int | None = None, db: Session = Depends(get_db)):
+    query = db.query(PromotionTracking)
+    if project_id is not None:
+        query = query.filter(PromotionTracking.project_id == project_id)
+    trackings = query.order_by(PromotionTracking.created_at.desc()).all()
+    return {"trackings": [_tracking_to_dict(t) for t in trackings]}
+
+@router.post("/tracking/{tracking_id}/refresh")
+def refresh_promotion_tracking(tracking_id: int, db: Session = Depends(get_db)):
+    """Take a snapshot immediately instead of waiting for the next scheduled refresh."""
+    tracking = db.query(PromotionTracking).filter(PromotionTracking.id == tracking_id).first()
+    if not tracking:
+        raise HTTPException(status_code=404, detail="Promotion tracking not found")
+    try:
+        snapshots = promotion_tracker.refresh_tracking(db, tracking)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"success": True, "snapshot_count": len(snapshots), "tracking": _tracking_to_dict(tracking)}
+
+@router.delete("/tracking/{tracking_id}")
+async def stop_promotion_tracking(tracking_id: int, db: Session = Depends(get_db)):
+    """Stop refreshing a film; stored snapshots are kept."""
+    tracking = db.query(PromotionTracking).filter(PromotionTracking.id == tracking_id).first()
+    if not tracking:
+        raise HTTPException(status_code=404, detail="Promotion tracking not found")
+    tracking.is_active = False
+    db.commit()
+    return {"success": True, "tracking_id": tracking_id}
+
+@router.get("/tracking/{tracking_id}/timeseries")
+async def get_promotion_timeseries(
+    tracking_id: int,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: Session = Depends(get_db)
+):
+    """Stored snapshots in a date range with deltas and growth rates (no YouTube/Gemini calls)."""
+    tracking = db.query(PromotionTracking).filter(PromotionTracking.id == tracking_id).first()
+    if not tracking:
+        raise HTTPException(status_code=404, detail="Promotion tracking not found")
+    return promotion_tracker.build_timeseries(db, tracking, start, end)
 
 @router.get("/{promotion_id}")
 async def get_promotion(promotion_id: int, db: Session = Depends(get_db)):
@@ -109,18 +226,12 @@ async def get_promotion(promotion_id: int, db: Session = Depends(get_db)):
     }
 
 @router.get("/projects/{project_id}")
-async def get_project_promotions(project_id: int, db: Session = Depends(get_db)):
-    promos = db.query(Promotion).filter(Promotion.project_id == project_id).order_by(Promotion.created_at.desc()).all()
-    return {"project_id": project_id, "promotions": [
-        {
-            "id": p.id,
-            "film": p.film,
-            "total_views": p.total_views,
-            "total_likes": p.total_likes,
-            "total_comments": p.total_comments,
-            "videos": p.videos,
-            "industry_progress": p.industry_progress,
-            "sentiment_analysis": p.sentiment_analysis,
-            "created_at": p.created_at.isoformat() if p.created_at else None
-        } for p in promos
-    ]}
+async def get_project_promotions(
+    project_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: int | None = None,
+    db: Session = Depends(get_db)
+):
+    """List a project's promotion summaries, newest first."""
+    query = _summary_query(db).filter(Promotion.project_id == project_id)
+    return {"project_id": project_id, **_paginate_summaries(query, limit, cursor)}
@@ -2,16 +2,19 @@
 CLEAN Schedule Controller - Optimized and Simplified
 Handles: Schedule stats, auto-scheduling with AI, manual reschedule, conflicts
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
 from app.config.database import get_db
-from app.models import Scene, Project, ProductionStage, ActorAvailability, GlobalCost
+from app.models import Scene, Project, ProductionStage, ActorAvailability, GlobalCost, Location, ScheduleVersion
 from app.services.scheduling_service import SchedulingEngine
+from app.services import (
+    dood_service, reschedule_service, schedule_conflict_service, schedule_risk_service, schedule_version_service
+)
 
 router = APIRouter()
 
@@ -19,13 +22,27 @@ router = APIRouter()
 # REQUEST/RESPONSE MODELS
 # ============================================================================
 
+class DateWindow(BaseModel):
+    start_date: datetime
+    end_date: datetime
+    available: bool = True  # False marks a blackout
+
 class AutoScheduleRequest(BaseModel):
     start_date: datetime
     end_date: datetime
-    optimization_mode: str = "balanced"  # cost, speed, balanced, quality
+    optimization_mode: str = "balanced"  # cost, speed, balanced, quality, solver, anneal
     skip_weekends: bool = True
     auto_cascade: bool = True
     scenes_per_day: Optional[int] = None
+    # Constraint solver options (optimization_mode="solver")
+    solver_time_limit: float = 10.0  # seconds
+    hours_per_day: Optional[float] = None  # shooting hours per day, default 10
+    allow_split_days: bool = False  # allow day and night scenes on the same date
+    location_availability: Optional[Dict[str, List[DateWindow]]] = None  # keyed by location name
+    max_overtime_hours: float = 0.0  # extra hours a day may run, billed as overtime
+    # Annealing options (optimization_mode="anneal")
+    time_budget: float = 30.0  # wall-clock seconds for all restarts together
+    restarts: Optional[int] = None  # independent restarts, default one per weight profile or solver process, whichever is more
 
 class RescheduleRequest(BaseModel):
     scene_id: int
@@ -33,6 +50,12 @@ class RescheduleRequest(BaseModel):
     reason: Optional[str] = None
     auto_cascade: bool = True
 
+class ScheduleVersionRequest(BaseModel):
+    name: str
+    mode: str = "balanced"
+    skip_weekends: bool = True
+    window_days: int = 365
+
 class ScheduleStats(BaseModel):
     total_scenes: int
     scheduled: int
@@ -43,6 +66,71 @@ class ScheduleStats(BaseModel):
     days_completed: int
     completion_percentage: float
 
+def _location_availability(db: Session, requested: Optional[Dict[str, List[DateWindow]]]) -> Dict[str, Dict]:
+    """Location windows/blackouts for the solver and location routing: request windows plus locations marked unavailable"""
+    availability = {}
+    for name, windows in (requested or {}).items():
+        rules = availability.setdefault(name.strip().casefold(), {'windows': [], 'blackouts': []})
+        for window in windows:
+            key = 'windows' if window.available else 'blackouts'
+            rules[key].append((window.start_date.date(), window.end_date.date()))
+    
+    unavailable = db.query(Location.name).filter(Location.availability == 'unavailable').all()
+    for (name,) in unavailable:
+        rules = availability.setdefault(name.strip().casefold(), {'windows': [], 'blackouts': []})
+        rules['blackouts'].append((datetime.min.date(), datetime.max.date()))
+    return availability
+
+def _preview_options(db: Session, mode: str, skip_weekends: bool, window_days: int):
+    """Date window and engine config for previews; the window starts today so cached results stay valid all day"""
+    start_date = datetime.combine(datetime.now().date(), datetime.min.time())
+    end_date = start_date + timedelta(days=min(max(window_days, 1), 3 * 365))
+    config = {
+        'skip_weekends': skip_weekends,
+        'scenes_per_day': 5,
+        'location_availability': _location_availability(db, None)
+    }
+    return start_date, end_date, config
+
+def _get_version(db: Session, project_id: int, version_id: int) -> ScheduleVersion:
+    version = db.query(ScheduleVersion).filter(
+        ScheduleVersion.id == version_id,
+        ScheduleVersion.project_id == project_id
+    ).first()
+    if not version:
+        raise HTTPException(status_code=404, detail="Schedule version not found")
+    return version
+
+def _version_dict(version: ScheduleVersion, current_fingerprint: Optional[str], include_schedule: bool = False) -> Dict:
+    data = {
+        "id": version.id,
+        "name": version.name,
+        "mode": version.mode,
+        "params": version.params,
+        "status": version.status,
+        "total_days": version.total_days,
+        "completion_date": version.completion_date,
+        "scene_count": len(version.schedule or []),
+        "conflict_count": len(version.conflicts or []),
+        "summary": version.summary,
+        "is_current": version.fingerprint == current_fingerprint,
+        "created_at": version.created_at,
+        "applied_at": version.applied_at
+    }
+    if include_schedule:
+        data["schedule"] = version.schedule
+        data["conflicts"] = version.conflicts
+    return data
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match already names this ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
 # ============================================================================
 # ENDPOINTS
 # ============================================================================
@@ -86,67 +174,68 @@ def get_schedule_stats(project_id: int, db: Session = Depends(get_db)):
     )
 
 
+@router.get("/projects/{project_id}/schedule/risk")
+def get_schedule_risk(
+    project_id: int,
+    iterations: int = schedule_risk_service.DEFAULT_ITERATIONS,
+    seed: Optional[int] = None,
+    skip_weekends: bool = True,
+    daily_cost: Optional[float] = None,
+    duration_sigma: float = schedule_risk_service.DURATION_SIGMA,
+    actor_absence: float = schedule_risk_service.ACTOR_ABSENCE_PROBABILITY,
+    db: Session = Depends(get_db)
+):
+    """
+    Monte Carlo risk for the current schedule: completion-date and budget
+    percentiles under weather loss on outdoor days, actor absences and
+    scene duration variance
+    """
+    return schedule_risk_service.simulate_schedule_risk(
+        db,
+        project_id,
+        iterations=min(max(iterations, 100), 100000),
+        seed=seed,
+        skip_weekends=skip_weekends,
+        daily_cost=daily_cost if daily_cost and daily_cost > 0 else None,
+        duration_sigma=min(max(duration_sigma, 0.0), 2.0),
+        actor_absence=min(max(actor_absence, 0.0), 1.0)
+    )
+
+
 @router.get("/projects/{project_id}/schedule/conflicts")
 def get_scheduling_conflicts(project_id: int, db: Session = Depends(get_db)):
     """Detect and return scheduling conflicts"""
     
-    conflicts = []
-    scenes = db.query(Scene).filter(Scene.project_id == project_id).all()
-    
-    # Group scenes by date
-    scenes_by_date = {}
-    for scene in scenes:
-        if hasattr(scene, 'scheduled_date') and scene.scheduled_date:
-            date_key = scene.scheduled_date.date() if isinstance(scene.scheduled_date, datetime) else scene.scheduled_date
-            if date_key not in scenes_by_date:
-                scenes_by_date[date_key] = []
-            scenes_by_date[date_key].append(scene)
-    
-    # Check for conflicts each day
-    for date, day_scenes in scenes_by_date.items():
-        # Location conflicts
-        location_groups = {}
-        for scene in day_scenes:
-            loc = scene.location_name if hasattr(scene, 'location_name') and scene.location_name else 'Unknown'
-            if loc not in location_groups:
-                location_groups[loc] = []
-            location_groups[loc].append(scene)
-        
-        for location, loc_scenes in location_groups.items():
-            if len(loc_scenes) > 1:
-                conflicts.append({
-                    "id": len(conflicts) + 1,
-                    "type": "location_overlap",
-                    "severity": "medium",
-                    "message": f"{len(loc_scenes)} scenes at {location} on {date}",
-                    "scenes": [s.id for s in loc_scenes],
-                    "date": datetime.combine(date, datetime.min.time())
-                })
-        
-        # Actor overload (same actor in too many scenes)
-        if day_scenes:
-            actor_scenes = {}
-            for scene in day_scenes:
-                if hasattr(scene, 'actors_data') and scene.actors_data:
-                    for actor_info in scene.actors_data:
-                        actor_name = actor_info.get('name', '')
-                        if actor_name:
-                            if actor_name not in actor_scenes:
-                                actor_scenes[actor_name] = []
-                            actor_scenes[actor_name].append(scene.id)
-            
-            for actor, scene_ids in actor_scenes.items():
-                if len(scene_ids) > 3:
-                    conflicts.append({
-                        "id": len(conflicts) + 1,
-                        "type": "actor_overload",
-                        "severity": "high",
-                        "message": f"{actor} in {len(scene_ids)} scenes on {date}",
-                        "scenes": scene_ids,
-                        "date": datetime.combine(date, datetime.min.time())
-                    })
-    
-    return conflicts
+    # Grouped in the database over the (project_id, scheduled_date) index and scene_actors
+    conflicts = schedule_conflict_service.find_conflicts(db, project_id)
+    return [{"id": i, **conflict} for i, conflict in enumerate(conflicts, start=1)]
+
+
+@router.get("/projects/{project_id}/schedule/dood")
+def get_day_out_of_days(project_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Cast day-out-of-days: each actor's work, hold, travel and off days across
+    the schedule, with billing per cycle. Cached (and served pre-serialized)
+    until the schedule, cast or actor costs change; the input fingerprint is the ETag.
+    """
+    fingerprint, entry, cached = dood_service.get_dood(db, project_id)
+    headers = {"ETag": f'"{fingerprint}"', "X-Cache": "HIT" if cached else "MISS"}
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry['body'], media_type="application/json", headers=headers)
+
+
+@router.get("/projects/{project_id}/schedule/dood/export")
+def export_day_out_of_days(project_id: int, request: Request, db: Session = Depends(get_db)):
+    """The day-out-of-days report as a CSV sheet"""
+    fingerprint, entry, _ = dood_service.get_dood(db, project_id)
+    headers = {
+        "Content-Disposition": f"attachment; filename=dood_project_{project_id}.csv",
+        "ETag": f'"{fingerprint}"'
+    }
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=dood_service.dood_export(entry), media_type="text/csv", headers=headers)
 
 
 @router.post("/projects/{project_id}/schedule/auto")
@@ -189,7 +278,14 @@ def auto_schedule(project_id: int, request: AutoScheduleRequest, db: Session = D
     config = {
         'skip_weekends': request.skip_weekends,
         'auto_cascade': request.auto_cascade,
-        'scenes_per_day': request.scenes_per_day or 5
+        'scenes_per_day': request.scenes_per_day or 5,
+        'solver_time_limit': min(max(request.solver_time_limit, 0.5), 120.0),
+        'day_hours': request.hours_per_day,
+        'allow_split_days': request.allow_split_days,
+        'overtime_hours': min(max(request.max_overtime_hours, 0.0), 12.0),
+        'time_budget': min(max(request.time_budget, 1.0), 300.0),
+        'restarts': min(max(request.restarts, 1), 32) if request.restarts else None,
+        'location_availability': _location_availability(db, request.location_availability)
     }
     
     # Initialize scheduling engine
@@ -197,7 +293,8 @@ def auto_schedule(project_id: int, request: AutoScheduleRequest, db: Session = D
         scenes=unplanned_scenes,
         actors=actors,
         project_config=config,
-        global_costs=global_costs
+        global_costs=global_costs,
+        locations=db.query(Location).all()
     )
     
     # Run scheduling algorithm
@@ -234,8 +331,23 @@ def auto_schedule(project_id: int, request: AutoScheduleRequest, db: Session = D
         "optimization_summary": {
             "mode": request.optimization_mode,
             "scenes_per_day": config['scenes_per_day'],
-            "skip_weekends": request.skip_weekends
-        }
+            "skip_weekends": request.skip_weekends,
+            "solver": result.get('solver'),
+            "route": result.get('route')
+        },
+        "alternatives": [
+            {
+                "profile": alternative['solver'].get('profile'),
+                "total_days": alternative['total_days'],
+                "completion_date": alternative['completion_date'],
+                "solver": alternative['solver'],
+                "schedule": [
+                    {"scene_id": item['scene_id'], "scheduled_date": item['scheduled_date']}
+                    for item in alternative['schedule']
+                ]
+            }
+            for alternative in result.get('alternatives', [])
+        ]
     }
 
 
@@ -245,113 +357,150 @@ def reschedule_scene(project_id: int, request: RescheduleRequest, db: Session =
     Reschedule a single scene with optional auto-cascade
     """
     
-    # Get scene
-    scene = db.query(Scene).filter(
-        Scene.id == request.scene_id,
-        Scene.project_id == project_id
-    ).first()
-    
-    if not scene:
-        raise HTTPException(status_code=404, detail="Scene not found")
-    
-    old_date = scene.scheduled_date
-    
-    # Get all scenes for cascade
-    all_scenes = db.query(Scene).filter(Scene.project_id == project_id).all()
-    actors = db.query(ActorAvailability).filter(ActorAvailability.project_id == project_id).all()
-    global_costs = db.query(GlobalCost).filter(GlobalCost.category == 'actor').all()
-    
-    # Create current schedule
-    current_schedule = []
-    for s in all_scenes:
-        if s.scheduled_date:
-            current_schedule.append({
-                'scene_id': s.id,
-                'scene_number': s.scene_number,
-                'scheduled_date': s.scheduled_date,
-                'location': s.location_name if hasattr(s, 'location_name') else None
-            })
-    
-    # Initialize engine for cascade
-    config = {'auto_cascade': request.auto_cascade}
-    engine = SchedulingEngine(all_scenes, actors, config, global_costs)
-    
-    # Perform reschedule
-    result = engine.reschedule_scene(
-        scene_id=request.scene_id,
-        new_date=request.new_date,
-        current_schedule=current_schedule
+    # Touches only the scene, its cascade set and the dates they move between
+    result = reschedule_service.reschedule_scene(
+        db,
+        project_id,
+        request.scene_id,
+        request.new_date,
+        auto_cascade=request.auto_cascade,
+        reason=request.reason
     )
     
+    if result is None:
+        raise HTTPException(status_code=404, detail="Scene not found")
     if not result['success']:
         raise HTTPException(status_code=400, detail=result['message'])
     
-    # Update database
-    for schedule_item in result['updated_schedule']:
-        db_scene = db.query(Scene).filter(Scene.id == schedule_item['scene_id']).first()
-        if db_scene:
-            db_scene.scheduled_date = schedule_item['scheduled_date']
-            
-            # Add reason to notes
-            if request.reason and db_scene.id == request.scene_id:
-                existing_notes = db_scene.notes or ''
-                db_scene.notes = f"{existing_notes}\n[Rescheduled]: {request.reason}".strip()
-    
-    db.commit()
-    
     return {
         "success": True,
         "message": result['message'],
-        "old_date": old_date,
+        "old_date": result['old_date'],
         "new_date": request.new_date,
-        "affected_scenes": result.get('affected_scenes', []),
+        "affected_scenes": result['affected_scenes'],
+        "updated_scenes": result['updated_scenes'],
+        "conflicts": result['conflicts'],
         "cascade_enabled": request.auto_cascade
     }
 
 
 @router.get("/projects/{project_id}/schedule/optimization-preview")
-def get_optimization_preview(project_id: int, mode: str = "balanced", db: Session = Depends(get_db)):
+def get_optimization_preview(
+    project_id: int,
+    mode: str = "balanced",
+    skip_weekends: bool = True,
+    window_days: int = 365,
+    db: Session = Depends(get_db)
+):
     """
     Preview what auto-schedule would do WITHOUT applying changes
+    Results are cached until the project's unplanned scenes, availability or actor costs change
     """
     
-    # Get unplanned scenes
-    unplanned_scenes = db.query(Scene).filter(
+    unplanned_count = db.query(func.count(Scene.id)).filter(
         Scene.project_id == project_id,
         or_(Scene.status == 'unplanned', Scene.status == None)
-    ).all()
+    ).scalar()
     
-    if not unplanned_scenes:
+    if not unplanned_count:
         return {
             "preview": "No unplanned scenes",
             "estimated_days": 0,
             "mode": mode
         }
     
-    # Get actors and costs
-    actors = db.query(ActorAvailability).filter(ActorAvailability.project_id == project_id).all()
-    global_costs = db.query(GlobalCost).filter(GlobalCost.category == 'actor').all()
-    
-    # Configure engine
-    config = {'skip_weekends': True, 'scenes_per_day': 5}
-    engine = SchedulingEngine(unplanned_scenes, actors, config, global_costs)
-    
-    # Calculate preview (no DB changes)
-    start_date = datetime.now()
-    end_date = start_date + timedelta(days=365)
-    
-    result = engine.schedule_scenes(start_date, end_date, mode)
+    start_date, end_date, config = _preview_options(db, mode, skip_weekends, window_days)
+    fingerprint, result, cached = schedule_version_service.get_schedule_preview(
+        db, project_id, mode, start_date, end_date, config
+    )
     
     return {
         "mode": mode,
-        "total_scenes": len(unplanned_scenes),
+        "total_scenes": unplanned_count,
         "estimated_days": result['total_days'],
         "completion_date": result['completion_date'],
         "potential_conflicts": len(result['conflicts']),
-        "conflicts_preview": result['conflicts'][:5]
+        "conflicts_preview": result['conflicts'][:5],
+        "travel_km": result['route']['travel_km'] if result.get('route') else None,
+        "fingerprint": fingerprint,
+        "cached": cached
     }
 
 
+@router.get("/projects/{project_id}/schedule/versions")
+def list_schedule_versions(project_id: int, db: Session = Depends(get_db)):
+    """Saved schedule versions, newest first (without their scene lists)"""
+    versions = db.query(ScheduleVersion).filter(
+        ScheduleVersion.project_id == project_id
+    ).order_by(ScheduleVersion.id.desc()).all()
+    current = schedule_version_service.schedule_fingerprint(db, project_id) if versions else None
+    return [_version_dict(version, current) for version in versions]
+
+
+@router.post("/projects/{project_id}/schedule/versions")
+def create_schedule_version(project_id: int, request: ScheduleVersionRequest, db: Session = Depends(get_db)):
+    """Save the scheduler output for a mode as a named version (reuses a cached preview)"""
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    start_date, end_date, config = _preview_options(db, request.mode, request.skip_weekends, request.window_days)
+    version = schedule_version_service.save_version(
+        db, project_id, request.name, request.mode, start_date, end_date, config
+    )
+    return _version_dict(version, version.fingerprint, include_schedule=True)
+
+
+@router.get("/projects/{project_id}/schedule/versions/compare")
+def compare_schedule_versions(
+    project_id: int,
+    left_id: int,
+    right_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Scene-by-scene differences between two versions, or a version and the current schedule"""
+    left = _get_version(db, project_id, left_id)
+    right = _get_version(db, project_id, right_id) if right_id is not None else None
+    return schedule_version_service.compare_versions(db, left, right)
+
+
+@router.get("/projects/{project_id}/schedule/versions/{version_id}")
+def get_schedule_version(project_id: int, version_id: int, db: Session = Depends(get_db)):
+    version = _get_version(db, project_id, version_id)
+    current = schedule_version_service.schedule_fingerprint(db, project_id)
+    return _version_dict(version, current, include_schedule=True)
+
+
+@router.post("/projects/{project_id}/schedule/versions/{version_id}/apply")
+def apply_schedule_version(project_id: int, version_id: int, force: bool = False, db: Session = Depends(get_db)):
+    """
+    Apply a saved version without recomputing it
+    Refused with 409 if the scenes or costs changed since it was saved, unless force=true
+    """
+    version = _get_version(db, project_id, version_id)
+    if not force and not schedule_version_service.version_is_current(db, version):
+        raise HTTPException(
+            status_code=409,
+            detail="Scenes, availability or costs changed since this version was saved; recompute it or pass force=true"
+        )
+    
+    updated = schedule_version_service.apply_version(db, version)
+    return {
+        "success": True,
+        "message": f"Applied schedule version '{version.name}' to {len(updated)} scenes",
+        "scheduled_count": len(updated),
+        "updated_scenes": updated
+    }
+
+
+@router.delete("/projects/{project_id}/schedule/versions/{version_id}")
+def delete_schedule_version(project_id: int, version_id: int, db: Session = Depends(get_db)):
+    version = _get_version(db, project_id, version_id)
+    db.delete(version)
+    db.commit()
+    return {"success": True, "message": "Schedule version deleted"}
+
+
 @router.put("/projects/{project_id}/scenes/{scene_id}/schedule")
 def update_scene_schedule(
     project_id: int,
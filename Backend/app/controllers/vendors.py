@@ -0,0 +1,131 @@
+"""
+Vendor Master Controller
+Search vendors and look up their spend and history across projects
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+import logging
+
+from app.config.database import get_db
+from app.models import Vendor
+from app.services.vendor_service import (
+    vendor_index, normalize_vendor_name, normalize_gstin,
+    vendor_spend, vendor_history, merge_vendors
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _vendor_dict(vendor: Vendor, score: Optional[float] = None) -> dict:
+    data = {
+        "id": vendor.id,
+        "name": vendor.name,
+        "gstin": vendor.gstin,
+        "contact": vendor.contact,
+        "email": vendor.email,
+        "address": vendor.address,
+        "vendor_type": vendor.vendor_type,
+        "created_at": vendor.created_at.isoformat() if vendor.created_at else None
+    }
+    if score is not None:
+        data["match_score"] = round(score, 3)
+    return data
+
+
+@router.get("/vendors")
+def search_vendors(
+    search: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    List vendors, or find them by GSTIN or approximate name
+
+    - **search**: GSTIN (exact) or vendor name (trigram similarity)
+    """
+    try:
+        if not search:
+            vendors = db.query(Vendor).order_by(Vendor.name).limit(limit).all()
+            return {"vendors": [_vendor_dict(v) for v in vendors], "count": len(vendors)}
+
+        gstin = normalize_gstin(search)
+        if gstin:
+            vendor = db.query(Vendor).filter(Vendor.gstin == gstin).first()
+            vendors = [_vendor_dict(vendor, 1.0)] if vendor else []
+            return {"vendors": vendors, "count": len(vendors)}
+
+        ranked = vendor_index.search(db, normalize_vendor_name(search), limit=limit)
+        found = {v.id: v for v in db.query(Vendor).filter(Vendor.id.in_([vid for vid, _ in ranked])).all()}
+        vendors = [_vendor_dict(found[vid], score) for vid, score in ranked if vid in found]
+        return {"vendors": vendors, "count": len(vendors)}
+    except Exception as e:
+        logger.error(f"Error searching vendors: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to search vendors: {str(e)}")
+
+
+@router.get("/vendors/{vendor_id}")
+def get_vendor(vendor_id: int, db: Session = Depends(get_db)):
+    """Get a vendor with its total spend across all projects"""
+    vendor = db.get(Vendor, vendor_id)
+    if not vendor:
+        raise HTTPException(status_code=404, detail="Vendor not found")
+    try:
+        return {"vendor": _vendor_dict(vendor), "spend": vendor_spend(db, vendor_id)}
+    except Exception as e:
+        logger.error(f"Error fetching vendor {vendor_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch vendor: {str(e)}")
+
+
+@router.get("/vendors/{vendor_id}/spend")
+def get_vendor_spend(vendor_id: int, db: Session = Depends(get_db)):
+    """
+    Spend with a vendor per source (invoices, purchases, catering, rentals) and per project
+
+    Invoice amounts are in INR; rejected invoices are excluded.
+    """
+    if not db.query(Vendor.id).filter(Vendor.id == vendor_id).first():
+        raise HTTPException(status_code=404, detail="Vendor not found")
+    try:
+        return vendor_spend(db, vendor_id)
+    except Exception as e:
+        logger.error(f"Error computing vendor spend: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to compute vendor spend: {str(e)}")
+
+
+@router.get("/vendors/{vendor_id}/history")
+def get_vendor_history(
+    vendor_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Most recent invoices, purchases, catering orders and rentals with a vendor"""
+    if not db.query(Vendor.id).filter(Vendor.id == vendor_id).first():
+        raise HTTPException(status_code=404, detail="Vendor not found")
+    try:
+        history = vendor_history(db, vendor_id, limit)
+        return {"vendor_id": vendor_id, "history": history, "count": len(history)}
+    except Exception as e:
+        logger.error(f"Error fetching vendor history: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch vendor history: {str(e)}")
+
+
+@router.post("/vendors/{vendor_id}/merge/{target_id}")
+def merge_vendor(vendor_id: int, target_id: int, db: Session = Depends(get_db)):
+    """
+    Merge a vendor into another one, e.g. when two spellings were not matched
+
+    All records move to the target vendor and the merged vendor is deleted.
+    """
+    try:
+        target = merge_vendors(db, vendor_id, target_id)
+        return {"success": True, "message": "Vendors merged", "vendor": _vendor_dict(target)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error merging vendors: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to merge vendors: {str(e)}")
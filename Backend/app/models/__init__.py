@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Float, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, JSON, Float, Boolean, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from pydantic import BaseModel, Field
@@ -135,6 +135,9 @@ class Project(Base):
 
 class Scene(Base):
     __tablename__ = "scenes"
+    __table_args__ = (
+        Index("ix_scenes_project_id_scheduled_date", "project_id", "scheduled_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
@@ -171,6 +174,42 @@ class Scene(Base):
     # Relationships
     project = relationship("Project", back_populates="scenes")
     assigned_user = relationship("User", foreign_keys=[assigned_to])
+    # One row per actor in actors_data, kept in sync on flush (see schedule_conflict_service)
+    actor_links = relationship("SceneActor", back_populates="scene", cascade="all, delete-orphan")
+
+
+class SceneActor(Base):
+    __tablename__ = "scene_actors"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    scene_id = Column(Integer, ForeignKey("scenes.id", ondelete="CASCADE"), nullable=False, index=True)
+    actor_name = Column(String, nullable=False, index=True)
+    
+    scene = relationship("Scene", back_populates="actor_links")
+
+
+class ScheduleVersion(Base):
+    """A saved scheduler output for a project's unplanned scenes, to compare and apply later"""
+    __tablename__ = "schedule_versions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String, nullable=False)
+    mode = Column(String, nullable=False)
+    params = Column(JSON)  # Scheduler options the version was computed with
+    fingerprint = Column(String(64), nullable=False)  # Hash of the scenes/costs it was computed from
+
+    schedule = Column(JSON)  # [{scene_id, scene_number, location, scheduled_date, ...}]
+    conflicts = Column(JSON)
+    summary = Column(JSON)  # Solver stats when the mode reports them
+    total_days = Column(Integer, default=0)
+    completion_date = Column(DateTime)
+
+    status = Column(String, default="draft")  # draft, applied
+    applied_at = Column(DateTime)
+    created_at = Column(DateTime, server_default=func.now())
+
+    project = relationship("Project")
 
 
 class Actor(Base):
@@ -428,6 +467,9 @@ class ProductionTask(Base):
 
 class Promotion(Base):
     __tablename__ = "promotions"
+    __table_args__ = (
+        Index("ix_promotions_project_id_id", "project_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
@@ -446,6 +488,51 @@ class Promotion(Base):
     project = relationship("Project")
 
 
+class PromotionTracking(Base):
+    """Films whose YouTube promotion metrics are refreshed on an interval"""
+    __tablename__ = "promotion_trackings"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
+    film = Column(String, nullable=False, index=True)
+    
+    is_active = Column(Boolean, default=True)
+    refresh_interval_minutes = Column(Integer, default=360)
+    video_ids = Column(JSON)  # YouTube video IDs discovered on the first refresh
+    
+    last_refreshed_at = Column(DateTime)
+    last_error = Column(Text)
+    
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    
+    # Relationships
+    project = relationship("Project")
+    snapshots = relationship("PromotionSnapshot", back_populates="tracking", cascade="all, delete-orphan")
+
+
+class PromotionSnapshot(Base):
+    """Compact time-series row holding one video's metrics at one refresh"""
+    __tablename__ = "promotion_snapshots"
+    __table_args__ = (
+        Index("ix_promotion_snapshots_tracking_captured", "tracking_id", "captured_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    tracking_id = Column(Integer, ForeignKey("promotion_trackings.id", ondelete="CASCADE"), nullable=False)
+    video_id = Column(String(32), nullable=False)
+    captured_at = Column(DateTime, nullable=False)
+    
+    views = Column(BigInteger, default=0)
+    likes = Column(BigInteger, default=0)
+    comments = Column(BigInteger, default=0)
+    sentiment_score = Column(Float)  # 0 (negative) to 1 (positive), None if no comments
+    comments_digest = Column(String(16))  # Hash of the analysed comments, reused when unchanged
+    
+    # Relationships
+    tracking = relationship("PromotionTracking", back_populates="snapshots")
+
+
 # ============= Ticketing System for Post-Production =============
 
 class Ticket(Base):
@@ -592,6 +679,26 @@ class TicketActivity(Base):
     user = relationship("User")
 
 
+# ============= Vendor Master =============
+
+class Vendor(Base):
+    """Normalized vendor shared by invoices, purchases, catering orders and rentals across projects"""
+    __tablename__ = "vendors"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)  # Display name as first seen
+    normalized_name = Column(String, nullable=False, index=True)  # Lowercased, punctuation and legal suffixes removed
+    gstin = Column(String(15), unique=True)  # Exact-match key when known
+    
+    contact = Column(String)
+    email = Column(String)
+    address = Column(Text)
+    vendor_type = Column(String)  # catering_service, restaurant, rental_house, etc.
+    
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
 # ============= Production Operations Management =============
 
 class RentalItem(Base):
@@ -609,6 +716,7 @@ class RentalItem(Base):
     quantity = Column(Integer, default=1)
     
     # Vendor information
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), index=True)  # Resolved from the free-text fields below
     vendor_name = Column(String, nullable=False)
     vendor_contact = Column(String)
     vendor_email = Column(String)
@@ -650,6 +758,7 @@ class RentalItem(Base):
     
     # Relationships
     project = relationship("Project")
+    vendor = relationship("Vendor")
     assigned_user = relationship("User", foreign_keys=[assigned_to])
     creator = relationship("User", foreign_keys=[created_by])
 
@@ -669,6 +778,7 @@ class Purchase(Base):
     unit = Column(String)  # pcs, kg, liters, etc.
     
     # Vendor information
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), index=True)  # Resolved from the free-text fields below
     vendor_name = Column(String)
     vendor_contact = Column(String)
     purchase_location = Column(String)
@@ -711,6 +821,7 @@ class Purchase(Base):
     # Relationships
     project = relationship("Project")
     scene = relationship("Scene")
+    vendor = relationship("Vendor")
     paid_by_user = relationship("User", foreign_keys=[paid_by])
     requested_by_user = relationship("User", foreign_keys=[requested_by])
     approved_by_user = relationship("User", foreign_keys=[approved_by])
@@ -864,6 +975,7 @@ class FoodCatering(Base):
     junior_artists_count = Column(Integer, default=0)
     
     # Vendor details
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), index=True)  # Resolved from the free-text fields below
     vendor_name = Column(String, nullable=False)
     vendor_contact = Column(String)
     vendor_type = Column(String)  # catering_service, restaurant, homemade
@@ -899,6 +1011,7 @@ class FoodCatering(Base):
     
     # Relationships
     project = relationship("Project")
+    vendor = relationship("Vendor")
     ordered_by_user = relationship("User", foreign_keys=[ordered_by])
 
 
@@ -1075,6 +1188,15 @@ class JuniorArtistAttendance(Base):
 class UploadedInvoice(Base):
     """Tracks uploaded invoices with AI-extracted details and approval workflow"""
     __tablename__ = "uploaded_invoices"
+    __table_args__ = (
+        # Second-level duplicate check: same vendor, number, amount and date
+        Index(
+            "ix_uploaded_invoices_near_duplicate",
+            "vendor_gstin", "invoice_number", "total_amount", "invoice_date"
+        ),
+        # Keyset pagination of a project's invoices
+        Index("ix_uploaded_invoices_project_id_id", "project_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"))
@@ -1082,14 +1204,17 @@ class UploadedInvoice(Base):
     # Invoice identification
     invoice_number = Column(String, unique=True, nullable=False)  # Auto-generated or extracted
     invoice_type = Column(String, default="expense")  # expense, purchase, rental, service
+    batch_id = Column(String(32), index=True)  # Set when uploaded through /upload/batch
     
     # File storage
     original_filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)  # Local storage path for the image
     file_size = Column(Integer)  # File size in bytes
     mime_type = Column(String)  # image/jpeg, image/png, application/pdf
+    content_sha256 = Column(String(64), index=True)  # Hex digest of the file, used for exact-duplicate detection
     
     # AI-extracted details (from Gemini)
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), index=True)  # Resolved from the extracted vendor fields
     vendor_name = Column(String)
     vendor_address = Column(Text)
     vendor_contact = Column(String)
@@ -1103,12 +1228,15 @@ class UploadedInvoice(Base):
     discount_amount = Column(Float, default=0.0)
     total_amount = Column(Float, nullable=False)
     currency = Column(String, default="INR")
+    exchange_rate = Column(Float)  # Rate to INR used when the invoice was processed
+    amount_in_base_currency = Column(Float, index=True)  # total_amount converted to INR, for thresholds and rollups
     
     # Line items extracted (JSON array)
     line_items = Column(JSON)  # [{description: str, quantity: int, unit_price: float, amount: float}]
     
     # AI processing metadata
     ai_extraction_status = Column(String, default="pending")  # pending, processing, completed, failed
+    extraction_claimed_at = Column(DateTime)  # When a worker set "processing"; stale claims are requeued on startup
     ai_confidence_score = Column(Float)  # 0.0 to 1.0
     ai_raw_response = Column(JSON)  # Full AI response for debugging
     extraction_timestamp = Column(DateTime)
@@ -1146,6 +1274,7 @@ class UploadedInvoice(Base):
     # Status and flags
     status = Column(String, default="uploaded")  # uploaded, processing, approved, paid, archived, disputed
     is_duplicate = Column(Boolean, default=False)
+    duplicate_of_id = Column(Integer, ForeignKey("uploaded_invoices.id"))  # Earlier invoice this one duplicates
     is_recurring = Column(Boolean, default=False)
     recurrence_pattern = Column(String)  # monthly, quarterly, etc.
     
@@ -1164,10 +1293,12 @@ class UploadedInvoice(Base):
     # Relationships
     project = relationship("Project")
     budget_line = relationship("BudgetLine")
+    vendor = relationship("Vendor")
     submitter = relationship("User", foreign_keys=[submitted_by])
     approver = relationship("User", foreign_keys=[approved_by])
     verifier = relationship("User", foreign_keys=[verified_by])
     payer = relationship("User", foreign_keys=[paid_by])
+    duplicate_of = relationship("UploadedInvoice", remote_side=[id])
     approval_history = relationship("InvoiceApprovalHistory", back_populates="invoice", cascade="all, delete-orphan")
     comments = relationship("InvoiceComment", back_populates="invoice", cascade="all, delete-orphan")
 
@@ -1225,6 +1356,45 @@ class InvoiceComment(Base):
     user = relationship("User")
 
 
+class InvoiceProjectSummary(Base):
+    """Materialized per-project invoice totals; marked stale whenever a project's invoices change"""
+    __tablename__ = "invoice_project_summaries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="CASCADE"), unique=True, nullable=False)
+    
+    invoice_count = Column(Integer, default=0)
+    pending_approval_count = Column(Integer, default=0)
+    approved_count = Column(Integer, default=0)
+    rejected_count = Column(Integer, default=0)
+    duplicate_count = Column(Integer, default=0)
+    
+    # Amounts in the base currency (INR)
+    total_spend = Column(Float, default=0.0)  # Everything not rejected
+    pending_spend = Column(Float, default=0.0)
+    approved_spend = Column(Float, default=0.0)
+    paid_spend = Column(Float, default=0.0)
+    spend_by_category = Column(JSON)  # {category: amount}
+    
+    is_stale = Column(Boolean, default=True)
+    refreshed_at = Column(DateTime)
+
+
+class CurrencyRate(Base):
+    """Conversion rate to the base currency (INR), effective from a date until superseded"""
+    __tablename__ = "currency_rates"
+    __table_args__ = (
+        Index("ix_currency_rates_currency_effective_from", "currency", "effective_from", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    currency = Column(String(3), nullable=False)  # ISO code, e.g. USD
+    rate_to_base = Column(Float, nullable=False)  # 1 unit of currency in INR
+    effective_from = Column(DateTime, nullable=False)
+    source = Column(String)  # manual, rbi, etc.
+    created_at = Column(DateTime, server_default=func.now())
+
+
 class InvoiceApprovalSettings(Base):
     """Configurable approval thresholds and workflow settings"""
     __tablename__ = "invoice_approval_settings"
@@ -0,0 +1,195 @@
+"""
+Approval Policy Service
+In-memory caches for per-project approval thresholds and currency rates, so
+the approval check on each invoice is a dictionary lookup instead of a query
+"""
+
+import os
+import time
+import logging
+import threading
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import InvoiceApprovalSettings, CurrencyRate
+
+logger = logging.getLogger(__name__)
+
+BASE_CURRENCY = "INR"
+
+# Used when a currency has no rows in currency_rates
+DEFAULT_RATES_TO_BASE = {
+    'INR': 1.0,
+    'USD': 83.0,  # Approximate rate
+    'EUR': 90.0,
+    'GBP': 105.0,
+    'AED': 22.6,
+    'SGD': 62.0,
+}
+
+# Safety net for changes made by other worker processes
+POLICY_CACHE_SECONDS = int(os.getenv("APPROVAL_POLICY_CACHE_SECONDS", "300"))
+RATE_CACHE_SECONDS = int(os.getenv("CURRENCY_RATE_CACHE_SECONDS", "300"))
+
+
+class ApprovalPolicy:
+    """Compiled approval thresholds for one project (amounts in the base currency)"""
+
+    __slots__ = ("auto_approve", "manager", "director", "category_thresholds")
+
+    def __init__(
+        self,
+        auto_approve: float,
+        manager: float,
+        director: float,
+        category_thresholds: Optional[Dict[str, float]] = None
+    ):
+        self.auto_approve = auto_approve
+        self.manager = manager
+        self.director = director
+        self.category_thresholds = {
+            category: float(threshold)
+            for category, threshold in (category_thresholds or {}).items()
+            if threshold
+        }
+
+    def evaluate(self, amount: float, category: Optional[str]) -> Tuple[bool, Optional[float], str]:
+        """
+        Returns:
+            Tuple of (requires_approval, threshold_amount, approval_level)
+        """
+        # Check category-specific threshold first
+        category_threshold = self.category_thresholds.get(category) if category else None
+        if category_threshold and amount >= category_threshold:
+            return True, category_threshold, "category_manager"
+
+        if amount < self.auto_approve:
+            return False, self.auto_approve, "auto_approved"
+        elif amount < self.manager:
+            return True, self.manager, "manager"
+        elif amount < self.director:
+            return True, self.director, "director"
+        else:
+            return True, self.director, "director_and_producer"
+
+
+# Policy for projects without InvoiceApprovalSettings
+DEFAULT_POLICY = ApprovalPolicy(
+    auto_approve=1000.0,  # ₹1000 (~$12) - Small expenses only
+    manager=10000.0,  # ₹10,000 (~$120)
+    director=50000.0  # ₹50,000 (~$600)
+)
+
+
+class ApprovalPolicyCache:
+    """Per-project compiled approval policies, invalidated when settings are written"""
+
+    def __init__(self, ttl_seconds: int = POLICY_CACHE_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._policies: Dict[int, Tuple[float, ApprovalPolicy]] = {}
+
+    def get(self, db: Session, project_id: int) -> ApprovalPolicy:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._policies.get(project_id)
+            if cached and now - cached[0] < self.ttl_seconds:
+                return cached[1]
+
+        row = db.query(
+            InvoiceApprovalSettings.auto_approve_threshold,
+            InvoiceApprovalSettings.manager_approval_threshold,
+            InvoiceApprovalSettings.director_approval_threshold,
+            InvoiceApprovalSettings.category_thresholds
+        ).filter(InvoiceApprovalSettings.project_id == project_id).first()
+
+        policy = ApprovalPolicy(
+            auto_approve=row.auto_approve_threshold,
+            manager=row.manager_approval_threshold,
+            director=row.director_approval_threshold,
+            category_thresholds=row.category_thresholds
+        ) if row else DEFAULT_POLICY
+
+        with self._lock:
+            self._policies[project_id] = (now, policy)
+        return policy
+
+    def invalidate(self, project_id: Optional[int] = None) -> None:
+        """Drop one project's policy, or all of them"""
+        with self._lock:
+            if project_id is None:
+                self._policies.clear()
+            else:
+                self._policies.pop(project_id, None)
+
+
+class CurrencyRateTable:
+    """Effective-dated conversion rates held in memory and looked up by bisection"""
+
+    def __init__(self, ttl_seconds: int = RATE_CACHE_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        # currency -> (sorted effective_from dates, matching rates)
+        self._rates: Dict[str, Tuple[List[datetime], List[float]]] = {}
+
+    def _ensure_loaded(self, db: Session) -> None:
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.ttl_seconds:
+            return
+        rows = db.query(
+            CurrencyRate.currency,
+            CurrencyRate.effective_from,
+            CurrencyRate.rate_to_base
+        ).order_by(CurrencyRate.currency, CurrencyRate.effective_from).all()
+
+        rates: Dict[str, Tuple[List[datetime], List[float]]] = {}
+        for row in rows:
+            dates, values = rates.setdefault(row.currency.upper(), ([], []))
+            dates.append(row.effective_from)
+            values.append(row.rate_to_base)
+
+        with self._lock:
+            self._rates = rates
+            self._loaded_at = now
+
+    def rate(self, db: Session, currency: str, on_date: Optional[datetime] = None) -> float:
+        """Rate to the base currency in effect on a date (defaults to now)"""
+        currency = (currency or BASE_CURRENCY).upper()
+        if currency == BASE_CURRENCY:
+            return 1.0
+        self._ensure_loaded(db)
+
+        series = self._rates.get(currency)
+        if series:
+            dates, values = series
+            index = bisect_right(dates, on_date or datetime.now()) - 1
+            # Dates before the first entry use the earliest known rate
+            return values[max(index, 0)]
+        return DEFAULT_RATES_TO_BASE.get(currency, 1.0)
+
+    def to_base(
+        self,
+        db: Session,
+        amount: float,
+        currency: str,
+        on_date: Optional[datetime] = None
+    ) -> Tuple[float, float]:
+        """
+        Returns:
+            Tuple of (amount_in_base_currency, rate)
+        """
+        rate = self.rate(db, currency, on_date)
+        return round(amount * rate, 2), rate
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+
+# Singleton instances
+approval_policy_cache = ApprovalPolicyCache()
+currency_rates = CurrencyRateTable()
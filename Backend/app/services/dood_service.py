@@ -0,0 +1,276 @@
+"""
+Day Out Of Days Service
+The cast day-out-of-days report for a project's schedule: an actor x calendar
+day matrix built with NumPy from the scene_actors rows in one pass, with hold
+days, drop/pickups and travel derived from it and cost billed per
+GlobalCost.billing_cycle. Reports are cached by a fingerprint of their inputs.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+from datetime import date
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models import Scene, SceneActor, GlobalCost, Actor, ProjectActor
+from app.services.schedule_version_service import SchedulePreviewCache
+from app.services.scheduling_service import billing_cost
+
+DOOD_CACHE_SECONDS = int(os.getenv("DOOD_CACHE_SECONDS", "600"))
+DOOD_CACHE_SIZE = int(os.getenv("DOOD_CACHE_SIZE", "64"))
+DROP_PICKUP_MIN_DAYS = 10  # An actor off this many days in a row can be dropped instead of held
+DROP_PICKUP_LIMIT = 1  # Drop/pickups allowed per actor; shorter gaps beyond the limit are held
+
+# Matrix cell codes; IDLE is a day inside a stint when nobody shoots (weekends, rest days)
+OFF, WORK, HOLD, TRAVEL, IDLE = 0, 1, 2, 3, 4
+
+LEGEND = {
+    'SW': 'Start work',
+    'W': 'Work',
+    'WF': 'Work finish',
+    'SWF': 'Start work finish',
+    'WD': 'Work drop',
+    'PW': 'Pickup work',
+    'SWD': 'Start work drop',
+    'PWD': 'Pickup work drop',
+    'PWF': 'Pickup work finish',
+    'H': 'Hold',
+    'T': 'Travel',
+}
+
+dood_cache = SchedulePreviewCache(ttl_seconds=DOOD_CACHE_SECONDS, max_entries=DOOD_CACHE_SIZE)
+
+
+def _inputs(db: Session, project_id: int) -> Tuple[List, List, List]:
+    """(actor, scene, date) rows for scheduled scenes, actor billing rows and travelling actor names"""
+    rows = db.query(SceneActor.actor_name, Scene.id, Scene.scheduled_date).join(
+        Scene, Scene.id == SceneActor.scene_id
+    ).filter(
+        Scene.project_id == project_id,
+        Scene.scheduled_date.isnot(None)
+    ).order_by(Scene.id, SceneActor.id).all()
+    costs = db.query(GlobalCost.name, GlobalCost.billing_cycle, GlobalCost.cost).filter(
+        GlobalCost.category == 'actor'
+    ).order_by(GlobalCost.id).all()
+    # Actors with a transport cost travel in for each stint; scenes list actors or their characters
+    travellers = db.query(Actor.name, ProjectActor.character_name).outerjoin(
+        ProjectActor, (ProjectActor.actor_id == Actor.id) & (ProjectActor.project_id == project_id)
+    ).filter(Actor.transport_cost > 0).order_by(Actor.id).all()
+    return [tuple(row) for row in rows], [tuple(row) for row in costs], [tuple(row) for row in travellers]
+
+
+def dood_fingerprint(rows: List, costs: List, travellers: List) -> str:
+    """Hash of a report's inputs (the rows hold only strings, numbers and datetimes, whose repr is stable)"""
+    digest = hashlib.sha256()
+    for part in (rows, costs, travellers):
+        digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+
+def _limit_drops(dropped: np.ndarray, previous: np.ndarray, gaps: np.ndarray) -> None:
+    """Keep only each actor's DROP_PICKUP_LIMIT longest drops; the other gaps revert to holds"""
+    for actor in np.flatnonzero(dropped.any(axis=1)):
+        starts = np.unique(previous[actor][dropped[actor]])
+        if len(starts) <= DROP_PICKUP_LIMIT:
+            continue
+        lengths = gaps[actor][starts + 1]
+        for start in starts[np.argsort(-lengths, kind='stable')[DROP_PICKUP_LIMIT:]]:
+            dropped[actor] &= previous[actor] != start
+
+
+def build_matrix(work: np.ndarray, shoot_days: np.ndarray, travels: np.ndarray) -> np.ndarray:
+    """
+    Cell codes for an actor x day work matrix
+
+    Shoot days between an actor's first and last work day are holds, unless a
+    gap of at least DROP_PICKUP_MIN_DAYS lets them be dropped (off) and picked
+    up again. Actors who travel get a travel day before and after each stint.
+    """
+    actors, days = work.shape
+    columns = np.arange(days)
+    previous = np.maximum.accumulate(np.where(work, columns, -1), axis=1)
+    following = np.minimum.accumulate(np.where(work, columns, days)[:, ::-1], axis=1)[:, ::-1]
+    between = (previous >= 0) & (following < days) & ~work
+    gaps = following - previous - 1
+    dropped = between & (gaps >= DROP_PICKUP_MIN_DAYS)
+    _limit_drops(dropped, previous, gaps)
+
+    codes = np.zeros((actors, days), dtype=np.int8)
+    codes[work] = WORK
+    kept = between & ~dropped
+    codes[kept & shoot_days[None, :]] = HOLD
+    codes[kept & ~shoot_days[None, :]] = IDLE
+
+    engaged = codes != OFF
+    padded = np.pad(engaged, ((0, 0), (1, 1)))
+    around_stint = (padded[:, 2:] | padded[:, :-2]) & ~engaged
+    codes[around_stint & travels[:, None]] = TRAVEL
+    return codes
+
+
+def _labels(codes: np.ndarray) -> List[List[str]]:
+    """Report codes per cell: SW/W/WF/SWF on work days, PW/WD around drops, H, T or blank"""
+    work = codes == WORK
+    any_work = work.any(axis=1)
+    first = np.where(any_work, work.argmax(axis=1), -1)
+    last = np.where(any_work, work.shape[1] - 1 - work[:, ::-1].argmax(axis=1), -1)
+    columns = np.arange(codes.shape[1])
+    padded = np.pad(codes, ((0, 0), (1, 1)))
+    # A work day next to an off or travel day starts or ends a stint
+    stint_start = np.isin(padded[:, :-2], (OFF, TRAVEL))
+    stint_end = np.isin(padded[:, 2:], (OFF, TRAVEL))
+    prefix = np.where(columns[None, :] == first[:, None], 'S', np.where(stint_start, 'P', ''))
+    suffix = np.where(columns[None, :] == last[:, None], 'F', np.where(stint_end, 'D', ''))
+
+    labels = np.full(codes.shape, '', dtype='<U3')
+    labels[codes == HOLD] = 'H'
+    labels[codes == TRAVEL] = 'T'
+    labels[work] = np.char.add(np.char.add(prefix, 'W'), suffix)[work]
+    return labels.tolist()
+
+
+def compute_dood(rows: List, costs: List, travellers: List) -> Dict:
+    """Day-out-of-days report from the (actor, scene, date) rows of a schedule"""
+    if not rows:
+        return {'days': [], 'actors': [], 'totals': {}, 'legend': LEGEND}
+
+    actor_ids: Dict[str, int] = {}
+    actor_names: List[str] = []
+    actor_index = np.empty(len(rows), dtype=np.int64)
+    ordinals = np.empty(len(rows), dtype=np.int64)
+    for i, (name, _, scheduled) in enumerate(rows):
+        key = name.strip().casefold()
+        if key not in actor_ids:
+            actor_ids[key] = len(actor_names)
+            actor_names.append(name.strip())
+        actor_index[i] = actor_ids[key]
+        ordinals[i] = scheduled.toordinal()
+
+    traveller_keys = {
+        name.strip().casefold() for row in travellers for name in row if name and name.strip()
+    }
+    travels = np.array([key in traveller_keys for key in actor_ids], dtype=bool)
+    margin = 1 if travels.any() else 0
+    first_day = int(ordinals.min()) - margin
+    day_count = int(ordinals.max()) + margin - first_day + 1
+
+    work = np.zeros((len(actor_names), day_count), dtype=bool)
+    work[actor_index, ordinals - first_day] = True
+    scene_counts = np.zeros((len(actor_names), day_count), dtype=np.int32)
+    np.add.at(scene_counts, (actor_index, ordinals - first_day), 1)
+
+    shoot_days = work.any(axis=0)
+    codes = build_matrix(work, shoot_days, travels)
+    labels = _labels(codes)
+
+    billing = {}
+    for name, cycle, cost in costs:
+        if name:
+            billing.setdefault(name.strip().casefold(), (cycle, cost or 0))
+
+    # Stints are runs of engaged days; weekly and monthly billing rounds up per stint
+    padded = np.pad((codes != OFF).astype(np.int8), ((0, 0), (1, 1)))
+    edges = np.diff(padded, axis=1)
+    stint_starts, stint_ends = np.argwhere(edges == 1), np.argwhere(edges == -1)
+    stint_lengths = stint_ends[:, 1] - stint_starts[:, 1]
+    stints: Dict[int, List[int]] = {}
+    for actor, length in zip(stint_starts[:, 0], stint_lengths):
+        stints.setdefault(int(actor), []).append(int(length))
+
+    counts = {code: (codes == code).sum(axis=1) for code in (WORK, HOLD, TRAVEL)}
+    first_work = work.argmax(axis=1)
+    last_work = day_count - 1 - work[:, ::-1].argmax(axis=1)
+    days = [date.fromordinal(first_day + offset) for offset in range(day_count)]
+
+    actors = []
+    for actor, key in enumerate(actor_ids):
+        cycle, rate = billing.get(key, (None, 0))
+        actor_stints = stints.get(actor, [])
+        paid_days = int(counts[WORK][actor] + counts[HOLD][actor] + counts[TRAVEL][actor])
+        if cycle == 'daily':
+            cost = billing_cost(cycle, rate, paid_days)
+        else:
+            cost = sum(billing_cost(cycle, rate, length) for length in actor_stints) if cycle else 0.0
+        actors.append({
+            'name': actor_names[actor],
+            'codes': labels[actor],
+            'scenes': scene_counts[actor].tolist(),
+            'start_date': days[first_work[actor]],
+            'finish_date': days[last_work[actor]],
+            'work_days': int(counts[WORK][actor]),
+            'hold_days': int(counts[HOLD][actor]),
+            'travel_days': int(counts[TRAVEL][actor]),
+            'paid_days': paid_days,
+            'drop_pickups': max(len(actor_stints) - 1, 0),
+            'billing_cycle': cycle,
+            'rate': rate,
+            'cost': float(cost)
+        })
+    actors.sort(key=lambda item: (item['start_date'], -item['work_days'], item['name'].casefold()))
+
+    return {
+        'days': days,
+        'shoot_days': shoot_days.tolist(),
+        'actors': actors,
+        'totals': {
+            'actors': len(actors),
+            'shoot_days': int(shoot_days.sum()),
+            'work_days': int(counts[WORK].sum()),
+            'hold_days': int(counts[HOLD].sum()),
+            'travel_days': int(counts[TRAVEL].sum()),
+            'cost': float(sum(item['cost'] for item in actors))
+        },
+        'legend': LEGEND
+    }
+
+
+def get_dood(db: Session, project_id: int) -> Tuple[str, Dict, bool]:
+    """
+    Day-out-of-days report for a project, computed and serialized once per input fingerprint
+
+    Returns:
+        Tuple of (fingerprint, entry, cached); the entry holds the 'report' and
+        its JSON 'body', and is shared, so treat it as read-only
+    """
+    rows, costs, travellers = _inputs(db, project_id)
+    fingerprint = dood_fingerprint(rows, costs, travellers)
+    key = (project_id, fingerprint)
+    entry = dood_cache.get(key)
+    if entry is not None:
+        return fingerprint, entry, True
+    report = compute_dood(rows, costs, travellers)
+    body = json.dumps({'project_id': project_id, 'fingerprint': fingerprint, **report}, default=str)
+    entry = {'report': report, 'body': body.encode()}
+    dood_cache.put(key, entry)
+    return fingerprint, entry, False
+
+
+def dood_export(entry: Dict) -> str:
+    """CSV sheet for a cached report, built on first export"""
+    if 'csv' not in entry:
+        entry['csv'] = dood_csv(entry['report'])
+    return entry['csv']
+
+
+def dood_csv(report: Dict) -> str:
+    """The report as a CSV sheet: one row per actor, one column per day, then the totals"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(
+        ['Actor'] + [day.isoformat() for day in report['days']]
+        + ['Work', 'Hold', 'Travel', 'Paid', 'Drop/Pickups', 'Start', 'Finish', 'Billing', 'Rate', 'Cost']
+    )
+    for actor in report['actors']:
+        writer.writerow(
+            [actor['name']] + actor['codes'] + [
+                actor['work_days'], actor['hold_days'], actor['travel_days'], actor['paid_days'],
+                actor['drop_pickups'], actor['start_date'].isoformat(), actor['finish_date'].isoformat(),
+                actor['billing_cycle'] or '', actor['rate'], round(actor['cost'], 2)
+            ]
+        )
+    return buffer.getvalue()
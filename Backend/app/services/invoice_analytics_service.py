@@ -0,0 +1,162 @@
+"""
+Invoice Analytics Service
+Spend rollups computed with GROUP BY in the database, and the materialized
+per-project summary that is marked stale whenever a project's invoices change
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, case, func, update
+from sqlalchemy.orm import Session
+
+from app.models import UploadedInvoice, InvoiceProjectSummary
+
+logger = logging.getLogger(__name__)
+
+GROUP_BY_FIELDS = ("category", "vendor", "department", "month", "status")
+
+APPROVED_STATUSES = ("approved", "auto_approved")
+
+# Base-currency amount, falling back to the raw total for rows not yet converted
+BASE_AMOUNT = func.coalesce(UploadedInvoice.amount_in_base_currency, UploadedInvoice.total_amount)
+
+
+def _sum_if(condition):
+    return func.coalesce(func.sum(case((condition, BASE_AMOUNT), else_=0.0)), 0.0)
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _month_expression(db: Session):
+    invoice_month = func.coalesce(UploadedInvoice.invoice_date, UploadedInvoice.created_at)
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(func.date_trunc("month", invoice_month), "YYYY-MM")
+    return func.strftime("%Y-%m", invoice_month)
+
+
+def spend_rollup(
+    db: Session,
+    project_id: int,
+    group_by: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_rejected: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Spend per category, vendor, department, month or approval status
+
+    Amounts are in the base currency; groups are ordered by spend, months chronologically.
+    """
+    if group_by == "month":
+        key = _month_expression(db)
+    elif group_by == "vendor":
+        key = func.coalesce(UploadedInvoice.vendor_name, "Unknown")
+    elif group_by == "status":
+        key = UploadedInvoice.approval_status
+    else:
+        key = func.coalesce(getattr(UploadedInvoice, group_by), "Uncategorized")
+    key = key.label("key")
+
+    query = db.query(
+        key,
+        func.count(UploadedInvoice.id).label("invoice_count"),
+        func.coalesce(func.sum(BASE_AMOUNT), 0.0).label("total_amount"),
+        func.avg(BASE_AMOUNT).label("average_amount"),
+        func.max(BASE_AMOUNT).label("max_amount"),
+        _sum_if(UploadedInvoice.approval_status == "pending").label("pending_amount")
+    ).filter(UploadedInvoice.project_id == project_id)
+
+    if not include_rejected:
+        query = query.filter(UploadedInvoice.approval_status != "rejected")
+    if start:
+        query = query.filter(func.coalesce(UploadedInvoice.invoice_date, UploadedInvoice.created_at) >= start)
+    if end:
+        query = query.filter(func.coalesce(UploadedInvoice.invoice_date, UploadedInvoice.created_at) <= end)
+
+    query = query.group_by(key)
+    query = query.order_by(key) if group_by == "month" else query.order_by(func.sum(BASE_AMOUNT).desc())
+
+    return [
+        {
+            group_by: row.key,
+            "invoice_count": row.invoice_count,
+            "total_amount": round(row.total_amount or 0.0, 2),
+            "average_amount": round(row.average_amount or 0.0, 2),
+            "max_amount": round(row.max_amount or 0.0, 2),
+            "pending_amount": round(row.pending_amount or 0.0, 2)
+        }
+        for row in query.all()
+    ]
+
+
+def refresh_project_summary(db: Session, project_id: int) -> InvoiceProjectSummary:
+    """Recompute a project's summary row from two aggregate queries and store it"""
+    not_rejected = UploadedInvoice.approval_status != "rejected"
+    totals = db.query(
+        func.count(UploadedInvoice.id).label("invoice_count"),
+        _count_if(UploadedInvoice.approval_status == "pending").label("pending_approval_count"),
+        _count_if(UploadedInvoice.approval_status.in_(APPROVED_STATUSES)).label("approved_count"),
+        _count_if(UploadedInvoice.approval_status == "rejected").label("rejected_count"),
+        _count_if(UploadedInvoice.is_duplicate == True).label("duplicate_count"),
+        _sum_if(not_rejected).label("total_spend"),
+        _sum_if(UploadedInvoice.approval_status == "pending").label("pending_spend"),
+        _sum_if(UploadedInvoice.approval_status.in_(APPROVED_STATUSES)).label("approved_spend"),
+        _sum_if(UploadedInvoice.payment_status == "paid").label("paid_spend")
+    ).filter(UploadedInvoice.project_id == project_id).one()
+
+    by_category = db.query(
+        func.coalesce(UploadedInvoice.category, "Uncategorized"),
+        func.sum(BASE_AMOUNT)
+    ).filter(
+        UploadedInvoice.project_id == project_id,
+        not_rejected
+    ).group_by(func.coalesce(UploadedInvoice.category, "Uncategorized")).all()
+
+    summary = db.query(InvoiceProjectSummary).filter(
+        InvoiceProjectSummary.project_id == project_id
+    ).first()
+    if not summary:
+        summary = InvoiceProjectSummary(project_id=project_id)
+        db.add(summary)
+
+    for field in (
+        "invoice_count", "pending_approval_count", "approved_count", "rejected_count", "duplicate_count"
+    ):
+        setattr(summary, field, int(getattr(totals, field) or 0))
+    for field in ("total_spend", "pending_spend", "approved_spend", "paid_spend"):
+        setattr(summary, field, round(getattr(totals, field) or 0.0, 2))
+    summary.spend_by_category = {category: round(amount or 0.0, 2) for category, amount in by_category}
+    summary.is_stale = False
+    summary.refreshed_at = datetime.now()
+    db.commit()
+    return summary
+
+
+def get_project_summary(db: Session, project_id: int) -> InvoiceProjectSummary:
+    """Stored summary for a project, refreshed first if invoices changed since it was built"""
+    summary = db.query(InvoiceProjectSummary).filter(
+        InvoiceProjectSummary.project_id == project_id
+    ).first()
+    if summary and not summary.is_stale:
+        return summary
+    return refresh_project_summary(db, project_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_summaries_stale(session: Session, flush_context) -> None:
+    """Flag summaries of projects whose invoices were written, in the same transaction"""
+    project_ids = {
+        obj.project_id
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, UploadedInvoice) and obj.project_id is not None
+    }
+    if project_ids:
+        session.connection().execute(
+            update(InvoiceProjectSummary.__table__)
+            .where(InvoiceProjectSummary.__table__.c.project_id.in_(project_ids))
+            .values(is_stale=True)
+        )
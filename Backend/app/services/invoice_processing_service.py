@@ -4,40 +4,106 @@ Extracts details from invoice images and manages approval workflow
 """
 
 import os
+import io
 import json
+import time
+import uuid
 import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, BinaryIO
 from pathlib import Path
+import httpx
 from google import genai
 from google.genai import types
 
 from sqlalchemy.orm import Session
 from app.models import (
     UploadedInvoice, 
-    InvoiceApprovalSettings, 
     InvoiceApprovalHistory,
     User
 )
+from app.services.invoice_storage import invoice_storage, resolve_local_path
+from app.services.approval_policy_service import approval_policy_cache, currency_rates
+from app.utils.rate_limiter import RateLimiter
+from app.utils.image_preprocessing import preprocess_invoice_image
+from app.utils.invoice_text_parser import extract_pdf_text, parse_invoice_text
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Storage configuration
-UPLOAD_DIRECTORY = Path("uploaded_invoices")
-UPLOAD_DIRECTORY.mkdir(exist_ok=True)
+# One long-lived Gemini client per process; its keep-alive pool removes TLS setup from each upload
+GEMINI_POOL_CONNECTIONS = int(os.getenv("GEMINI_POOL_CONNECTIONS", "8"))
+GEMINI_KEEPALIVE_SECONDS = float(os.getenv("GEMINI_KEEPALIVE_SECONDS", "120"))
+# /api/invoice/health reuses a probe result for this long
+GEMINI_HEALTH_PROBE_SECONDS = int(os.getenv("GEMINI_HEALTH_PROBE_SECONDS", "60"))
 
-# Currency conversion rates (to INR)
-CURRENCY_TO_INR = {
-    'INR': 1.0,
-    'USD': 83.0,  # Approximate rate
-    'EUR': 90.0,
-    'GBP': 105.0,
-    'AED': 22.6,
-    'SGD': 62.0,
+# Shared Gemini limits for every extraction path (single, async and batch uploads)
+gemini_rate_limiter = RateLimiter(
+    max_concurrent=int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")),
+    requests_per_minute=int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+)
+
+MIME_TYPE_MAP = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.pdf': 'application/pdf',
+    '.webp': 'image/webp'
 }
 
+# Image pre-processing before extraction (the original file stays on disk for audit)
+IMAGE_PREPROCESS_ENABLED = os.getenv("INVOICE_IMAGE_PREPROCESS", "true").lower() == "true"
+IMAGE_PREPROCESS_PROCESSES = int(os.getenv("INVOICE_IMAGE_PREPROCESS_PROCESSES", "2"))
+IMAGE_TARGET_DPI = int(os.getenv("INVOICE_IMAGE_TARGET_DPI", "150"))
+IMAGE_OUTPUT_FORMAT = os.getenv("INVOICE_IMAGE_FORMAT", "JPEG")
+IMAGE_CROP_TO_DOCUMENT = os.getenv("INVOICE_IMAGE_CROP", "true").lower() == "true"
+
+# Digitally generated PDFs are parsed from their text layer before anything goes to Gemini
+PDF_TEXT_FAST_PATH = os.getenv("INVOICE_PDF_TEXT_FAST_PATH", "true").lower() == "true"
+PDF_TEXT_MIN_CHARS = int(os.getenv("INVOICE_PDF_TEXT_MIN_CHARS", "200"))
+PDF_TEXT_MAX_PROMPT_CHARS = int(os.getenv("INVOICE_PDF_TEXT_MAX_PROMPT_CHARS", "8000"))
+# Local parses at or above this confidence skip the LLM entirely
+PDF_TEXT_LOCAL_CONFIDENCE = float(os.getenv("INVOICE_PDF_TEXT_LOCAL_CONFIDENCE", "0.85"))
+
+TEXT_EXTRACTION_PROMPT = """Extract the invoice below into one JSON object with keys:
+vendor_name, vendor_address, vendor_contact, vendor_gstin, invoice_number, invoice_date (YYYY-MM-DD),
+due_date (YYYY-MM-DD), subtotal, tax_amount, discount_amount, total_amount, currency,
+line_items [{{description, quantity, unit_price, amount}}], category (catering, equipment, props,
+transport, accommodation, services, utilities, ...), payment_terms, notes, confidence (0.0-1.0).
+Use null for missing fields and numbers (not strings) for amounts. Return ONLY the JSON.
+Fields parsed locally (verify and correct them): {hints}
+
+Invoice text:
+{text}"""
+
+_preprocess_pool: Optional[ProcessPoolExecutor] = None
+_preprocess_pool_lock = threading.Lock()
+
+
+def get_preprocess_pool() -> ProcessPoolExecutor:
+    """Shared process pool for CPU-bound image work (spawned, so it is safe from threads)"""
+    global _preprocess_pool
+    with _preprocess_pool_lock:
+        if _preprocess_pool is None:
+            _preprocess_pool = ProcessPoolExecutor(
+                max_workers=IMAGE_PREPROCESS_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _preprocess_pool
+
+
+def shutdown_preprocess_pool() -> None:
+    global _preprocess_pool
+    with _preprocess_pool_lock:
+        if _preprocess_pool is not None:
+            _preprocess_pool.shutdown(wait=False, cancel_futures=True)
+            _preprocess_pool = None
+
 
 class InvoiceProcessingService:
     """Service for processing invoices with AI extraction and approval workflow"""
@@ -49,8 +115,47 @@ class InvoiceProcessingService:
         if not api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
         
-        self.client = genai.Client(api_key=api_key)
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(client_args={
+                "limits": httpx.Limits(
+                    max_connections=GEMINI_POOL_CONNECTIONS,
+                    max_keepalive_connections=GEMINI_POOL_CONNECTIONS,
+                    keepalive_expiry=GEMINI_KEEPALIVE_SECONDS
+                )
+            })
+        )
         self.model = "gemini-2.5-flash"
+        
+        self._health: Optional[Dict[str, Any]] = None
+        self._health_checked_at = 0.0
+        self._health_lock = threading.Lock()
+    
+    def probe(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Check that Gemini is reachable with a lightweight model lookup
+        
+        The result is cached for GEMINI_HEALTH_PROBE_SECONDS unless force is set.
+        The call also opens a pooled connection, which is how warm-up works.
+        """
+        with self._health_lock:
+            now = time.monotonic()
+            if not force and self._health and now - self._health_checked_at < GEMINI_HEALTH_PROBE_SECONDS:
+                return self._health
+            
+            started = time.perf_counter()
+            try:
+                self.client.models.get(model=self.model)
+                self._health = {
+                    "status": "healthy",
+                    "model": self.model,
+                    "latency_ms": round((time.perf_counter() - started) * 1000, 1)
+                }
+            except Exception as e:
+                self._health = {"status": "unhealthy", "model": self.model, "error": str(e)}
+            self._health["checked_at"] = datetime.now().isoformat()
+            self._health_checked_at = now
+            return self._health
     
     def save_invoice_file(
         self, 
@@ -59,7 +164,7 @@ class InvoiceProcessingService:
         project_id: int
     ) -> Tuple[str, str]:
         """
-        Save uploaded invoice file to local storage
+        Save uploaded invoice file to invoice storage
         
         Args:
             file_bytes: File content as bytes
@@ -69,33 +174,40 @@ class InvoiceProcessingService:
         Returns:
             Tuple of (file_path, mime_type)
         """
-        # Create project-specific directory
-        project_dir = UPLOAD_DIRECTORY / f"project_{project_id}"
-        project_dir.mkdir(exist_ok=True)
-        
-        # Generate unique filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_extension = Path(filename).suffix.lower()
-        unique_filename = f"invoice_{timestamp}_{filename}"
-        
-        file_path = project_dir / unique_filename
-        
-        # Save file
-        with open(file_path, 'wb') as f:
-            f.write(file_bytes)
-        
-        # Determine MIME type
-        mime_type_map = {
-            '.jpg': 'image/jpeg',
-            '.jpeg': 'image/jpeg',
-            '.png': 'image/png',
-            '.pdf': 'application/pdf',
-            '.webp': 'image/webp'
-        }
-        mime_type = mime_type_map.get(file_extension, 'application/octet-stream')
-        
-        logger.info(f"Saved invoice file: {file_path}")
-        return str(file_path), mime_type
+        file_path, mime_type, _, _ = self.save_invoice_stream(
+            io.BytesIO(file_bytes), filename, project_id, len(file_bytes)
+        )
+        return file_path, mime_type
+    
+    def save_invoice_stream(
+        self,
+        stream: BinaryIO,
+        filename: str,
+        project_id: int,
+        max_size: int
+    ) -> Tuple[str, str, int, str]:
+        """
+        Copy an invoice from a file-like object into content-addressed storage
+        in chunks, hashing it on the way so duplicates can be found without re-reading
+        
+        Args:
+            stream: Readable binary stream (e.g. a ZIP archive member)
+            filename: Original filename (used for the MIME type)
+            project_id: Associated project ID
+            max_size: Maximum allowed size in bytes
+            
+        Returns:
+            Tuple of (file_path, mime_type, file_size, content_sha256)
+            
+        Raises:
+            ValueError: If the stream is larger than max_size (nothing is stored)
+        """
+        content_sha256, file_size = invoice_storage.save_stream(stream, max_size)
+        file_path = invoice_storage.uri(content_sha256)
+        
+        mime_type = MIME_TYPE_MAP.get(Path(filename).suffix.lower(), 'application/octet-stream')
+        logger.info(f"Stored invoice file for project {project_id}: {file_path}")
+        return file_path, mime_type, file_size, content_sha256
     
     def extract_invoice_details(
         self, 
@@ -113,9 +225,35 @@ class InvoiceProcessingService:
             Dictionary containing extracted invoice details
         """
         try:
-            # Read the file
-            with open(file_path, 'rb') as f:
-                file_bytes = f.read()
+            # Text-layer PDFs: parse locally, and only send compact text to Gemini if needed
+            pdf_text = self._pdf_text_layer(file_path) if mime_type == 'application/pdf' else None
+            if pdf_text:
+                parsed = parse_invoice_text(pdf_text)
+                if parsed['confidence'] >= PDF_TEXT_LOCAL_CONFIDENCE:
+                    parsed['extraction_timestamp'] = datetime.now().isoformat()
+                    parsed['ai_model'] = 'local-text-parser'
+                    parsed['extraction_path'] = 'pdf_text_local'
+                    logger.info(f"Parsed PDF invoice locally with confidence: {parsed['confidence']}")
+                    return parsed
+                
+                hints = {k: v for k, v in parsed.items() if v not in (None, [], 0.0) and k != 'confidence'}
+                with gemini_rate_limiter:
+                    response = self.client.models.generate_content(
+                        model=self.model,
+                        contents=[TEXT_EXTRACTION_PROMPT.format(
+                            hints=json.dumps(hints, ensure_ascii=False),
+                            text=pdf_text[:PDF_TEXT_MAX_PROMPT_CHARS]
+                        )]
+                    )
+                extracted_data = self._parse_model_json(response.text)
+                extracted_data['extraction_timestamp'] = datetime.now().isoformat()
+                extracted_data['ai_model'] = self.model
+                extracted_data['extraction_path'] = 'pdf_text_llm'
+                logger.info(f"Extracted PDF invoice from text layer with confidence: {extracted_data.get('confidence', 'N/A')}")
+                return extracted_data
+            
+            # Read the file (images are shrunk first; the original stays on disk)
+            file_bytes, mime_type, preprocessing = self._prepare_file_payload(file_path, mime_type)
             
             # Create detailed prompt for invoice extraction
             prompt = """
@@ -189,41 +327,33 @@ class InvoiceProcessingService:
             """
             
             # Call Gemini API
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=[
-                    types.Part.from_bytes(
-                        data=file_bytes,
-                        mime_type=mime_type
-                    ),
-                    prompt
-                ]
-            )
+            with gemini_rate_limiter:
+                response = self.client.models.generate_content(
+                    model=self.model,
+                    contents=[
+                        types.Part.from_bytes(
+                            data=file_bytes,
+                            mime_type=mime_type
+                        ),
+                        prompt
+                    ]
+                )
             
             # Extract JSON from response
-            response_text = response.text.strip()
-            
-            # Remove markdown code blocks if present
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.startswith('```'):
-                response_text = response_text[3:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
-            
-            # Parse JSON
-            extracted_data = json.loads(response_text)
+            extracted_data = self._parse_model_json(response.text)
             
             # Add extraction metadata
             extracted_data['extraction_timestamp'] = datetime.now().isoformat()
             extracted_data['ai_model'] = self.model
+            extracted_data['extraction_path'] = 'document'
+            if preprocessing:
+                extracted_data['preprocessing'] = preprocessing
             
             logger.info(f"Successfully extracted invoice details with confidence: {extracted_data.get('confidence', 'N/A')}")
             return extracted_data
             
         except json.JSONDecodeError as e:
+            response_text = response.text
             logger.error(f"Failed to parse AI response as JSON: {e}")
             logger.error(f"Response text: {response_text}")
             return {
@@ -238,13 +368,79 @@ class InvoiceProcessingService:
                 'confidence': 0.0
             }
     
+    @staticmethod
+    def _parse_model_json(response_text: str) -> Dict[str, Any]:
+        """Parse a model reply as JSON, stripping markdown code fences if present"""
+        response_text = response_text.strip()
+        if response_text.startswith('```json'):
+            response_text = response_text[7:]
+        if response_text.startswith('```'):
+            response_text = response_text[3:]
+        if response_text.endswith('```'):
+            response_text = response_text[:-3]
+        return json.loads(response_text.strip())
+    
+    def _pdf_text_layer(self, file_path: str) -> Optional[str]:
+        """Text layer of a PDF when the fast path is enabled and it has enough text, else None"""
+        if not PDF_TEXT_FAST_PATH:
+            return None
+        try:
+            text = extract_pdf_text(file_path)
+        except Exception as e:
+            logger.warning(f"Could not read PDF text layer, sending document: {e}")
+            return None
+        return text if len(text.strip()) >= PDF_TEXT_MIN_CHARS else None
+    
+    def _prepare_file_payload(
+        self,
+        file_path: str,
+        mime_type: str
+    ) -> Tuple[bytes, str, Optional[Dict[str, Any]]]:
+        """
+        Return the bytes to send to Gemini for a stored invoice
+        
+        Images are EXIF-rotated, converted to grayscale, cropped, downscaled and
+        re-encoded in the pre-processing pool. PDFs, disabled pre-processing, failures
+        and results that would not be smaller fall back to the original bytes.
+        
+        Returns:
+            Tuple of (file_bytes, mime_type, preprocessing_info or None)
+        """
+        original_size = os.path.getsize(file_path)
+        
+        if IMAGE_PREPROCESS_ENABLED and mime_type.startswith('image/'):
+            try:
+                processed, processed_mime, info = get_preprocess_pool().submit(
+                    preprocess_invoice_image,
+                    file_path,
+                    IMAGE_TARGET_DPI,
+                    IMAGE_OUTPUT_FORMAT,
+                    75,
+                    IMAGE_CROP_TO_DOCUMENT
+                ).result()
+                if len(processed) < original_size:
+                    info['original_bytes'] = original_size
+                    info['sent_bytes'] = len(processed)
+                    logger.info(f"Pre-processed invoice image: {original_size} -> {len(processed)} bytes")
+                    return processed, processed_mime, info
+            except BrokenProcessPool as e:
+                # A crashed worker poisons the pool; start a fresh one next time
+                logger.warning(f"Image pre-processing pool broke, sending original: {e}")
+                shutdown_preprocess_pool()
+            except Exception as e:
+                logger.warning(f"Image pre-processing failed, sending original: {e}")
+        
+        with open(file_path, 'rb') as f:
+            return f.read(), mime_type, None
+    
     def check_approval_required(
         self,
         total_amount: float,
         category: Optional[str],
         project_id: int,
         db: Session,
-        currency: str = 'INR'
+        currency: str = 'INR',
+        invoice_date: Optional[datetime] = None
     ) -> Tuple[bool, Optional[float], str]:
         """
         Check if invoice requires approval based on amount and category
@@ -255,45 +451,14 @@ class InvoiceProcessingService:
             project_id: Project ID
             db: Database session
             currency: Invoice currency code
+            invoice_date: Date whose exchange rate applies (defaults to today)
             
         Returns:
             Tuple of (requires_approval, threshold_amount, approval_level)
         """
         # Convert amount to INR for comparison
-        conversion_rate = CURRENCY_TO_INR.get(currency.upper(), 1.0)
-        amount_in_inr = total_amount * conversion_rate
-        
-        logger.info(f"Currency conversion: {total_amount} {currency} = {amount_in_inr} INR (rate: {conversion_rate})")
-        
-        # Get approval settings for project
-        settings = db.query(InvoiceApprovalSettings).filter(
-            InvoiceApprovalSettings.project_id == project_id
-        ).first()
-        
-        # Use default settings if not configured
-        if not settings:
-            settings = InvoiceApprovalSettings(
-                project_id=project_id,
-                auto_approve_threshold=1000.0,  # ₹1000 (~$12) - Small expenses only
-                manager_approval_threshold=10000.0,  # ₹10,000 (~$120)
-                director_approval_threshold=50000.0  # ₹50,000 (~$600)
-            )
-        
-        # Check category-specific threshold first
-        if category and settings.category_thresholds:
-            category_threshold = settings.category_thresholds.get(category)
-            if category_threshold and amount_in_inr >= category_threshold:
-                return True, category_threshold, "category_manager"
-        
-        # Check general thresholds (using INR-converted amount)
-        if amount_in_inr < settings.auto_approve_threshold:
-            return False, settings.auto_approve_threshold, "auto_approved"
-        elif amount_in_inr < settings.manager_approval_threshold:
-            return True, settings.manager_approval_threshold, "manager"
-        elif amount_in_inr < settings.director_approval_threshold:
-            return True, settings.director_approval_threshold, "director"
-        else:
-            return True, settings.director_approval_threshold, "director_and_producer"
+        amount_in_inr, _ = currency_rates.to_base(db, total_amount, currency, invoice_date)
+        return approval_policy_cache.get(db, project_id).evaluate(amount_in_inr, category)
     
     def create_invoice_record(
         self,
@@ -304,7 +469,8 @@ class InvoiceProcessingService:
         original_filename: str,
         mime_type: str,
         file_size: int,
-        extracted_data: Dict[str, Any]
+        extracted_data: Dict[str, Any],
+        content_sha256: Optional[str] = None
     ) -> UploadedInvoice:
         """
         Create invoice record in database with extracted data
@@ -318,94 +484,22 @@ class InvoiceProcessingService:
             mime_type: File MIME type
             file_size: File size in bytes
             extracted_data: Data extracted by AI
+            content_sha256: Hex SHA-256 of the file
             
         Returns:
             Created UploadedInvoice instance
         """
-        # Generate unique invoice number if not extracted
-        invoice_number = extracted_data.get('invoice_number')
-        if not invoice_number:
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            invoice_number = f"INV-{project_id}-{timestamp}"
-        
-        # Parse dates
-        invoice_date = None
-        if extracted_data.get('invoice_date'):
-            try:
-                invoice_date = datetime.strptime(extracted_data['invoice_date'], '%Y-%m-%d')
-            except:
-                pass
-        
-        due_date = None
-        if extracted_data.get('due_date'):
-            try:
-                due_date = datetime.strptime(extracted_data['due_date'], '%Y-%m-%d')
-            except:
-                pass
-        
-        # Get confidence score
-        confidence = extracted_data.get('confidence', 0.0)
-        
-        # Determine if extraction was successful
-        extraction_status = "completed" if confidence > 0.5 else "failed"
-        if extracted_data.get('error'):
-            extraction_status = "failed"
-        
-        # Check if approval is required
-        total_amount = extracted_data.get('total_amount', 0.0)
-        category = extracted_data.get('category')
-        currency = extracted_data.get('currency', 'INR')
-        requires_approval, threshold, approval_level = self.check_approval_required(
-            total_amount, category, project_id, db, currency
-        )
-        
-        # Create invoice record
         invoice = UploadedInvoice(
             project_id=project_id,
-            invoice_number=invoice_number,
             original_filename=original_filename,
             file_path=file_path,
             file_size=file_size,
             mime_type=mime_type,
-            
-            # Extracted vendor details
-            vendor_name=extracted_data.get('vendor_name'),
-            vendor_address=extracted_data.get('vendor_address'),
-            vendor_contact=extracted_data.get('vendor_contact'),
-            vendor_gstin=extracted_data.get('vendor_gstin'),
-            
-            # Extracted invoice details
-            invoice_date=invoice_date,
-            due_date=due_date,
-            
-            # Financial details
-            subtotal=extracted_data.get('subtotal'),
-            tax_amount=extracted_data.get('tax_amount'),
-            discount_amount=extracted_data.get('discount_amount', 0.0),
-            total_amount=total_amount,
-            currency=extracted_data.get('currency', 'INR'),
-            
-            # Line items
-            line_items=extracted_data.get('line_items', []),
-            
-            # AI processing
-            ai_extraction_status=extraction_status,
-            ai_confidence_score=confidence,
-            ai_raw_response=extracted_data,
-            extraction_timestamp=datetime.now(),
-            
-            # Categorization
-            category=category,
-            
-            # Approval workflow
-            approval_required=requires_approval,
-            approval_threshold=threshold if requires_approval else None,
-            approval_status="pending" if requires_approval else "auto_approved",
-            
-            # Tracking
+            content_sha256=content_sha256,
             submitted_by=user_id,
             status="uploaded"
         )
+        requires_approval = self.apply_extracted_data(db, invoice, extracted_data)
         
         db.add(invoice)
         db.commit()
@@ -427,6 +521,294 @@ class InvoiceProcessingService:
         logger.info(f"Created invoice record: {invoice.invoice_number} (Approval required: {requires_approval})")
         return invoice
     
+    def create_pending_invoice(
+        self,
+        db: Session,
+        project_id: int,
+        user_id: int,
+        file_path: str,
+        original_filename: str,
+        mime_type: str,
+        file_size: int,
+        category: Optional[str] = None,
+        content_sha256: Optional[str] = None
+    ) -> UploadedInvoice:
+        """
+        Create a placeholder invoice record whose AI extraction runs later
+        
+        The record gets a temporary invoice number and a zero total until
+        apply_extracted_data fills in the extracted details.
+        
+        Returns:
+            Created UploadedInvoice instance with ai_extraction_status "pending"
+        """
+        return self.create_pending_invoices(
+            db=db,
+            project_id=project_id,
+            user_id=user_id,
+            files=[{
+                'file_path': file_path,
+                'original_filename': original_filename,
+                'mime_type': mime_type,
+                'file_size': file_size,
+                'content_sha256': content_sha256
+            }],
+            category=category
+        )[0]
+    
+    def create_pending_invoices(
+        self,
+        db: Session,
+        project_id: int,
+        user_id: int,
+        files: List[Dict[str, Any]],
+        category: Optional[str] = None,
+        department: Optional[str] = None,
+        batch_id: Optional[str] = None
+    ) -> List[UploadedInvoice]:
+        """
+        Bulk-insert pending invoices and their "submitted" history rows
+        
+        Args:
+            db: Database session (flushed, not committed)
+            project_id: Project ID
+            user_id: Uploading user
+            files: Dicts with file_path, original_filename, mime_type, file_size
+                and optionally content_sha256
+            category: Optional category applied to every invoice
+            department: Optional department applied to every invoice
+            batch_id: Optional batch identifier shared by the invoices
+            
+        Returns:
+            Created invoices, in the same order as files
+        """
+        invoices = [
+            UploadedInvoice(
+                project_id=project_id,
+                invoice_number=f"PENDING-{project_id}-{uuid.uuid4().hex[:12]}",
+                original_filename=f['original_filename'],
+                file_path=f['file_path'],
+                file_size=f['file_size'],
+                mime_type=f['mime_type'],
+                content_sha256=f.get('content_sha256'),
+                total_amount=0.0,
+                category=category,
+                department=department,
+                batch_id=batch_id,
+                ai_extraction_status="pending",
+                submitted_by=user_id,
+                status="processing"
+            )
+            for f in files
+        ]
+        db.add_all(invoices)
+        db.flush()
+        
+        db.add_all([
+            InvoiceApprovalHistory(
+                invoice_id=invoice.id,
+                action="submitted",
+                action_by=user_id,
+                approver_role="submitter",
+                comments="Invoice uploaded. AI extraction queued",
+                previous_status="new",
+                new_status="processing"
+            )
+            for invoice in invoices
+        ])
+        db.flush()
+        return invoices
+    
+    def find_content_duplicate(
+        self,
+        db: Session,
+        content_sha256: Optional[str],
+        exclude_id: Optional[int] = None
+    ) -> Optional[UploadedInvoice]:
+        """
+        Find the earliest successfully extracted invoice with the same file hash
+        
+        Args:
+            db: Database session
+            content_sha256: Hex SHA-256 of the new file
+            exclude_id: Invoice to ignore (the one being processed)
+            
+        Returns:
+            Matching invoice whose extraction can be reused, or None
+        """
+        if not content_sha256:
+            return None
+        query = db.query(UploadedInvoice).filter(
+            UploadedInvoice.content_sha256 == content_sha256,
+            UploadedInvoice.ai_extraction_status == "completed",
+            UploadedInvoice.ai_raw_response.isnot(None)
+        )
+        if exclude_id is not None:
+            query = query.filter(UploadedInvoice.id != exclude_id)
+        return query.order_by(UploadedInvoice.id).first()
+    
+    def reuse_extraction(self, original: UploadedInvoice) -> Dict[str, Any]:
+        """Copy a previous extraction result for a byte-identical file instead of calling Gemini"""
+        extracted_data = dict(original.ai_raw_response)
+        extracted_data['reused_from_invoice_id'] = original.id
+        logger.info(f"Reusing extraction from invoice {original.id} for identical file")
+        return extracted_data
+    
+    def extract_or_reuse(
+        self,
+        db: Session,
+        file_path: str,
+        mime_type: str,
+        content_sha256: Optional[str],
+        exclude_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Return a prior extraction for an identical file, otherwise run Gemini extraction"""
+        original = self.find_content_duplicate(db, content_sha256, exclude_id)
+        if original:
+            return self.reuse_extraction(original)
+        return self.extract_invoice_details(resolve_local_path(file_path, content_sha256), mime_type)
+    
+    def find_near_duplicate(
+        self,
+        db: Session,
+        vendor_gstin: Optional[str],
+        invoice_number: str,
+        total_amount: float,
+        invoice_date: Optional[datetime],
+        exclude_id: Optional[int] = None
+    ) -> Optional[UploadedInvoice]:
+        """
+        Find an invoice with the same vendor GSTIN, number, amount and date
+        
+        Served by the ix_uploaded_invoices_near_duplicate index, so this is a
+        single index probe rather than a manual review.
+        """
+        query = db.query(UploadedInvoice.id).filter(
+            UploadedInvoice.vendor_gstin == vendor_gstin,
+            UploadedInvoice.invoice_number == invoice_number,
+            UploadedInvoice.total_amount == total_amount,
+            UploadedInvoice.invoice_date == invoice_date
+        )
+        if exclude_id is not None:
+            query = query.filter(UploadedInvoice.id != exclude_id)
+        return query.first()
+    
+    def apply_extracted_data(
+        self,
+        db: Session,
+        invoice: UploadedInvoice,
+        extracted_data: Dict[str, Any]
+    ) -> bool:
+        """
+        Copy AI-extracted details onto an invoice and run the approval-threshold check
+        
+        Args:
+            db: Database session (used for approval settings lookup)
+            invoice: Invoice to populate (new or pending)
+            extracted_data: Data extracted by AI
+            
+        Returns:
+            True if the invoice requires approval
+        """
+        # Generate unique invoice number if not extracted
+        invoice_number = extracted_data.get('invoice_number')
+        if not invoice_number:
+            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+            invoice_number = f"INV-{invoice.project_id}-{timestamp}"
+        
+        # Parse dates
+        invoice_date = None
+        if extracted_data.get('invoice_date'):
+            try:
+                invoice_date = datetime.strptime(extracted_data['invoice_date'], '%Y-%m-%d')
+            except:
+                pass
+        
+        due_date = None
+        if extracted_data.get('due_date'):
+            try:
+                due_date = datetime.strptime(extracted_data['due_date'], '%Y-%m-%d')
+            except:
+                pass
+        
+        # Get confidence score
+        confidence = extracted_data.get('confidence', 0.0)
+        
+        # Determine if extraction was successful
+        extraction_status = "completed" if confidence > 0.5 else "failed"
+        if extracted_data.get('error'):
+            extraction_status = "failed"
+        
+        # Check if approval is required (a category chosen at upload wins)
+        total_amount = extracted_data.get('total_amount') or 0.0
+        category = invoice.category or extracted_data.get('category')
+        currency = extracted_data.get('currency') or 'INR'
+        amount_in_inr, exchange_rate = currency_rates.to_base(db, total_amount, currency, invoice_date)
+        requires_approval, threshold, approval_level = approval_policy_cache.get(
+            db, invoice.project_id
+        ).evaluate(amount_in_inr, category)
+        logger.info(f"Currency conversion: {total_amount} {currency} = {amount_in_inr} INR (rate: {exchange_rate})")
+        
+        # Flag duplicates: byte-identical file first, then same vendor/number/amount/date
+        duplicate_of_id = extracted_data.get('reused_from_invoice_id')
+        if not duplicate_of_id and extracted_data.get('invoice_number'):
+            near_duplicate = self.find_near_duplicate(
+                db, extracted_data.get('vendor_gstin'), invoice_number,
+                total_amount, invoice_date, exclude_id=invoice.id
+            )
+            duplicate_of_id = near_duplicate.id if near_duplicate else None
+        if duplicate_of_id:
+            invoice.is_duplicate = True
+            invoice.duplicate_of_id = duplicate_of_id
+            logger.info(f"Invoice {invoice_number} flagged as duplicate of invoice {duplicate_of_id}")
+        
+        # invoice_number is unique, so keep a taken number recognisable with a suffix
+        number_query = db.query(UploadedInvoice.id).filter(UploadedInvoice.invoice_number == invoice_number)
+        if invoice.id is not None:
+            number_query = number_query.filter(UploadedInvoice.id != invoice.id)
+        if number_query.first():
+            invoice_number = f"{invoice_number}-DUP-{uuid.uuid4().hex[:6]}"
+        
+        invoice.invoice_number = invoice_number
+        
+        # Extracted vendor details
+        invoice.vendor_name = extracted_data.get('vendor_name')
+        invoice.vendor_address = extracted_data.get('vendor_address')
+        invoice.vendor_contact = extracted_data.get('vendor_contact')
+        invoice.vendor_gstin = extracted_data.get('vendor_gstin')
+        
+        # Extracted invoice details
+        invoice.invoice_date = invoice_date
+        invoice.due_date = due_date
+        
+        # Financial details
+        invoice.subtotal = extracted_data.get('subtotal')
+        invoice.tax_amount = extracted_data.get('tax_amount')
+        invoice.discount_amount = extracted_data.get('discount_amount', 0.0)
+        invoice.total_amount = total_amount
+        invoice.currency = currency
+        invoice.exchange_rate = exchange_rate
+        invoice.amount_in_base_currency = amount_in_inr
+        
+        # Line items
+        invoice.line_items = extracted_data.get('line_items', [])
+        
+        # AI processing
+        invoice.ai_extraction_status = extraction_status
+        invoice.ai_confidence_score = confidence
+        invoice.ai_raw_response = extracted_data
+        invoice.extraction_timestamp = datetime.now()
+        
+        # Categorization
+        invoice.category = category
+        
+        # Approval workflow
+        invoice.approval_required = requires_approval
+        invoice.approval_threshold = threshold if requires_approval else None
+        invoice.approval_status = "pending" if requires_approval else "auto_approved"
+        
+        return requires_approval
+    
     def approve_invoice(
         self,
         db: Session,
@@ -525,3 +907,38 @@ class InvoiceProcessingService:
         
         logger.info(f"Invoice {invoice.invoice_number} rejected by user {rejector_id}")
         return invoice
+
+
+_service: Optional[InvoiceProcessingService] = None
+_service_lock = threading.Lock()
+
+
+def get_invoice_processing_service() -> InvoiceProcessingService:
+    """Shared, long-lived service (one Gemini client and connection pool per process)"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = InvoiceProcessingService()
+    return _service
+
+
+def warm_up_invoice_service() -> None:
+    """Create the shared service and open a Gemini connection before the first upload"""
+    try:
+        result = get_invoice_processing_service().probe(force=True)
+        logger.info(f"Invoice processing warm-up: Gemini {result['status']}")
+    except Exception as e:
+        logger.warning(f"Invoice processing warm-up failed: {e}")
+
+
+def close_invoice_processing_service() -> None:
+    """Close the shared Gemini client's connection pool"""
+    global _service
+    with _service_lock:
+        if _service is not None:
+            try:
+                _service.client.close()
+            except Exception as e:
+                logger.warning(f"Error closing Gemini client: {e}")
+            _service = None
@@ -1,30 +1,85 @@
-try:
-    from fpdf import FPDF
-    FPDF_AVAILABLE = True
-except ImportError:
-    FPDF_AVAILABLE = False
-    FPDF = None
-
-import uuid
+import csv
+import io
+import multiprocessing
 import os
-from typing import Tuple, Optional
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import logging
+import zipfile
 
 from app.models import InvoiceInput, InvoiceCalculation
+from app.utils.invoice_pdf import render_invoice, render_invoices
 
 logger = logging.getLogger(__name__)
 
+# Generated invoices live here and are deleted once older than the TTL
+OUTPUT_DIRECTORY = Path(os.getenv("INVOICE_OUTPUT_DIR", "generated_invoices"))
+OUTPUT_TTL_SECONDS = int(os.getenv("INVOICE_OUTPUT_TTL_SECONDS", "3600"))
+CLEANUP_INTERVAL_SECONDS = 300
+PDF_PROCESSES = int(os.getenv("INVOICE_PDF_PROCESSES", str(min(4, os.cpu_count() or 1))))
+# Invoices rendered per pool task, to keep pickling overhead low
+PDF_CHUNK_SIZE = 25
+ZIP_CHUNK_SIZE = 64 * 1024
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_lock = threading.Lock()
+_last_cleanup = 0.0
+
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    """Shared process pool for batch PDF rendering (spawned, so it is safe from threads)"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pdf_pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None:
+            _pdf_pool.shutdown(wait=False, cancel_futures=True)
+            _pdf_pool = None
+
+
+class _ZipStream:
+    """Write-only sink that lets zipfile produce an archive chunk by chunk"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
 
 class InvoiceService:
     """Service class for handling invoice business logic"""
-    
+
     @staticmethod
     def calculate_invoice_amounts(data: InvoiceInput) -> InvoiceCalculation:
         """Calculate TDS and net amount for the invoice"""
         tds_amount = round(data.acting_fee * data.tds_percent / 100, 2)
         net_amount = round(data.acting_fee - tds_amount, 2)
         invoice_id = f"FILMINV-{str(uuid.uuid4())[:8]}"
-        
+
         return InvoiceCalculation(
             acting_fee=data.acting_fee,
             tds_percent=data.tds_percent,
@@ -32,148 +87,149 @@ class InvoiceService:
             net_amount=net_amount,
             invoice_id=invoice_id
         )
-    
+
+    @staticmethod
+    def _invoice_fields(data: InvoiceInput, calculation: InvoiceCalculation) -> Dict[str, Any]:
+        """Values substituted into the invoice template"""
+        fields = data.model_dump()
+        fields.update(calculation.model_dump())
+        return fields
+
     @staticmethod
     def generate_pdf_invoice(data: InvoiceInput, calculation: InvoiceCalculation) -> str:
-        """Generate PDF invoice and return filename"""
-        filename = f"invoice_{calculation.invoice_id}.pdf"
-        
-        if not FPDF_AVAILABLE:
-            # Fallback: Create a text file instead of PDF
-            logger.warning("fpdf2 not available, creating text file instead of PDF")
-            filename = f"invoice_{calculation.invoice_id}.txt"
-            
-            invoice_content = f"""
-INVOICE: {calculation.invoice_id}
-Date: {data.invoice_date}
-
-Company: {data.company_name}
-Address: {data.company_address}
-GSTIN: {data.company_gstin}
-
-Bank Details:
-{data.bank_name}
-Account: {data.bank_ac}
-IFSC: {data.bank_ifsc}
-
-Actor: {data.actor_name}
-PAN: {data.actor_pan}
-Address: {data.actor_address}
-
-Acting Fee: Rs. {calculation.acting_fee:,.2f}
-TDS ({calculation.tds_percent}%): Rs. {calculation.tds_amount:,.2f}
-Net Amount: Rs. {calculation.net_amount:,.2f}
-"""
-            
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(invoice_content)
-            
-            logger.info(f"Invoice text file generated: {filename}")
-            return filename
-        
-        # Original PDF generation code (when fpdf2 is available)
-        try:
-            pdf = FPDF('P', 'mm', 'A4')
-            pdf.add_page()
-
-            # Company Header
-            pdf.set_font("Arial", "B", 16)
-            pdf.cell(0, 10, data.company_name, ln=1, align='C')
-            pdf.set_font("Arial", "", 10)
-            pdf.cell(0, 8, f"{data.company_address} | GSTIN: {data.company_gstin}", ln=1, align='C')
-            pdf.cell(0, 8, "", ln=1)  # blank line
-
-            # Invoice Info
-            pdf.set_font("Arial", "B", 12)
-            pdf.cell(90, 8, f"Invoice No: {calculation.invoice_id}", ln=0)
-            pdf.cell(0, 8, f"Date: {data.invoice_date}", ln=1)
-            pdf.set_font("Arial", "", 12)
-            pdf.cell(0, 8, "Billing To:", ln=1)
-            pdf.cell(0, 7, data.actor_name, ln=1)
-            pdf.cell(0, 7, f"PAN: {data.actor_pan}", ln=1)
-            pdf.cell(0, 7, f"Address: {data.actor_address}", ln=1)
-            pdf.cell(0, 8, "", ln=1)  # blank line
-
-            # Table header
-            pdf.set_font("Arial", "B", 12)
-            pdf.cell(10, 8, "Sl", border=1)
-            pdf.cell(120, 8, "Description", border=1)
-            pdf.cell(35, 8, "Amount (Rs.)", border=1, ln=1)
-
-            # Table rows
-            pdf.set_font("Arial", "", 12)
-            pdf.cell(10, 8, "1", border=1)
-            pdf.cell(120, 8, "Acting Fee for Feature Film", border=1)
-            pdf.cell(35, 8, f"{calculation.acting_fee:.2f}", border=1, ln=1)
-
-            pdf.cell(130, 8, f"(-) TDS @ {calculation.tds_percent:.2f}%", border=1)
-            pdf.cell(35, 8, f"{calculation.tds_amount:.2f}", border=1, ln=1)
-
-            pdf.cell(130, 8, "Net Amount Payable", border=1)
-            pdf.cell(35, 8, f"{calculation.net_amount:.2f}", border=1, ln=1)
-
-            # Payment info and terms
-            pdf.ln(12)
-            pdf.set_font("Arial", "", 11)
-            pdf.cell(0, 7, "Payment Terms: Net 15 days", ln=1)
-            pdf.cell(0, 7, f"Bank Details: {data.bank_name}, A/c No: {data.bank_ac}, IFSC: {data.bank_ifsc}", ln=1)
-
-            pdf.ln(15)
-            pdf.set_font("Arial", "", 12)
-            pdf.cell(0, 10, f"For {data.company_name}", ln=1)
-            pdf.cell(0, 5, "(Authorized Signatory)", ln=1)
-
-            pdf.output(filename)
-            logger.info(f"Invoice PDF generated successfully: {filename}")
-            return filename
-            
-        except Exception as e:
-            # Fallback to text file if PDF generation fails
-            logger.error(f"PDF generation failed: {str(e)}, falling back to text file")
-            filename = f"invoice_{calculation.invoice_id}.txt"
-            
-            invoice_content = f"""
-INVOICE: {calculation.invoice_id}
-Date: {data.invoice_date}
-
-Company: {data.company_name}
-Address: {data.company_address}
-GSTIN: {data.company_gstin}
-
-Bank Details:
-{data.bank_name}
-Account: {data.bank_ac}
-IFSC: {data.bank_ifsc}
-
-Actor: {data.actor_name}
-PAN: {data.actor_pan}
-Address: {data.actor_address}
-
-Acting Fee: Rs. {calculation.acting_fee:,.2f}
-TDS ({calculation.tds_percent}%): Rs. {calculation.tds_amount:,.2f}
-Net Amount: Rs. {calculation.net_amount:,.2f}
-"""
-            
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(invoice_content)
-            
-            logger.info(f"Invoice text file generated as fallback: {filename}")
-            return filename
-    
+        """Generate PDF invoice in the output directory and return its filename"""
+        InvoiceService.cleanup_expired_files()
+        OUTPUT_DIRECTORY.mkdir(parents=True, exist_ok=True)
+
+        path = render_invoice(
+            InvoiceService._invoice_fields(data, calculation),
+            str(OUTPUT_DIRECTORY / f"invoice_{calculation.invoice_id}")
+        )
+        logger.info(f"Invoice generated successfully: {path}")
+        return os.path.basename(path)
+
+    @staticmethod
+    def generate_pdf_batch(items: List[InvoiceInput]) -> Tuple[str, List[Tuple[InvoiceCalculation, str]]]:
+        """
+        Render many actor invoices in the PDF process pool
+
+        Returns:
+            Tuple of (batch_id, [(calculation, file_path), ...]) in input order
+        """
+        InvoiceService.cleanup_expired_files()
+        batch_id = uuid.uuid4().hex[:12]
+        batch_dir = OUTPUT_DIRECTORY / f"batch_{batch_id}"
+        batch_dir.mkdir(parents=True, exist_ok=True)
+
+        calculations = [InvoiceService.calculate_invoice_amounts(item) for item in items]
+        jobs = [
+            (InvoiceService._invoice_fields(item, calculation), str(batch_dir / f"invoice_{calculation.invoice_id}"))
+            for item, calculation in zip(items, calculations)
+        ]
+        chunks = [jobs[i:i + PDF_CHUNK_SIZE] for i in range(0, len(jobs), PDF_CHUNK_SIZE)]
+
+        if len(chunks) > 1:
+            try:
+                pool = get_pdf_pool()
+                futures = [pool.submit(render_invoices, chunk) for chunk in chunks]
+                paths = [path for future in futures for path in future.result()]
+            except BrokenProcessPool as e:
+                # A crashed worker poisons the pool; render here and start a fresh pool next time
+                logger.warning(f"PDF process pool broke, rendering batch in-process: {e}")
+                shutdown_pdf_pool()
+                paths = render_invoices(jobs)
+        else:
+            # Small batches are faster than starting worker processes
+            paths = render_invoices(jobs)
+
+        logger.info(f"Generated {len(paths)} invoices in batch {batch_id}")
+        return batch_id, list(zip(calculations, paths))
+
+    @staticmethod
+    def iter_batch_zip(
+        items: List[InvoiceInput],
+        results: List[Tuple[InvoiceCalculation, str]]
+    ) -> Iterator[bytes]:
+        """Stream a batch as a ZIP of its invoices plus a manifest.csv, without building it in memory"""
+        sink = _ZipStream()
+        # PDFs are already compressed, so entries are stored as-is
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+            manifest = io.StringIO()
+            writer = csv.writer(manifest)
+            writer.writerow(["invoice_id", "actor_name", "actor_pan", "acting_fee", "tds_amount", "net_amount", "file"])
+            for item, (calculation, path) in zip(items, results):
+                writer.writerow([
+                    calculation.invoice_id, item.actor_name, item.actor_pan,
+                    calculation.acting_fee, calculation.tds_amount, calculation.net_amount,
+                    os.path.basename(path)
+                ])
+            archive.writestr("manifest.csv", manifest.getvalue())
+            yield sink.drain()
+
+            for _, path in results:
+                with open(path, "rb") as src, archive.open(os.path.basename(path), "w") as dst:
+                    while chunk := src.read(ZIP_CHUNK_SIZE):
+                        dst.write(chunk)
+                        yield sink.drain()
+        yield sink.drain()
+
+    @staticmethod
+    def cleanup_expired_files(force: bool = False) -> int:
+        """
+        Delete generated invoices older than the TTL (at most every few minutes unless forced)
+
+        Returns:
+            Number of files removed
+        """
+        global _last_cleanup
+        now = time.time()
+        if not force and now - _last_cleanup < CLEANUP_INTERVAL_SECONDS:
+            return 0
+        _last_cleanup = now
+        if not OUTPUT_DIRECTORY.exists():
+            return 0
+
+        removed = 0
+        cutoff = now - OUTPUT_TTL_SECONDS
+        for root, dirs, files in os.walk(OUTPUT_DIRECTORY, topdown=False):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError as e:
+                    logger.error(f"Error cleaning up file {path}: {e}")
+            if root != str(OUTPUT_DIRECTORY) and not os.listdir(root):
+                try:
+                    os.rmdir(root)
+                except OSError:
+                    pass
+        if removed:
+            logger.info(f"Removed {removed} expired generated invoices")
+        return removed
+
     @staticmethod
     def cleanup_file(filename: str) -> None:
         """Clean up generated files if needed"""
+        path = InvoiceService.get_invoice_file_path(filename)
         try:
-            if os.path.exists(filename):
-                os.remove(filename)
+            if path:
+                os.remove(path)
         except Exception as e:
             logger.error(f"Error cleaning up file {filename}: {e}")
-    
+
     @staticmethod
     def get_invoice_file_path(filename: str) -> Optional[str]:
         """
-        Get the full path of an invoice file
+        Get the full path of a generated invoice file
+
+        Only plain file names inside the output directory resolve, so a
+        download request cannot reach anything else on disk.
         """
-        if os.path.exists(filename):
-            return filename
-        return None
\ No newline at end of file
+        if not filename or filename != os.path.basename(filename) or filename.startswith("."):
+            return None
+        path = OUTPUT_DIRECTORY / filename
+        if path.is_file():
+            return str(path)
+        return None
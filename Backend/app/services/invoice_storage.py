@@ -0,0 +1,297 @@
+"""
+Invoice File Storage
+Content-addressed storage for uploaded invoice files. Objects are keyed by
+their SHA-256 and sharded as ab/cd/<sha256>, so identical uploads share one
+object and no directory grows without bound.
+"""
+
+try:
+    import boto3
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+    boto3 = None
+
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Streaming reads/writes move data in chunks of this size
+STORAGE_CHUNK_SIZE = 1024 * 1024
+
+
+def shard_key(sha256: str) -> str:
+    """Object key for a content hash: ab/cd/abcd..."""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def _spool_to_file(stream: BinaryIO, target: BinaryIO, max_size: int) -> Tuple[str, int]:
+    """Copy a stream into an open file in chunks, returning (sha256, size)"""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = stream.read(STORAGE_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise ValueError(f"File exceeds maximum allowed size of {max_size / (1024*1024)}MB")
+        digest.update(chunk)
+        target.write(chunk)
+    return digest.hexdigest(), size
+
+
+class InvoiceStorage(ABC):
+    """Interface shared by the storage backends"""
+
+    @abstractmethod
+    def save_stream(self, stream: BinaryIO, max_size: int) -> Tuple[str, int]:
+        """
+        Store a stream under its content hash
+
+        Returns:
+            Tuple of (sha256, size)
+
+        Raises:
+            ValueError: If the stream is larger than max_size (nothing is stored)
+        """
+
+    @abstractmethod
+    def open(self, sha256: str) -> BinaryIO:
+        """Open a stored object for streaming reads"""
+
+    @abstractmethod
+    def exists(self, sha256: str) -> bool:
+        """Whether an object is stored under the hash"""
+
+    @abstractmethod
+    def delete(self, sha256: str) -> None:
+        """Remove a stored object; a missing object is not an error"""
+
+    @abstractmethod
+    def uri(self, sha256: str) -> str:
+        """Value recorded in UploadedInvoice.file_path for a stored object"""
+
+    @abstractmethod
+    def local_path(self, sha256: str) -> str:
+        """Path of a local copy of the object (fetched into a cache for remote backends)"""
+
+    def iter_chunks(self, sha256: str, chunk_size: int = STORAGE_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield a stored object in chunks, e.g. for a StreamingResponse"""
+        with self.open(sha256) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+
+class LocalInvoiceStorage(InvoiceStorage):
+    """Content-addressed storage on the local filesystem"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self._tmp_dir = self.root / "tmp"
+
+    def _path(self, sha256: str) -> Path:
+        return self.root / shard_key(sha256)
+
+    def save_stream(self, stream: BinaryIO, max_size: int) -> Tuple[str, int]:
+        # Write to a temp file first; the key is only known once the hash is
+        self._tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp = tempfile.NamedTemporaryFile(dir=self._tmp_dir, delete=False)
+        try:
+            with tmp:
+                sha256, size = _spool_to_file(stream, tmp, max_size)
+            target = self._path(sha256)
+            if target.exists():
+                os.unlink(tmp.name)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp.name, target)
+        except BaseException:
+            Path(tmp.name).unlink(missing_ok=True)
+            raise
+        return sha256, size
+
+    def open(self, sha256: str) -> BinaryIO:
+        return open(self._path(sha256), 'rb')
+
+    def exists(self, sha256: str) -> bool:
+        return self._path(sha256).exists()
+
+    def delete(self, sha256: str) -> None:
+        self._path(sha256).unlink(missing_ok=True)
+
+    def uri(self, sha256: str) -> str:
+        return str(self._path(sha256))
+
+    def local_path(self, sha256: str) -> str:
+        return str(self._path(sha256))
+
+
+class LocalInvoiceCache(LocalInvoiceStorage):
+    """
+    Local object storage bounded by total size, evicting least recently used objects.
+    Recency survives restarts through file mtimes.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        super().__init__(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+
+        existing = sorted(
+            (p for p in self.root.glob("*/*/*") if p.is_file() and p.parent.parent.name != "tmp"),
+            key=lambda p: p.stat().st_mtime
+        ) if self.root.exists() else []
+        for path in existing:
+            size = path.stat().st_size
+            self._entries[path.name] = size
+            self._total += size
+
+    def _touch(self, sha256: str) -> None:
+        with self._lock:
+            if sha256 in self._entries:
+                self._entries.move_to_end(sha256)
+        try:
+            os.utime(self._path(sha256))
+        except OSError:
+            pass
+
+    def save_stream(self, stream: BinaryIO, max_size: int) -> Tuple[str, int]:
+        sha256, size = super().save_stream(stream, max_size)
+        self._touch(sha256)
+        with self._lock:
+            self._total -= self._entries.pop(sha256, 0)
+            self._entries[sha256] = size
+            self._total += size
+            self._evict()
+        return sha256, size
+
+    def open(self, sha256: str) -> BinaryIO:
+        f = super().open(sha256)
+        self._touch(sha256)
+        return f
+
+    def local_path(self, sha256: str) -> str:
+        self._touch(sha256)
+        return super().local_path(sha256)
+
+    def delete(self, sha256: str) -> None:
+        super().delete(sha256)
+        with self._lock:
+            self._total -= self._entries.pop(sha256, 0)
+
+    def _evict(self) -> None:
+        # The newest object is always kept, so a save is never evicted before it is read
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            sha256, size = self._entries.popitem(last=False)
+            self._total -= size
+            self._path(sha256).unlink(missing_ok=True)
+
+
+class S3InvoiceStorage(InvoiceStorage):
+    """
+    Content-addressed storage in an S3-compatible bucket (AWS S3, MinIO, ...)
+
+    Objects written or read through this instance are also kept in a local
+    LRU cache (cache_max_bytes) so the extractor can read them without a round trip.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        prefix: str = "",
+        cache_dir: str = "uploaded_invoices/s3_cache",
+        region_name: Optional[str] = None,
+        cache_max_bytes: int = 1024 * 1024 * 1024
+    ):
+        if not BOTO3_AVAILABLE:
+            raise RuntimeError("boto3 is required for the s3 invoice storage backend")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None, region_name=region_name)
+        self.cache = LocalInvoiceCache(cache_dir, cache_max_bytes)
+
+    def _key(self, sha256: str) -> str:
+        key = shard_key(sha256)
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def save_stream(self, stream: BinaryIO, max_size: int) -> Tuple[str, int]:
+        sha256, size = self.cache.save_stream(stream, max_size)
+        if not self.exists(sha256):
+            with self.cache.open(sha256) as f:
+                self.client.upload_fileobj(f, self.bucket, self._key(sha256))
+        return sha256, size
+
+    def open(self, sha256: str) -> BinaryIO:
+        if self.cache.exists(sha256):
+            return self.cache.open(sha256)
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(sha256))["Body"]
+
+    def exists(self, sha256: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(sha256))
+            return True
+        except self.client.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def delete(self, sha256: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(sha256))
+        self.cache.delete(sha256)
+
+    def uri(self, sha256: str) -> str:
+        return f"s3://{self.bucket}/{self._key(sha256)}"
+
+    def local_path(self, sha256: str) -> str:
+        if not self.cache.exists(sha256):
+            body = self.client.get_object(Bucket=self.bucket, Key=self._key(sha256))["Body"]
+            self.cache.save_stream(body, float("inf"))
+        return self.cache.local_path(sha256)
+
+
+def create_invoice_storage() -> InvoiceStorage:
+    """Build the backend selected by INVOICE_STORAGE_BACKEND (local or s3)"""
+    backend = os.getenv("INVOICE_STORAGE_BACKEND", "local").lower()
+    if backend == "s3":
+        return S3InvoiceStorage(
+            bucket=os.getenv("INVOICE_S3_BUCKET", "invoices"),
+            endpoint_url=os.getenv("INVOICE_S3_ENDPOINT_URL"),
+            prefix=os.getenv("INVOICE_S3_PREFIX", ""),
+            cache_dir=os.getenv("INVOICE_S3_CACHE_DIR", "uploaded_invoices/s3_cache"),
+            region_name=os.getenv("INVOICE_S3_REGION"),
+            cache_max_bytes=int(os.getenv("INVOICE_S3_CACHE_MB", "1024")) * 1024 * 1024
+        )
+    return LocalInvoiceStorage(os.getenv("INVOICE_STORAGE_ROOT", "uploaded_invoices/objects"))
+
+
+def resolve_local_path(file_path: str, content_sha256: Optional[str]) -> str:
+    """
+    Local path for an invoice file
+
+    Invoices saved before content-addressed storage keep their original
+    uploaded_invoices/project_N path, which is used when it still exists.
+    """
+    if file_path and os.path.exists(file_path):
+        return file_path
+    if content_sha256:
+        return invoice_storage.local_path(content_sha256)
+    return file_path
+
+
+# Singleton instance
+invoice_storage = create_invoice_storage()
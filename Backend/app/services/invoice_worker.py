@@ -0,0 +1,144 @@
+"""
+Background invoice extraction worker
+Runs Gemini extraction and the approval-threshold check off the request path
+for invoices ingested in async mode
+"""
+
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import or_
+
+from app.config.database import SessionLocal
+from app.models import UploadedInvoice, InvoiceApprovalHistory
+from app.services.invoice_processing_service import get_invoice_processing_service
+
+logger = logging.getLogger(__name__)
+
+# Extraction is network-bound (Gemini round-trips), so threads are enough
+INVOICE_WORKER_THREADS = int(os.getenv("INVOICE_WORKER_THREADS", "4"))
+# A "processing" claim older than this was left by a crashed or restarted worker
+INVOICE_CLAIM_TIMEOUT_SECONDS = int(os.getenv("INVOICE_CLAIM_TIMEOUT_SECONDS", "900"))
+
+
+class InvoiceExtractionWorker:
+    """Thread pool that extracts pending invoices and records the outcome"""
+
+    def __init__(self, max_workers: int = INVOICE_WORKER_THREADS):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="invoice-extract"
+            )
+        return self._executor
+
+    def submit(self, invoice_id: int) -> Future:
+        """Queue extraction for a pending invoice"""
+        return self._get_executor().submit(self.process_invoice, invoice_id)
+
+    def requeue_pending(self) -> int:
+        """
+        Queue invoices left pending by a previous run (e.g. after a restart),
+        first returning stale "processing" claims to "pending"
+        """
+        db = SessionLocal()
+        try:
+            stale_before = datetime.now() - timedelta(seconds=INVOICE_CLAIM_TIMEOUT_SECONDS)
+            released = db.query(UploadedInvoice).filter(
+                UploadedInvoice.ai_extraction_status == "processing",
+                or_(
+                    UploadedInvoice.extraction_claimed_at.is_(None),
+                    UploadedInvoice.extraction_claimed_at < stale_before
+                )
+            ).update(
+                {"ai_extraction_status": "pending", "extraction_claimed_at": None},
+                synchronize_session=False
+            )
+            db.commit()
+            if released:
+                logger.warning(f"Released {released} stale invoice extraction claims")
+            
+            pending_ids = [
+                row.id for row in db.query(UploadedInvoice.id).filter(
+                    UploadedInvoice.ai_extraction_status == "pending"
+                ).all()
+            ]
+        finally:
+            db.close()
+
+        for invoice_id in pending_ids:
+            self.submit(invoice_id)
+        if pending_ids:
+            logger.info(f"Requeued {len(pending_ids)} pending invoice extractions")
+        return len(pending_ids)
+
+    def shutdown(self, wait: bool = False) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+
+    def process_invoice(self, invoice_id: int) -> Optional[str]:
+        """
+        Extract one pending invoice and apply the approval-threshold check
+
+        Returns:
+            Final ai_extraction_status, or None if another worker already claimed it
+        """
+        db = SessionLocal()
+        try:
+            # Claim the invoice atomically so it is never extracted twice
+            claimed = db.query(UploadedInvoice).filter(
+                UploadedInvoice.id == invoice_id,
+                UploadedInvoice.ai_extraction_status == "pending"
+            ).update(
+                {"ai_extraction_status": "processing", "extraction_claimed_at": datetime.now()},
+                synchronize_session=False
+            )
+            db.commit()
+            if not claimed:
+                return None
+
+            invoice = db.query(UploadedInvoice).filter(UploadedInvoice.id == invoice_id).first()
+
+            service = get_invoice_processing_service()
+            extracted_data = service.extract_or_reuse(
+                db, invoice.file_path, invoice.mime_type, invoice.content_sha256, exclude_id=invoice.id
+            )
+            requires_approval = service.apply_extracted_data(db, invoice, extracted_data)
+
+            invoice.status = "uploaded"
+            db.add(InvoiceApprovalHistory(
+                invoice_id=invoice.id,
+                action="processed",
+                action_by=invoice.submitted_by,
+                approver_role="system",
+                comments=f"AI extraction {invoice.ai_extraction_status}. Approval required: {requires_approval}",
+                previous_status="processing",
+                new_status="uploaded"
+            ))
+            db.commit()
+
+            logger.info(f"Processed invoice {invoice.id} as {invoice.invoice_number} ({invoice.ai_extraction_status})")
+            return invoice.ai_extraction_status
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error processing invoice {invoice_id}: {e}")
+            db.query(UploadedInvoice).filter(UploadedInvoice.id == invoice_id).update(
+                {"ai_extraction_status": "failed", "status": "uploaded"},
+                synchronize_session=False
+            )
+            db.commit()
+            return "failed"
+        finally:
+            db.close()
+
+
+# Singleton instance
+invoice_worker = InvoiceExtractionWorker()
@@ -0,0 +1,217 @@
+"""
+Location Routing
+Orders a schedule's location blocks to cut travel between them. Scene
+locations are resolved to catalog coordinates, distances come from a
+vectorized haversine matrix, and the route is a nearest-neighbour path
+improved by 2-opt that keeps blocks off the days their location is blocked.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.weather_service import location_key
+
+EARTH_RADIUS_KM = 6371.0088
+SAME_DAY_MOVE_KM = 25.0  # Longer company moves start the next location on a fresh day
+TWO_OPT_MAX_MOVES = 1000
+TWO_OPT_CANDIDATES = 32  # Improving reversals checked against availability per pass
+
+Coordinates = Tuple[float, float]
+Window = Tuple[date, date]
+
+
+def parse_coordinates(value) -> Optional[Coordinates]:
+    """(lat, lng) from a Location.coordinates value such as {"lat": 9.93, "lng": 76.26}"""
+    if isinstance(value, dict):
+        lat = value.get('lat', value.get('latitude'))
+        lng = value.get('lng', value.get('lon', value.get('longitude')))
+    elif isinstance(value, (list, tuple)) and len(value) == 2:
+        lat, lng = value
+    else:
+        return None
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+        return None
+    return lat, lng
+
+
+def catalog_coordinates(locations: Iterable) -> Dict[str, Coordinates]:
+    """Catalog Location rows as {case-folded name: (lat, lng)}; the first row per name wins"""
+    coordinates = {}
+    for location in locations:
+        point = parse_coordinates(location.coordinates)
+        if point and location.name:
+            coordinates.setdefault(location_key(location.name), point)
+    return coordinates
+
+
+def haversine_matrix(points: Sequence[Coordinates]) -> np.ndarray:
+    """Great-circle distances in km between every pair of points"""
+    radians = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    lat, lng = radians[:, 0], radians[:, 1]
+    half_dlat = (lat[:, None] - lat[None, :]) / 2
+    half_dlng = (lng[:, None] - lng[None, :]) / 2
+    a = np.sin(half_dlat) ** 2 + np.outer(np.cos(lat), np.cos(lat)) * np.sin(half_dlng) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def is_available(rules: Optional[Dict[str, List[Window]]], day: date) -> bool:
+    """Whether a day falls inside the windows (if any) and outside every blackout"""
+    if not rules:
+        return True
+    windows, blackouts = rules.get('windows') or [], rules.get('blackouts') or []
+    if windows and not any(start <= day <= end for start, end in windows):
+        return False
+    return not any(start <= day <= end for start, end in blackouts)
+
+
+class LocationRouter:
+    """
+    Orders location blocks, each (name, shoot days), starting from the first one
+
+    Blocks whose location has no catalog coordinates can't be routed; they
+    follow the routed ones in their given order. Availability rules are the
+    solver's {case-folded name: {'windows': [...], 'blackouts': [...]}}.
+    """
+
+    def __init__(
+        self,
+        coordinates: Dict[str, Coordinates],
+        availability: Optional[Dict[str, Dict[str, List[Window]]]] = None,
+        skip_weekends: bool = False
+    ):
+        self.coordinates = coordinates
+        self.availability = {location_key(name): rules for name, rules in (availability or {}).items()}
+        self.skip_weekends = skip_weekends
+        self._shoot_days: List[date] = []
+
+    def _shoot_day(self, start: date, elapsed: float) -> date:
+        """Date of the shoot day `elapsed` days after start"""
+        if not self.skip_weekends:
+            return start + timedelta(days=int(elapsed))
+        if not self._shoot_days or self._shoot_days[0] != start:
+            self._shoot_days = [start]
+        while len(self._shoot_days) <= int(elapsed):
+            day = self._shoot_days[-1] + timedelta(days=1)
+            while day.weekday() >= 5:
+                day += timedelta(days=1)
+            self._shoot_days.append(day)
+        return self._shoot_days[int(elapsed)]
+
+    def _violations(self, order: Sequence[int], names: List[str], days: np.ndarray, start: date) -> int:
+        """Blocks that would start on a day their location is unavailable"""
+        elapsed = 0.0
+        count = 0
+        for block in order:
+            rules = self.availability.get(location_key(names[block]))
+            if rules and not is_available(rules, self._shoot_day(start, elapsed)):
+                count += 1
+            elapsed += days[block]
+        return count
+
+    def _nearest_neighbour(self, distances: np.ndarray, names: List[str], days: np.ndarray, start: date) -> List[int]:
+        order = [0]
+        remaining = np.arange(1, len(names))
+        elapsed = float(days[0])
+        while remaining.size:
+            day = self._shoot_day(start, elapsed)
+            open_now = np.fromiter(
+                (is_available(self.availability.get(location_key(names[block])), day) for block in remaining),
+                dtype=bool, count=remaining.size
+            )
+            pool = remaining[open_now] if open_now.any() else remaining
+            block = int(pool[np.argmin(distances[order[-1], pool])])
+            order.append(block)
+            remaining = remaining[remaining != block]
+            elapsed += days[block]
+        return order
+
+    def _two_opt(self, order: List[int], distances: np.ndarray, names: List[str], days: np.ndarray, start: date) -> List[int]:
+        """Reverse segments while that shortens the path without more availability clashes"""
+        n = len(order)
+        if n < 3:
+            return order
+        # A free end node at index n turns the open path into a closed one with a fixed start
+        padded = np.zeros((n + 1, n + 1))
+        padded[:n, :n] = distances
+        check = any(location_key(names[block]) in self.availability for block in order)
+        violations = self._violations(order, names, days, start) if check else 0
+        path = np.array(order + [n])
+        positions = np.arange(1, n)
+        upper = positions[:, None] < positions[None, :]
+
+        for _ in range(TWO_OPT_MAX_MOVES):
+            before, first = path[positions - 1], path[positions]
+            last, after = path[positions], path[positions + 1]
+            delta = (
+                padded[before[:, None], last[None, :]] + padded[first[:, None], after[None, :]]
+                - padded[before, first][:, None] - padded[last, after][None, :]
+            )
+            delta = np.where(upper, delta, 0.0)
+            candidates = np.argsort(delta, axis=None)[:TWO_OPT_CANDIDATES]
+            moved = False
+            for flat in candidates:
+                i, j = np.unravel_index(flat, delta.shape)
+                if delta[i, j] >= -1e-9:
+                    break
+                i, j = i + 1, j + 1
+                candidate = np.concatenate((path[:i], path[i:j + 1][::-1], path[j + 1:]))
+                if check:
+                    candidate_violations = self._violations(candidate[:-1], names, days, start)
+                    if candidate_violations > violations:
+                        continue
+                    violations = candidate_violations
+                path = candidate
+                moved = True
+                break
+            if not moved:
+                break
+        return [int(block) for block in path[:-1]]
+
+    def route(self, blocks: List[Tuple[str, float]], start: date) -> Dict:
+        """
+        Order location blocks to cut travel
+
+        Returns:
+            Dict with 'order' (location names), 'legs' (km from the previous
+            location, None where either end has no coordinates), 'travel_km',
+            'baseline_travel_km' (travel in the given order) and 'unrouted'
+            (locations without coordinates)
+        """
+        routed = [(name, days) for name, days in blocks if location_key(name) in self.coordinates]
+        unrouted = [(name, days) for name, days in blocks if location_key(name) not in self.coordinates]
+        names = [name for name, _ in routed]
+        distances = haversine_matrix([self.coordinates[location_key(name)] for name in names])
+        index = {name: i for i, name in enumerate(names)}
+
+        if len(routed) > 1:
+            days = np.array([days for _, days in routed], dtype=float)
+            order = self._nearest_neighbour(distances, names, days, start)
+            order = self._two_opt(order, distances, names, days, start)
+            ordered = [routed[i] for i in order] + unrouted
+        else:
+            ordered = list(blocks)
+
+        legs: List[Optional[float]] = [None]
+        for (previous, _), (name, _) in zip(ordered, ordered[1:]):
+            legs.append(
+                round(float(distances[index[previous], index[name]]), 1)
+                if previous in index and name in index else None
+            )
+        given = [
+            float(distances[index[previous], index[name]])
+            for (previous, _), (name, _) in zip(blocks, blocks[1:])
+            if previous in index and name in index
+        ]
+        return {
+            'order': [name for name, _ in ordered],
+            'legs': legs,
+            'travel_km': round(sum(leg for leg in legs if leg is not None), 1),
+            'baseline_travel_km': round(sum(given), 1),
+            'unrouted': [name for name, _ in unrouted]
+        }
@@ -0,0 +1,231 @@
+"""
+Promotion Tracking Service
+Refreshes tracked films on an interval and appends compact per-video snapshots,
+so growth over a release week can be queried without re-hitting YouTube or Gemini
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config.database import SessionLocal
+from app.models import PromotionTracking, PromotionSnapshot
+from app.services.youtube_service import youtube_service
+from app.services.llm_service import llm_service
+
+logger = logging.getLogger(__name__)
+
+# How often the background loop looks for trackings that are due
+TRACKER_POLL_SECONDS = int(os.getenv("PROMOTION_TRACKER_POLL_SECONDS", "60"))
+
+
+def _comments_digest(comments: List[str]) -> str:
+    """Short stable hash of a comment list, used to skip unchanged sentiment runs"""
+    return hashlib.sha1("\n".join(comments).encode("utf-8")).hexdigest()[:16]
+
+
+def _growth(first: float, last: float) -> Optional[float]:
+    """Percentage growth between two values, None when there is no baseline"""
+    if not first:
+        return None
+    return round((last - first) / first * 100, 2)
+
+
+class PromotionTracker:
+    """Background scheduler that snapshots YouTube metrics for tracked films"""
+
+    def __init__(self, poll_seconds: int = TRACKER_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the refresh loop in a daemon thread (no-op if already running)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="promotion-tracker", daemon=True)
+        self._thread.start()
+        logger.info(f"Promotion tracker started (poll every {self.poll_seconds}s)")
+
+    def stop(self) -> None:
+        """Signal the refresh loop to exit and wait briefly for it"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.refresh_due()
+            except Exception as e:
+                logger.error(f"Promotion tracker loop failed: {e}")
+            self._stop_event.wait(self.poll_seconds)
+
+    def refresh_due(self) -> int:
+        """Refresh every active tracking whose interval has elapsed; returns how many ran"""
+        db = SessionLocal()
+        try:
+            now = datetime.now()
+            trackings = db.query(PromotionTracking).filter(PromotionTracking.is_active == True).all()
+            refreshed = 0
+            for tracking in trackings:
+                interval = timedelta(minutes=tracking.refresh_interval_minutes or 360)
+                if tracking.last_refreshed_at and now - tracking.last_refreshed_at < interval:
+                    continue
+                try:
+                    self.refresh_tracking(db, tracking)
+                    refreshed += 1
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Failed to refresh promotion tracking {tracking.id} ({tracking.film}): {e}")
+                    tracking.last_error = str(e)
+                    tracking.last_refreshed_at = now
+                    db.commit()
+            return refreshed
+        finally:
+            db.close()
+
+    def refresh_tracking(self, db: Session, tracking: PromotionTracking) -> List[PromotionSnapshot]:
+        """Fetch current metrics for a tracked film and append one snapshot per video"""
+        if not tracking.video_ids:
+            # First refresh: discover the videos with a full search
+            report = youtube_service.film_report(tracking.film)
+            if report.get("message") == "No videos found":
+                raise ValueError(f"No videos found for '{tracking.film}'")
+            tracking.video_ids = [v["video_id"] for v in report.get("videos", []) if v.get("video_id")]
+
+        # Later refreshes only need one batched statistics call
+        stats = youtube_service.video_statistics(tracking.video_ids)
+
+        # Snapshots from the previous refresh share its captured_at timestamp
+        previous: Dict[str, PromotionSnapshot] = {}
+        if tracking.last_refreshed_at:
+            previous = {
+                s.video_id: s
+                for s in db.query(PromotionSnapshot).filter(
+                    PromotionSnapshot.tracking_id == tracking.id,
+                    PromotionSnapshot.captured_at == tracking.last_refreshed_at
+                ).all()
+            }
+
+        captured_at = datetime.now()
+        snapshots = []
+        for video_id in tracking.video_ids:
+            video_stats = stats.get(video_id)
+            if not video_stats:
+                continue
+
+            comments = youtube_service.top_comments(video_id)
+            digest = _comments_digest(comments)
+            prior = previous.get(video_id)
+            if prior and prior.comments_digest == digest:
+                # Same comments as last time: reuse the score instead of calling Gemini
+                sentiment_score = prior.sentiment_score
+            elif comments:
+                sentiment = llm_service.analyze_sentiment(comments=comments, video_title=tracking.film)
+                sentiment_score = sentiment.get("average_score")
+            else:
+                sentiment_score = None
+
+            snapshots.append(PromotionSnapshot(
+                tracking_id=tracking.id,
+                video_id=video_id,
+                captured_at=captured_at,
+                views=video_stats["views"],
+                likes=video_stats["likes"],
+                comments=video_stats["comments_count"],
+                sentiment_score=sentiment_score,
+                comments_digest=digest
+            ))
+
+        db.add_all(snapshots)
+        tracking.last_refreshed_at = captured_at
+        tracking.last_error = None
+        db.commit()
+
+        logger.info(f"Captured {len(snapshots)} promotion snapshots for '{tracking.film}'")
+        return snapshots
+
+    @staticmethod
+    def build_timeseries(
+        db: Session,
+        tracking: PromotionTracking,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Dict:
+        """Return stored snapshots in a range with per-video and overall deltas/growth rates"""
+        query = db.query(
+            PromotionSnapshot.video_id,
+            PromotionSnapshot.captured_at,
+            PromotionSnapshot.views,
+            PromotionSnapshot.likes,
+            PromotionSnapshot.comments,
+            PromotionSnapshot.sentiment_score
+        ).filter(PromotionSnapshot.tracking_id == tracking.id)
+        if start:
+            query = query.filter(PromotionSnapshot.captured_at >= start)
+        if end:
+            query = query.filter(PromotionSnapshot.captured_at <= end)
+        rows = query.order_by(PromotionSnapshot.captured_at).all()
+
+        series: Dict[str, List[Dict]] = {}
+        totals: Dict[datetime, Dict] = {}
+        for row in rows:
+            series.setdefault(row.video_id, []).append({
+                "captured_at": row.captured_at.isoformat(),
+                "views": row.views,
+                "likes": row.likes,
+                "comments": row.comments,
+                "sentiment_score": row.sentiment_score
+            })
+            bucket = totals.setdefault(row.captured_at, {"views": 0, "likes": 0, "comments": 0})
+            bucket["views"] += row.views or 0
+            bucket["likes"] += row.likes or 0
+            bucket["comments"] += row.comments or 0
+
+        def summarize(points: List[Dict]) -> Dict:
+            first, last = points[0], points[-1]
+            hours = (
+                datetime.fromisoformat(last["captured_at"]) - datetime.fromisoformat(first["captured_at"])
+            ).total_seconds() / 3600
+            summary = {}
+            for metric in ("views", "likes", "comments"):
+                delta = (last[metric] or 0) - (first[metric] or 0)
+                summary[f"{metric}_delta"] = delta
+                summary[f"{metric}_growth_pct"] = _growth(first[metric] or 0, last[metric] or 0)
+                summary[f"{metric}_per_day"] = round(delta / hours * 24, 2) if hours > 0 else None
+            if first.get("sentiment_score") is not None and last.get("sentiment_score") is not None:
+                summary["sentiment_delta"] = round(last["sentiment_score"] - first["sentiment_score"], 3)
+            return summary
+
+        overall_points = [
+            {"captured_at": captured_at.isoformat(), **values}
+            for captured_at, values in totals.items()
+        ]
+
+        return {
+            "tracking_id": tracking.id,
+            "film": tracking.film,
+            "start": start.isoformat() if start else None,
+            "end": end.isoformat() if end else None,
+            "snapshot_count": len(overall_points),
+            "overall": {
+                "points": overall_points,
+                **(summarize(overall_points) if overall_points else {})
+            },
+            "videos": [
+                {"video_id": video_id, "points": points, **summarize(points)}
+                for video_id, points in series.items()
+            ]
+        }
+
+
+# Singleton instance
+promotion_tracker = PromotionTracker()
@@ -0,0 +1,90 @@
+"""
+Incremental Reschedule Service
+Moves one scene (and its cascade set) without loading the whole project:
+reads only the moved scene and the scenes at its location, writes the changed
+rows in one bulk UPDATE, and re-checks conflicts only on the dates touched
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models import Scene
+from app.services.schedule_conflict_service import find_conflicts
+from app.services.scheduling_service import parse_scene_number
+
+CASCADE_LIMIT = 3  # Same as SchedulingEngine._get_dependent_scenes
+
+
+def reschedule_scene(
+    db: Session,
+    project_id: int,
+    scene_id: int,
+    new_date: datetime,
+    auto_cascade: bool = True,
+    reason: Optional[str] = None
+) -> Optional[Dict]:
+    """
+    Move a scheduled scene and cascade its dependents the way SchedulingEngine.reschedule_scene does
+
+    Returns:
+        None if the scene does not exist in the project; otherwise a dict with
+        success, message, old_date, affected_scenes, updated_scenes and the
+        conflicts on the dates that changed
+    """
+    scene = db.query(
+        Scene.id, Scene.scene_number, Scene.location_name, Scene.scheduled_date, Scene.notes
+    ).filter(
+        Scene.id == scene_id,
+        Scene.project_id == project_id
+    ).first()
+    if not scene:
+        return None
+    if not scene.scheduled_date:
+        return {'success': False, 'message': 'Scene not found in schedule'}
+
+    updates = {scene.id: {'id': scene.id, 'scheduled_date': new_date}}
+    if reason:
+        updates[scene.id]['notes'] = f"{scene.notes or ''}\n[Rescheduled]: {reason}".strip()
+    touched_days = {scene.scheduled_date.date(), new_date.date()}
+
+    affected = []
+    if auto_cascade:
+        # Dependents: later scene numbers at the same location, first few in id order
+        same_location = Scene.location_name.is_(None) if scene.location_name is None \
+            else Scene.location_name == scene.location_name
+        siblings = db.query(Scene.id, Scene.scene_number, Scene.scheduled_date).filter(
+            Scene.project_id == project_id,
+            same_location,
+            Scene.id != scene_id
+        ).order_by(Scene.id).all()
+        scene_num = parse_scene_number(scene.scene_number)
+        for sibling in siblings:
+            if parse_scene_number(sibling.scene_number) <= scene_num:
+                continue
+            affected.append(sibling.id)
+            if sibling.scheduled_date and sibling.scheduled_date < new_date:
+                # Move dependent scene to after the rescheduled scene
+                moved_to = new_date + timedelta(days=1)
+                updates[sibling.id] = {'id': sibling.id, 'scheduled_date': moved_to}
+                touched_days.update((sibling.scheduled_date.date(), moved_to.date()))
+            if len(affected) == CASCADE_LIMIT:
+                break
+
+    if scene.scheduled_date == new_date and not reason:
+        del updates[scene.id]
+    # Only rows that actually change are written, in one executemany UPDATE
+    changed = list(updates.values())
+    if changed:
+        db.bulk_update_mappings(Scene, changed)
+        db.commit()
+
+    return {
+        'success': True,
+        'message': f'Scene {scene_id} rescheduled from {scene.scheduled_date} to {new_date}',
+        'old_date': scene.scheduled_date,
+        'affected_scenes': affected,
+        'updated_scenes': [mapping['id'] for mapping in changed],
+        'conflicts': find_conflicts(db, project_id, touched_days)
+    }
@@ -0,0 +1,122 @@
+"""
+Schedule Conflict Service
+Location overlaps and actor overloads computed with grouped SQL over the
+(project_id, scheduled_date) index and the normalized scene_actors table,
+which is kept in sync with Scene.actors_data on every flush
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, event, func, inspect, or_
+from sqlalchemy.orm import Session
+
+from app.models import Scene, SceneActor
+
+ACTOR_OVERLOAD_SCENES = 3  # More scenes than this for one actor on one day is a conflict
+
+
+def scene_actor_names(actors_data: Any) -> List[str]:
+    """Distinct actor names listed in a scene's actors_data, in order"""
+    names = []
+    for actor_info in actors_data or []:
+        name = actor_info.get('name', '') if isinstance(actor_info, dict) else ''
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def sync_scene_actors(scene: Scene) -> None:
+    """Make scene.actor_links match actors_data, keeping the rows that still apply"""
+    existing = {link.actor_name: link for link in scene.actor_links}
+    scene.actor_links = [
+        existing.get(name) or SceneActor(actor_name=name)
+        for name in scene_actor_names(scene.actors_data)
+    ]
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_scene_actors(session: Session, flush_context, instances) -> None:
+    """Refresh scene_actors for new scenes and scenes whose actors_data was reassigned"""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Scene):
+            continue
+        if obj in session.new:
+            if obj.actors_data:
+                sync_scene_actors(obj)
+        elif inspect(obj).attrs.actors_data.history.has_changes():
+            sync_scene_actors(obj)
+
+
+def _id_list(db: Session):
+    """Aggregate of the grouped scene ids"""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.array_agg(Scene.id)
+    return func.group_concat(Scene.id)
+
+
+def _parse_ids(value: Any) -> List[int]:
+    if isinstance(value, str):
+        return sorted(int(scene_id) for scene_id in value.split(","))
+    return sorted(value or [])
+
+
+def _parse_day(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def find_conflicts(db: Session, project_id: int, days: Optional[Iterable[date]] = None) -> List[Dict]:
+    """
+    Location overlaps and actor overloads for a project, grouped in the database
+
+    Args:
+        days: Only check these dates (the whole schedule when None)
+
+    Returns:
+        Conflicts ordered by date, location overlaps before actor overloads
+    """
+    filters = [Scene.project_id == project_id, Scene.scheduled_date.isnot(None)]
+    if days is not None:
+        days = sorted(set(days))
+        if not days:
+            return []
+        filters.append(or_(*[
+            and_(
+                Scene.scheduled_date >= datetime.combine(day, datetime.min.time()),
+                Scene.scheduled_date < datetime.combine(day + timedelta(days=1), datetime.min.time())
+            )
+            for day in days
+        ]))
+
+    day = func.date(Scene.scheduled_date)
+    location = func.coalesce(func.nullif(Scene.location_name, ''), 'Unknown')
+    scene_count = func.count(Scene.id)
+
+    overlaps = db.query(day, location, scene_count, _id_list(db)).filter(
+        *filters
+    ).group_by(day, location).having(scene_count > 1).all()
+
+    overloads = db.query(day, SceneActor.actor_name, scene_count, _id_list(db)).join(
+        SceneActor, SceneActor.scene_id == Scene.id
+    ).filter(
+        *filters
+    ).group_by(day, SceneActor.actor_name).having(scene_count > ACTOR_OVERLOAD_SCENES).all()
+
+    conflicts = []
+    for rank, rows in enumerate((overlaps, overloads)):
+        for row_day, name, count, scene_ids in rows:
+            row_day = _parse_day(row_day)
+            conflicts.append((row_day, rank, name, {
+                "type": "location_overlap" if rank == 0 else "actor_overload",
+                "severity": "medium" if rank == 0 else "high",
+                "message": f"{count} scenes at {name} on {row_day}" if rank == 0
+                else f"{name} in {count} scenes on {row_day}",
+                "scenes": _parse_ids(scene_ids),
+                "date": datetime.combine(row_day, datetime.min.time())
+            }))
+    conflicts.sort(key=lambda item: item[:3])
+    return [conflict for *_, conflict in conflicts]
@@ -0,0 +1,238 @@
+"""
+Schedule Risk Service
+Monte Carlo simulation of the current schedule. Each iteration samples
+weather loss on every outdoor location-day, actor absences on every day an
+actor works and per-scene duration variance. The lost and overrun hours are
+pushed onto extra shoot days, which give completion-date and budget
+percentiles. Iterations run as NumPy arrays, in chunks to bound memory.
+"""
+
+import math
+import os
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models import Scene, SceneActor, ActorAvailability, Project
+from app.services.schedule_solver import DEFAULT_DAY_HOURS, availability_windows, parse_duration_hours
+from app.services.weather_service import MAX_WIND_SPEED, location_key, weather_forecasts
+
+DEFAULT_ITERATIONS = 10000
+SIMULATION_CHUNK = 2048  # Iterations sampled at once
+DURATION_SIGMA = float(os.getenv("SCHEDULE_RISK_DURATION_SIGMA", "0.25"))  # Log-normal spread of scene durations
+ACTOR_ABSENCE_PROBABILITY = float(os.getenv("SCHEDULE_RISK_ACTOR_ABSENCE", "0.01"))  # Per actor per work day
+TENTATIVE_ABSENCE_PROBABILITY = 0.25  # Days covered by a "tentative" availability row
+BLOCKED_ABSENCE_PROBABILITY = 0.9  # Days the actor is marked unavailable or booked elsewhere
+EXACT_ABSENCE_THRESHOLD = 0.05  # Likelier absences are sampled one by one, rarer ones as a Poisson count
+PERCENTILES = (50, 80, 90, 95)
+
+
+def weather_loss_probability(forecast: Dict) -> float:
+    """Chance a day's outdoor work is lost: the rain chance, or certain loss in strong wind"""
+    if forecast.get('wind_speed', 0) > MAX_WIND_SPEED:
+        return 1.0
+    return min(max(forecast.get('precipitation_chance', 0) / 100, 0.0), 1.0)
+
+
+def _absence_probabilities(rows: List) -> Dict[str, List[Tuple[date, date, float]]]:
+    """{case-folded actor or character: [(start, end, probability)]} from ActorAvailability rows"""
+    spans = defaultdict(list)
+    for name, rules in availability_windows(rows).items():
+        for start, end in rules['blackouts']:
+            spans[name].append((start, end, BLOCKED_ABSENCE_PROBABILITY))
+    for row in rows:
+        if (row.availability_status or '').lower() != 'tentative':
+            continue
+        actor = getattr(row, 'actor', None)
+        for name in {getattr(actor, 'name', None), row.role_character}:
+            if name and name.strip():
+                spans[name.strip().casefold()].append(
+                    (row.start_date.date(), row.end_date.date(), TENTATIVE_ABSENCE_PROBABILITY)
+                )
+    return spans
+
+
+def _percentiles(values: np.ndarray) -> Dict[str, float]:
+    return {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def _add_shoot_days(day: date, count: int, skip_weekends: bool) -> date:
+    """The date `count` shoot days after day; day itself (even a weekend) when count is 0"""
+    if count == 0:
+        return day
+    if skip_weekends:
+        # Rolling a weekend back to Friday makes the first added day the next Monday
+        return np.busday_offset(day, count, roll='backward').astype(date)
+    return day + timedelta(days=count)
+
+
+class ScheduleRiskModel:
+    """
+    The current schedule as arrays: hours per shoot day (and their variance),
+    outdoor hours per location-day with their weather loss probability, and
+    hours per actor-day with the actor's absence probability
+    """
+
+    def __init__(
+        self,
+        scenes: List,
+        scene_actors: List,
+        availability_rows: List,
+        day_hours: float = DEFAULT_DAY_HOURS,
+        duration_sigma: float = DURATION_SIGMA,
+        actor_absence: float = ACTOR_ABSENCE_PROBABILITY
+    ):
+        self.day_hours = day_hours
+        self.days = sorted({scene.scheduled_date.date() for scene in scenes})
+        day_index = {day: i for i, day in enumerate(self.days)}
+        hours = {scene.id: parse_duration_hours(scene.estimated_duration) for scene in scenes}
+        scene_day = {scene.id: day_index[scene.scheduled_date.date()] for scene in scenes}
+        scene_days = np.array([scene_day[scene.id] for scene in scenes], dtype=np.int64)
+        scene_hours = np.array([hours[scene.id] for scene in scenes], dtype=float)
+
+        self.planned_hours = np.bincount(scene_days, weights=scene_hours, minlength=len(self.days))
+        # Log-normal multipliers with mean 1; a day's total is close to normal by the central limit
+        self.hours_sd = np.sqrt(
+            np.bincount(scene_days, weights=scene_hours ** 2, minlength=len(self.days))
+            * (math.exp(duration_sigma ** 2) - 1)
+        )
+
+        outdoor = defaultdict(float)
+        for scene in scenes:
+            if scene.location_type == 'outdoor':
+                outdoor[(location_key(scene.location_name), scene.scheduled_date.date())] += hours[scene.id]
+        self.outdoor_hours = np.array(list(outdoor.values()), dtype=float)
+        self.weather_probability = np.zeros(len(outdoor))
+        if outdoor and self.days:
+            names = {location_key(scene.location_name): scene.location_name for scene in scenes}
+            forecasts = weather_forecasts.prefetch(
+                [names[key] for key in {key for key, _ in outdoor}], self.days[0], self.days[-1]
+            )
+            self.weather_probability = np.array([
+                weather_loss_probability(forecasts[key][day]) for key, day in outdoor
+            ])
+
+        absences = _absence_probabilities(availability_rows)
+        actor_hours = defaultdict(float)
+        for actor_name, scene_id in scene_actors:
+            if scene_id in scene_day:
+                actor_hours[(actor_name.strip().casefold(), scene_day[scene_id])] += hours[scene_id]
+        self.actor_hours = np.array(list(actor_hours.values()), dtype=float)
+        self.absence_probability = np.array([
+            max([actor_absence] + [
+                probability for start, end, probability in absences.get(actor, [])
+                if start <= self.days[day] <= end
+            ])
+            for actor, day in actor_hours
+        ], dtype=float)
+
+    def sample(self, iterations: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Extra hours per iteration from weather, actor absences and duration overruns (float32 draws)"""
+        weather = self._bernoulli_hours(rng, iterations, self.weather_probability, self.outdoor_hours)
+
+        exact = self.absence_probability >= EXACT_ABSENCE_THRESHOLD
+        actors = self._bernoulli_hours(rng, iterations, self.absence_probability[exact], self.actor_hours[exact])
+        rare_probability, rare_hours = self.absence_probability[~exact], self.actor_hours[~exact]
+        rate = rare_probability.sum()
+        if rate > 0:
+            # Rare absences: a Poisson count per iteration, each picking an actor-day by its probability
+            counts = rng.poisson(rate, iterations)
+            picks = rng.choice(rare_hours.size, size=int(counts.sum()), p=rare_probability / rate)
+            actors += np.bincount(np.repeat(np.arange(iterations), counts), weights=rare_hours[picks], minlength=iterations)
+
+        noise = rng.standard_normal((iterations, self.planned_hours.size), dtype=np.float32)
+        noise *= self.hours_sd.astype(np.float32)
+        # A day overruns once its actual hours pass both the plan and a full day
+        slack = (np.maximum(self.planned_hours, self.day_hours) - self.planned_hours).astype(np.float32)
+        noise -= slack
+        overrun = np.maximum(noise, 0.0).sum(axis=1, dtype=np.float64)
+        return {'weather': weather, 'actors': actors, 'overrun': overrun}
+
+    @staticmethod
+    def _bernoulli_hours(rng: np.random.Generator, iterations: int, probability: np.ndarray, hours: np.ndarray) -> np.ndarray:
+        """Per iteration, the summed hours of the items whose Bernoulli(probability) draw came up"""
+        if not probability.size:
+            return np.zeros(iterations)
+        hit = rng.random((iterations, probability.size), dtype=np.float32) < probability.astype(np.float32)
+        return (hit @ hours.astype(np.float32)).astype(np.float64)
+
+    def simulate(self, iterations: int, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+        rng = np.random.default_rng(seed)
+        parts = [self.sample(min(SIMULATION_CHUNK, iterations - done), rng) for done in range(0, iterations, SIMULATION_CHUNK)]
+        samples = {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+        # Lost and overrun hours are made up on extra shoot days
+        samples['slip_days'] = np.ceil((samples['weather'] + samples['actors'] + samples['overrun']) / self.day_hours - 1e-9)
+        return samples
+
+
+def simulate_schedule_risk(
+    db: Session,
+    project_id: int,
+    iterations: int = DEFAULT_ITERATIONS,
+    seed: Optional[int] = None,
+    skip_weekends: bool = True,
+    daily_cost: Optional[float] = None,
+    duration_sigma: float = DURATION_SIGMA,
+    actor_absence: float = ACTOR_ABSENCE_PROBABILITY
+) -> Dict:
+    """
+    Completion-date and budget percentiles for the project's remaining scheduled scenes
+
+    Budget figures need a daily cost: `daily_cost`, or else the project's
+    budget_total spread over its planned shoot days.
+    """
+    started = time.perf_counter()
+    remaining = (
+        Scene.project_id == project_id,
+        Scene.scheduled_date.isnot(None),
+        or_(Scene.status.is_(None), Scene.status != 'completed')
+    )
+    scenes = db.query(
+        Scene.id, Scene.scheduled_date, Scene.location_name, Scene.location_type, Scene.estimated_duration
+    ).filter(*remaining).all()
+    if not scenes:
+        return {'iterations': 0, 'scenes': 0, 'message': 'No scheduled scenes to simulate'}
+
+    scene_actors = db.query(SceneActor.actor_name, SceneActor.scene_id).join(
+        Scene, Scene.id == SceneActor.scene_id
+    ).filter(*remaining).all()
+    availability = db.query(ActorAvailability).filter(ActorAvailability.project_id == project_id).all()
+    model = ScheduleRiskModel(scenes, scene_actors, availability, duration_sigma=duration_sigma, actor_absence=actor_absence)
+    samples = model.simulate(iterations, seed)
+    slip = samples['slip_days']
+
+    planned_days = len(model.days)
+    if daily_cost is None:
+        budget_total = db.query(Project.budget_total).filter(Project.id == project_id).scalar() or 0.0
+        daily_cost = budget_total / planned_days if budget_total else None
+    finish = model.days[-1]
+
+    return {
+        'iterations': iterations,
+        'seed': seed,
+        'scenes': len(scenes),
+        'shoot_days': planned_days,
+        'planned_completion': finish,
+        'on_time_probability': float((slip == 0).mean()),
+        'slip_days': {'mean': float(slip.mean()), **_percentiles(slip), 'max': float(slip.max())},
+        'completion_date': {
+            key: _add_shoot_days(finish, int(math.ceil(value)), skip_weekends)
+            for key, value in _percentiles(slip).items()
+        },
+        'budget': {
+            'daily_cost': daily_cost,
+            'planned': daily_cost * planned_days,
+            **{key: daily_cost * (planned_days + value) for key, value in _percentiles(slip).items()}
+        } if daily_cost else None,
+        'drivers': {
+            'weather_hours': float(samples['weather'].mean()),
+            'actor_absence_hours': float(samples['actors'].mean()),
+            'overrun_hours': float(samples['overrun'].mean())
+        },
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
@@ -0,0 +1,923 @@
+"""
+Constraint Scheduling Solver
+Assigns scenes to shoot days with local search over a compact integer model:
+- Hard constraints: actor availability windows, location availability,
+  day/night shifts and daily capacity in hours
+- Objective: shoot days used, wrap date, company moves, actor cost
+  (daily actors by days worked, weekly/monthly actors by days held),
+  outdoor weather risk and overtime hours
+- Annealing: simulated annealing with a short tabu list, run as independent
+  restarts with different objective weights across a process pool; returns
+  the best schedule plus the Pareto-optimal alternatives
+"""
+
+import copy
+import logging
+import math
+import multiprocessing
+import os
+import re
+import threading
+import time
+import random
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.services.scheduling_service import billing_cost
+
+DEFAULT_SCENE_HOURS = 2.0  # Matches the engine's default of 5 scenes per 10-hour day
+DEFAULT_DAY_HOURS = 10.0
+DEFAULT_TIME_LIMIT = 10.0
+
+# Objective weights (in currency units, so they trade off against actor cost)
+DEFAULT_DAY_COST = 50000.0  # Opening one more shoot day (crew, equipment, base camp)
+DEFAULT_SPAN_COST = 1000.0  # Each calendar day until wrap
+DEFAULT_MOVE_COST = 10000.0  # Each extra location in one shoot day
+DEFAULT_WEATHER_COST = 20000.0  # Each outdoor scene on a day with bad weather, scaled by its risk
+DEFAULT_OVERTIME_COST = 5000.0  # Each hour shot beyond day_hours
+HOLD_DAY_COST = 1.0  # Tie-breaker that keeps every actor's days together
+UNASSIGNED_COST = 1e9
+
+# Multi-start annealing
+SOLVER_PROCESSES = int(os.getenv("SCHEDULE_SOLVER_PROCESSES", str(min(4, os.cpu_count() or 1))))
+RESTART_GRACE_SECONDS = 10.0  # Extra wait for restarts still constructing when the budget runs out
+FINAL_TEMPERATURE_RATIO = 1e-3
+# T0 accepts this percentile of the first uphill deltas 30% of the time. A low one,
+# since the deltas are dominated by moves that open a whole shoot day
+CALIBRATION_PERCENTILE = 0.1
+FINAL_DESCENT_SHARE = 0.1  # Share of the annealing budget kept for hill climbing from the best schedule
+# Weight multipliers per restart; restarts cycle through these so the
+# results spread along the trade-offs and form a Pareto front
+WEIGHT_PROFILES = {
+    'balanced': {},
+    'fewest_days': {'day_cost': 2.0, 'span_cost': 4.0},
+    'fewest_moves': {'move_cost': 4.0},
+    'weather_safe': {'weather_cost': 4.0},
+    'actor_cost': {'day_cost': 0.5, 'span_cost': 0.25},
+    'no_overtime': {'overtime_cost': 4.0},
+}
+
+NIGHT_TIMES = ('night', 'midnight', 'evening')
+# Availability statuses that block a date range; everything else opens one
+BLOCKING_STATUSES = ('unavailable',)
+
+Window = Tuple[date, date]
+
+logger = logging.getLogger(__name__)
+
+
+def parse_duration_hours(value: Any, default: float = DEFAULT_SCENE_HOURS) -> float:
+    """Hours for an estimated_duration such as "4 hours", "90 min", "2 pages" or "half day" """
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value) or default
+    text = str(value).lower()
+    if "half" in text and "day" in text:
+        return DEFAULT_DAY_HOURS / 2
+    match = re.search(r"(\d+(?:\.\d+)?)(?:\s*/\s*(\d+))?\s*(h|hr|hour|m|min|minute|p|pg|page|d|day)?", text)
+    if not match:
+        return default
+    amount = float(match.group(1)) / (float(match.group(2)) if match.group(2) else 1.0)
+    unit = match.group(3) or "h"
+    if unit.startswith("m"):
+        return max(amount / 60, 0.25)
+    if unit.startswith("p"):
+        return amount * 2  # Roughly five pages per shoot day
+    if unit.startswith("d"):
+        return amount * DEFAULT_DAY_HOURS
+    return amount or default
+
+
+def shift_for(time_of_day: Optional[str]) -> int:
+    """0 for day work, 1 for night work"""
+    value = (time_of_day or "").lower()
+    return 1 if any(word in value for word in NIGHT_TIMES) else 0
+
+
+def availability_windows(rows: Iterable) -> Dict[str, Dict[str, List[Window]]]:
+    """
+    ActorAvailability rows as {case-folded name: {'windows': [...], 'blackouts': [...]}}
+
+    Rows are keyed by both the actor's name and the character they play, since
+    scenes list either. "unavailable" rows, and "booked" rows for another
+    project, block their dates; the rest are windows the actor can work in.
+    """
+    windows: Dict[str, Dict[str, List[Window]]] = defaultdict(lambda: {'windows': [], 'blackouts': []})
+    for row in rows:
+        status = (row.availability_status or 'available').lower()
+        blocked = status in BLOCKING_STATUSES or (status == 'booked' and row.conflicting_project)
+        span = (row.start_date.date(), row.end_date.date())
+        actor = getattr(row, 'actor', None)
+        for name in {getattr(actor, 'name', None), row.role_character}:
+            if name and name.strip():
+                windows[name.strip().casefold()]['blackouts' if blocked else 'windows'].append(span)
+    return dict(windows)
+
+
+def _day_mask(days: List[date], rules: Optional[Dict[str, List[Window]]]) -> int:
+    """Bitmask of the days allowed by a set of windows and blackouts"""
+    if not rules:
+        return (1 << len(days)) - 1
+    windows, blackouts = rules.get('windows') or [], rules.get('blackouts') or []
+    mask = 0
+    for i, day in enumerate(days):
+        if windows and not any(start <= day <= end for start, end in windows):
+            continue
+        if any(start <= day <= end for start, end in blackouts):
+            continue
+        mask |= 1 << i
+    return mask
+
+
+class ScheduleModel:
+    """
+    Scenes, days, actors and locations as integers, plus each scene's feasible days.
+
+    Plain data only, so a model can be sent to worker processes.
+    """
+
+    def __init__(
+        self,
+        scenes: List,
+        start_date: datetime,
+        end_date: datetime,
+        actor_availability: Optional[Dict[str, Dict[str, List[Window]]]] = None,
+        location_availability: Optional[Dict[str, Dict[str, List[Window]]]] = None,
+        actor_billing: Optional[Dict[str, Tuple[str, float]]] = None,
+        config: Optional[Dict] = None,
+        weather_risk: Optional[Dict[str, Dict[date, float]]] = None
+    ):
+        config = config or {}
+        self.start_date = start_date
+        self.day_hours = float(config.get('day_hours') or DEFAULT_DAY_HOURS)
+        self.overtime_hours = max(float(config.get('overtime_hours') or 0.0), 0.0)
+        self.allow_split_days = bool(config.get('allow_split_days', False))
+        self.day_cost = float(config.get('day_cost', DEFAULT_DAY_COST))
+        self.span_cost = float(config.get('span_cost', DEFAULT_SPAN_COST))
+        self.move_cost = float(config.get('move_cost', DEFAULT_MOVE_COST))
+        self.weather_cost = float(config.get('weather_cost', DEFAULT_WEATHER_COST))
+        self.overtime_cost = float(config.get('overtime_cost', DEFAULT_OVERTIME_COST))
+
+        # Calendar: index -> date, and the calendar offset used for wrap date and hold days
+        self.days: List[date] = []
+        current = start_date.date()
+        while current <= end_date.date():
+            if not (config.get('skip_weekends', False) and current.weekday() >= 5):
+                self.days.append(current)
+            current += timedelta(days=1)
+        self.day_offsets = [(day - start_date.date()).days for day in self.days]
+
+        self.location_names: List[str] = []
+        self.actor_names: List[str] = []
+        location_ids: Dict[str, int] = {}
+        actor_ids: Dict[str, int] = {}
+        actor_availability = actor_availability or {}
+        location_availability = {
+            name.strip().casefold(): rules for name, rules in (location_availability or {}).items()
+        }
+        weather_risk = {name.strip().casefold(): risk for name, risk in (weather_risk or {}).items()}
+        # Per location, the chance of weather unfit for outdoor work on each day (None: no risk known)
+        self.location_risk: List[Optional[List[float]]] = []
+        mask_cache: Dict[Tuple[str, str], int] = {}
+
+        def mask_for(kind: str, key: str, rules) -> int:
+            if (kind, key) not in mask_cache:
+                mask_cache[(kind, key)] = _day_mask(self.days, rules)
+            return mask_cache[(kind, key)]
+
+        self.scene_ids: List[int] = []
+        self.scene_numbers: List[Optional[str]] = []
+        self.scene_locations: List[int] = []
+        self.scene_shifts: List[int] = []
+        self.scene_hours: List[float] = []
+        self.scene_durations: List[str] = []
+        self.scene_outdoor: List[bool] = []
+        self.scene_actors: List[Tuple[int, ...]] = []
+        self.scene_masks: List[int] = []
+
+        for scene in scenes:
+            location = scene.location_name or 'Unknown'
+            location_key = location.strip().casefold()
+            if location_key not in location_ids:
+                location_ids[location_key] = len(self.location_names)
+                self.location_names.append(location)
+                risk = weather_risk.get(location_key)
+                self.location_risk.append([risk.get(day, 0.0) for day in self.days] if risk else None)
+
+            mask = mask_for('location', location_key, location_availability.get(location_key))
+            actors = []
+            for actor_info in scene.actors_data or []:
+                name = (actor_info.get('name') or '').strip() if isinstance(actor_info, dict) else ''
+                if not name:
+                    continue
+                key = name.casefold()
+                if key not in actor_ids:
+                    actor_ids[key] = len(self.actor_names)
+                    self.actor_names.append(name)
+                if actor_ids[key] not in actors:
+                    actors.append(actor_ids[key])
+                mask &= mask_for('actor', key, actor_availability.get(key))
+
+            self.scene_ids.append(scene.id)
+            self.scene_numbers.append(scene.scene_number)
+            self.scene_locations.append(location_ids[location_key])
+            self.scene_shifts.append(shift_for(scene.time_of_day))
+            # A scene longer than a day still has to fit on one
+            self.scene_hours.append(min(parse_duration_hours(scene.estimated_duration), self.day_hours))
+            self.scene_durations.append(scene.estimated_duration or '4 hours')
+            self.scene_outdoor.append(scene.location_type == 'outdoor')
+            self.scene_actors.append(tuple(actors))
+            self.scene_masks.append(mask)
+
+        # Feasible day indices per scene, in calendar order
+        self.scene_days: List[Tuple[int, ...]] = [
+            tuple(i for i in range(len(self.days)) if mask >> i & 1) for mask in self.scene_masks
+        ]
+
+        actor_billing = actor_billing or {}
+        self.actor_billing: List[Optional[Tuple[str, float]]] = [
+            actor_billing.get(name.casefold()) for name in self.actor_names
+        ]
+
+    @property
+    def scene_count(self) -> int:
+        return len(self.scene_ids)
+
+    def reweighted(self, multipliers: Dict[str, float]) -> 'ScheduleModel':
+        """Copy sharing this model's data, with objective weights scaled"""
+        model = copy.copy(self)
+        for weight, factor in multipliers.items():
+            setattr(model, weight, getattr(self, weight) * factor)
+        return model
+
+    def weighted_objective(self, stats: Dict) -> float:
+        """This model's objective for a result's 'solver' stats, so results from other weights compare"""
+        return (
+            self.day_cost * stats['shoot_days']
+            + self.span_cost * stats['span_days']
+            + self.move_cost * stats['company_moves']
+            + stats['actor_cost']
+            + self.weather_cost * stats['weather_risk']
+            + self.overtime_cost * stats['overtime_hours']
+            + UNASSIGNED_COST * stats['unassigned']
+        )
+
+
+class ScheduleSolver:
+    """
+    Local search over a ScheduleModel: greedy construction, then relocate,
+    swap and empty-a-day moves until the time limit or no further improvement
+    """
+
+    def __init__(self, model: ScheduleModel, seed: Optional[int] = None):
+        self.model = model
+        self.rng = random.Random(seed)
+        self._reset()
+        self.iterations = 0
+        self.improvements = 0
+
+    # ---------------------------------------------------------------- state
+
+    def _reset(self) -> None:
+        model = self.model
+        day_count = len(model.days)
+        self.assign: List[int] = [-1] * model.scene_count
+        self.day_scenes: List[set] = [set() for _ in range(day_count)]
+        self.day_used_hours: List[float] = [0.0] * day_count
+        self.day_shift_counts: List[List[int]] = [[0, 0] for _ in range(day_count)]
+        self.day_locations: List[Counter] = [Counter() for _ in range(day_count)]
+        self.day_weather: List[float] = [0.0] * day_count
+        self.actor_days: List[Counter] = [Counter() for _ in model.actor_names]
+        self.location_days: List[Counter] = [Counter() for _ in model.location_names]
+        self.used_days = 0
+        self.last_day = -1
+        self.unassigned = model.scene_count
+
+    def load(self, assign: List[int]) -> None:
+        """Replace the current schedule with a saved assignment"""
+        self._reset()
+        for scene, day in enumerate(assign):
+            if day >= 0:
+                self._place(scene, day)
+
+    def _weather(self, scene: int, day: int) -> float:
+        m = self.model
+        risk = m.location_risk[m.scene_locations[scene]]
+        return risk[day] if risk and m.scene_outdoor[scene] else 0.0
+
+    def _place(self, scene: int, day: int) -> None:
+        m = self.model
+        self.assign[scene] = day
+        if not self.day_scenes[day]:
+            self.used_days += 1
+        self.day_scenes[day].add(scene)
+        self.day_used_hours[day] += m.scene_hours[scene]
+        self.day_shift_counts[day][m.scene_shifts[scene]] += 1
+        self.day_locations[day][m.scene_locations[scene]] += 1
+        self.day_weather[day] += self._weather(scene, day)
+        self.location_days[m.scene_locations[scene]][day] += 1
+        for actor in m.scene_actors[scene]:
+            self.actor_days[actor][day] += 1
+        self.unassigned -= 1
+        if day > self.last_day:
+            self.last_day = day
+
+    def _remove(self, scene: int) -> int:
+        m = self.model
+        day = self.assign[scene]
+        self.assign[scene] = -1
+        self.day_scenes[day].discard(scene)
+        if not self.day_scenes[day]:
+            self.used_days -= 1
+        self.day_used_hours[day] -= m.scene_hours[scene]
+        self.day_shift_counts[day][m.scene_shifts[scene]] -= 1
+        self.day_weather[day] -= self._weather(scene, day)
+        location = m.scene_locations[scene]
+        self._decrement(self.day_locations[day], location)
+        self._decrement(self.location_days[location], day)
+        for actor in m.scene_actors[scene]:
+            self._decrement(self.actor_days[actor], day)
+        self.unassigned += 1
+        if day == self.last_day:
+            while self.last_day >= 0 and not self.day_scenes[self.last_day]:
+                self.last_day -= 1
+        return day
+
+    @staticmethod
+    def _decrement(counter: Counter, key: int) -> None:
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+    def can_place(self, scene: int, day: int) -> bool:
+        m = self.model
+        if not m.scene_masks[scene] >> day & 1:
+            return False
+        if self.day_used_hours[day] + m.scene_hours[scene] > m.day_hours + m.overtime_hours + 1e-9:
+            return False
+        if not m.allow_split_days and self.day_shift_counts[day][1 - m.scene_shifts[scene]]:
+            return False
+        return True
+
+    # ------------------------------------------------------------ objective
+
+    def actor_cost(self, actor: int) -> float:
+        days = self.actor_days[actor]
+        if not days:
+            return 0.0
+        offsets = self.model.day_offsets
+        held = offsets[max(days)] - offsets[min(days)] + 1
+        billing = self.model.actor_billing[actor]
+        cost = HOLD_DAY_COST * held
+        if billing:
+            cycle, rate = billing
+            # Daily actors are paid for days worked; weekly/monthly actors for the days they are held
+            cost += billing_cost(cycle, rate, len(days) if cycle == 'daily' else held)
+        return cost
+
+    def day_cost(self, day: int) -> float:
+        locations = len(self.day_locations[day])
+        if not locations:
+            return 0.0
+        m = self.model
+        overtime = max(self.day_used_hours[day] - m.day_hours, 0.0)
+        return (
+            m.day_cost + m.move_cost * (locations - 1)
+            + m.overtime_cost * overtime + m.weather_cost * self.day_weather[day]
+        )
+
+    def global_cost(self) -> float:
+        span = self.model.day_offsets[self.last_day] + 1 if self.last_day >= 0 else 0
+        return self.model.span_cost * span + UNASSIGNED_COST * self.unassigned
+
+    def local_cost(self, days: Iterable[int], actors: Iterable[int]) -> float:
+        """Objective terms touched by a move on these days and actors"""
+        return (
+            sum(self.day_cost(day) for day in set(days) if day >= 0)
+            + sum(self.actor_cost(actor) for actor in set(actors))
+            + self.global_cost()
+        )
+
+    def objective(self) -> float:
+        return self.local_cost(range(len(self.model.days)), range(len(self.model.actor_names)))
+
+    def accept(self, delta: float) -> bool:
+        """Move acceptance; plain hill climbing here"""
+        return delta < -1e-6
+
+    # ---------------------------------------------------------- construction
+
+    def _candidate_days(self, scene: int, exclude: int = -1, spread: int = 2) -> List[int]:
+        """Days worth trying for a scene: where its location or actors already shoot, plus a few open ones"""
+        m = self.model
+        candidates = set(self.location_days[m.scene_locations[scene]])
+        for actor in m.scene_actors[scene]:
+            candidates.update(self.actor_days[actor])
+        feasible = m.scene_days[scene]
+        if feasible:
+            opened = 0
+            for day in feasible:
+                if day not in candidates and day != exclude and self.can_place(scene, day):
+                    candidates.add(day)
+                    opened += 1
+                    if opened >= spread:
+                        break
+            for _ in range(spread):
+                candidates.add(feasible[self.rng.randrange(len(feasible))])
+        candidates.discard(exclude)
+        return [day for day in candidates if self.can_place(scene, day)]
+
+    def _best_day(self, scene: int, exclude: int = -1) -> Tuple[int, float]:
+        """Cheapest feasible day for an unplaced scene and the resulting change in cost"""
+        m = self.model
+        actors = m.scene_actors[scene]
+        best_day, best_delta = -1, float('inf')
+        for day in self._candidate_days(scene, exclude):
+            before = self.local_cost((day,), actors)
+            self._place(scene, day)
+            delta = self.local_cost((day,), actors) - before
+            self._remove(scene)
+            if delta < best_delta:
+                best_day, best_delta = day, delta
+        return best_day, best_delta
+
+    def construct(self) -> None:
+        """Place the most constrained scenes first, each on its cheapest candidate day"""
+        m = self.model
+        order = sorted(
+            range(m.scene_count),
+            key=lambda s: (len(m.scene_days[s]), -m.scene_hours[s], m.scene_locations[s], self.rng.random())
+        )
+        for scene in order:
+            day, _ = self._best_day(scene)
+            if day >= 0:
+                self._place(scene, day)
+
+    # ----------------------------------------------------------------- moves
+
+    def _try_relocate(self, scene: int) -> bool:
+        m = self.model
+        old_day = self.assign[scene]
+        if old_day < 0:
+            day, _ = self._best_day(scene)
+            if day < 0:
+                return False
+            self._place(scene, day)
+            return True
+
+        actors = m.scene_actors[scene]
+        before = self.local_cost((old_day,), actors)
+        self._remove(scene)
+        removed = self.local_cost((old_day,), actors)
+        day, delta = self._best_day(scene, exclude=old_day)
+        if day >= 0 and self.accept(removed - before + delta):
+            self._place(scene, day)
+            return True
+        self._place(scene, old_day)
+        return False
+
+    def _try_swap(self, first: int, second: int) -> bool:
+        m = self.model
+        day_a, day_b = self.assign[first], self.assign[second]
+        if day_a < 0 or day_b < 0 or day_a == day_b:
+            return False
+        days = (day_a, day_b)
+        actors = m.scene_actors[first] + m.scene_actors[second]
+        before = self.local_cost(days, actors)
+        self._remove(first)
+        self._remove(second)
+        if self.can_place(first, day_b):
+            self._place(first, day_b)
+            if self.can_place(second, day_a):
+                self._place(second, day_a)
+                if self.accept(self.local_cost(days, actors) - before):
+                    return True
+                self._remove(second)
+            self._remove(first)
+        self._place(first, day_a)
+        self._place(second, day_b)
+        return False
+
+    def _try_empty_day(self, day: int) -> bool:
+        """Move every scene off one day, so the day is no longer shot"""
+        m = self.model
+        scenes = list(self.day_scenes[day])
+        if not scenes:
+            return False
+        actors = tuple(a for s in scenes for a in m.scene_actors[s])
+        touched = {day}
+        before = self.local_cost(touched, actors)
+        moved = []
+        for scene in scenes:
+            self._remove(scene)
+        for scene in sorted(scenes, key=lambda s: len(m.scene_days[s])):
+            target, _ = self._best_day(scene, exclude=day)
+            if target < 0:
+                break
+            if target not in touched:
+                # Nothing has been moved onto this day yet, so this is its cost before the move
+                before += self.day_cost(target)
+                touched.add(target)
+            self._place(scene, target)
+            moved.append(scene)
+        else:
+            if self.accept(self.local_cost(touched, actors) - before):
+                return True
+        for scene in moved:
+            self._remove(scene)
+        for scene in scenes:
+            self._place(scene, day)
+        return False
+
+    def _try_insert_with_ejection(self, scene: int) -> bool:
+        """Place an unassigned scene on a feasible day by moving out the scenes in its way"""
+        m = self.model
+        feasible = m.scene_days[scene]
+        if not feasible or self.assign[scene] >= 0:
+            return False
+        day = feasible[self.rng.randrange(len(feasible))]
+        shift = m.scene_shifts[scene]
+
+        # Eject the other shift's scenes, then the shortest ones until the scene fits
+        blocking = [s for s in self.day_scenes[day] if not m.allow_split_days and m.scene_shifts[s] != shift]
+        rest = sorted(
+            (s for s in self.day_scenes[day] if s not in blocking),
+            key=lambda s: (m.scene_locations[s] == m.scene_locations[scene], m.scene_hours[s])
+        )
+        free = m.day_hours - self.day_used_hours[day] + sum(m.scene_hours[s] for s in blocking)
+        ejected = list(blocking)
+        for other in rest:
+            if free + 1e-9 >= m.scene_hours[scene]:
+                break
+            ejected.append(other)
+            free += m.scene_hours[other]
+
+        actors = m.scene_actors[scene] + tuple(a for s in ejected for a in m.scene_actors[s])
+        touched = {day}
+        before = self.local_cost(touched, actors)
+        for other in ejected:
+            self._remove(other)
+        self._place(scene, day)
+        replaced = []
+        for other in ejected:
+            target, _ = self._best_day(other, exclude=day)
+            if target < 0:
+                continue  # Left unassigned; the cost decides whether this is still better
+            if target not in touched:
+                before += self.day_cost(target)
+                touched.add(target)
+            self._place(other, target)
+            replaced.append(other)
+        if self.accept(self.local_cost(touched, actors) - before):
+            return True
+
+        for other in replaced:
+            self._remove(other)
+        self._remove(scene)
+        for other in ejected:
+            self._place(other, day)
+        return False
+
+    # ------------------------------------------------------------------ run
+
+    def _random_move(self) -> bool:
+        """Try one randomly chosen move; True if it was applied"""
+        m = self.model
+        roll = self.rng.random()
+        if self.unassigned and roll < 0.3:
+            unassigned = [s for s, day in enumerate(self.assign) if day < 0 and m.scene_days[s]]
+            return bool(unassigned) and self._try_insert_with_ejection(self.rng.choice(unassigned))
+        if roll < 0.6:
+            return self._try_relocate(self.rng.randrange(m.scene_count))
+        if roll < 0.8:
+            return self._try_swap(self.rng.randrange(m.scene_count), self.rng.randrange(m.scene_count))
+        used = [d for d in range(self.last_day + 1) if self.day_scenes[d]]
+        # Lightly loaded days are the easiest to clear
+        day = min(self.rng.sample(used, min(3, len(used))), key=lambda d: len(self.day_scenes[d])) if used else -1
+        return day >= 0 and self._try_empty_day(day)
+
+    def improve(self, deadline: float, patience: Optional[int] = None) -> None:
+        """Apply random moves until the deadline or `patience` moves in a row fail"""
+        m = self.model
+        if m.scene_count == 0:
+            return
+        patience = patience or max(2000, 5 * m.scene_count)
+        stale = 0
+        while stale < patience and time.monotonic() < deadline:
+            self.iterations += 1
+            improved = self._random_move()
+            if improved:
+                self.improvements += 1
+                stale = 0
+            else:
+                stale += 1
+
+    def solve(self, time_limit: float = DEFAULT_TIME_LIMIT) -> Dict:
+        started = time.monotonic()
+        self.construct()
+        self.improve(started + time_limit)
+        return self.result(time.monotonic() - started)
+
+    # ---------------------------------------------------------------- output
+
+    def result(self, elapsed: float = 0.0) -> Dict:
+        """Schedule in the same shape as SchedulingEngine.schedule_scenes"""
+        m = self.model
+        schedule = []
+        conflicts = []
+        for scene, day in enumerate(self.assign):
+            if day < 0:
+                reason = 'no_feasible_date' if not m.scene_days[scene] else 'capacity_exceeded'
+                conflicts.append({
+                    'type': reason,
+                    'message': (
+                        f'No date in the timeline satisfies actor and location availability for scene {m.scene_ids[scene]}'
+                        if reason == 'no_feasible_date'
+                        else f'Cannot fit scene {m.scene_ids[scene]} within project timeline'
+                    ),
+                    'scene_id': m.scene_ids[scene]
+                })
+                continue
+            schedule.append({
+                'scene_id': m.scene_ids[scene],
+                'scene_number': m.scene_numbers[scene],
+                'location': m.location_names[m.scene_locations[scene]],
+                'scheduled_date': m.start_date + timedelta(days=m.day_offsets[day]),
+                'shift': 'night' if m.scene_shifts[scene] else 'day',
+                'estimated_duration': m.scene_durations[scene]
+            })
+        schedule.sort(key=lambda item: (item['scheduled_date'], item['location']))
+
+        actor_cost = sum(
+            self.actor_cost(actor) - HOLD_DAY_COST * (
+                m.day_offsets[max(self.actor_days[actor])] - m.day_offsets[min(self.actor_days[actor])] + 1
+            )
+            for actor in range(len(m.actor_names)) if self.actor_days[actor]
+        )
+        completion = m.start_date + timedelta(days=m.day_offsets[self.last_day]) if self.last_day >= 0 else m.start_date
+        return {
+            'schedule': schedule,
+            'total_days': (completion - m.start_date).days + 1 if schedule else 0,
+            'conflicts': conflicts,
+            'completion_date': completion,
+            'solver': {
+                'shoot_days': self.used_days,
+                'span_days': m.day_offsets[self.last_day] + 1 if self.last_day >= 0 else 0,
+                'company_moves': sum(max(len(locations) - 1, 0) for locations in self.day_locations),
+                'actor_cost': round(actor_cost, 2),
+                'weather_risk': round(sum(max(risk, 0.0) for risk in self.day_weather), 3),
+                'overtime_hours': round(sum(max(hours - m.day_hours, 0.0) for hours in self.day_used_hours), 2),
+                'unassigned': self.unassigned,
+                'objective': round(self.objective(), 2),
+                'iterations': self.iterations,
+                'improvements': self.improvements,
+                'elapsed_seconds': round(elapsed, 3)
+            }
+        }
+
+
+class AnnealingSolver(ScheduleSolver):
+    """
+    Simulated annealing over the same moves: worse schedules are accepted with
+    probability exp(-delta / T) while T cools geometrically over the time limit.
+    A scene may not move back to a day it just left for `tabu_tenure` moves.
+    The walk starts and ends with plain hill climbing (from the construction,
+    then from the best schedule seen), so it never returns a worse schedule
+    than ScheduleSolver would reach.
+    """
+
+    def __init__(self, model: ScheduleModel, seed: Optional[int] = None, tabu_tenure: Optional[int] = None):
+        super().__init__(model, seed)
+        self.tabu_tenure = tabu_tenure or max(20, model.scene_count // 10)
+        self.tabu: Dict[Tuple[int, int], int] = {}
+        self.temperature: Optional[float] = None
+        self.initial_temperature: Optional[float] = None
+        self._uphill: List[float] = []
+        self._last_delta = 0.0
+        self._descending = False
+
+    def _make_tabu(self, scenes: Iterable[int], day: int) -> None:
+        if self._descending:
+            return
+        for scene in scenes:
+            if self.assign[scene] != day:
+                self.tabu[(scene, day)] = self.iterations + self.tabu_tenure
+
+    def _try_relocate(self, scene: int) -> bool:
+        day = self.assign[scene]
+        moved = super()._try_relocate(scene)
+        if moved and day >= 0:
+            self._make_tabu((scene,), day)
+        return moved
+
+    def _try_swap(self, first: int, second: int) -> bool:
+        day_a, day_b = self.assign[first], self.assign[second]
+        moved = super()._try_swap(first, second)
+        if moved:
+            self._make_tabu((first,), day_a)
+            self._make_tabu((second,), day_b)
+        return moved
+
+    def _try_empty_day(self, day: int) -> bool:
+        scenes = list(self.day_scenes[day])
+        moved = super()._try_empty_day(day)
+        if moved:
+            self._make_tabu(scenes, day)
+        return moved
+
+    def _candidate_days(self, scene: int, exclude: int = -1, spread: int = 2) -> List[int]:
+        return [
+            day for day in super()._candidate_days(scene, exclude, spread)
+            if self.tabu.get((scene, day), 0) <= self.iterations
+        ]
+
+    def accept(self, delta: float) -> bool:
+        if delta < -1e-6:
+            accepted = True
+        elif self._descending:
+            accepted = False
+        elif self.temperature is None:
+            # Calibrate on the first uphill moves: a low percentile of them starts out accepted 30% of the time
+            if delta > 1e-6:
+                self._uphill.append(delta)
+            if len(self._uphill) >= 100:
+                calibration = sorted(self._uphill)[int(len(self._uphill) * CALIBRATION_PERCENTILE)]
+                self.initial_temperature = self.temperature = max(calibration / -math.log(0.3), 1e-6)
+            accepted = False
+        else:
+            accepted = delta < 1e-6 or self.rng.random() < math.exp(-delta / self.temperature)
+        if accepted:
+            self._last_delta = delta
+        return accepted
+
+    def _descend(self, deadline: float, patience: Optional[int] = None) -> None:
+        """Hill climb (ScheduleSolver.improve) without tabu restrictions"""
+        self._descending = True
+        self.tabu = {}
+        try:
+            super().improve(deadline, patience)
+        finally:
+            self._descending = False
+
+    def improve(self, deadline: float, patience: Optional[int] = None) -> None:
+        m = self.model
+        if m.scene_count == 0:
+            return
+        patience = patience or max(2000, 5 * m.scene_count)
+        anneal_deadline = deadline - (deadline - time.monotonic()) * FINAL_DESCENT_SHARE
+        self._descend(anneal_deadline, patience)
+        if time.monotonic() >= anneal_deadline:
+            # Still improving when time ran out: annealing now would only lose ground
+            self._descend(deadline, patience)
+            return
+
+        started = time.monotonic()
+        budget = max(anneal_deadline - started, 1e-6)
+        current = best = self.objective()
+        best_assign = list(self.assign)
+        stale = 0
+        while time.monotonic() < anneal_deadline:
+            self.iterations += 1
+            if self.iterations % 100 == 0 and self.initial_temperature is not None:
+                progress = min((time.monotonic() - started) / budget, 1.0)
+                self.temperature = self.initial_temperature * FINAL_TEMPERATURE_RATIO ** progress
+            if self.iterations % 1000 == 0:
+                current = self.objective()  # Drop rounding drift from the running total
+                self.tabu = {key: until for key, until in self.tabu.items() if until > self.iterations}
+
+            unassigned = self.unassigned
+            if not self._random_move():
+                stale += 1
+                # Frozen and stuck: further moves will not be accepted
+                if stale >= patience and self.temperature is not None and \
+                        self.temperature <= self.initial_temperature * FINAL_TEMPERATURE_RATIO * 10:
+                    break
+                continue
+            stale = 0
+            # Placing an unassigned scene does not go through accept(), so recount
+            current = current + self._last_delta if self.unassigned == unassigned else self.objective()
+            if current < best - 1e-6:
+                best = current
+                best_assign = list(self.assign)
+                self.improvements += 1
+        self.load(best_assign)
+        self._descend(deadline, patience)
+
+
+_solver_pool: Optional[ProcessPoolExecutor] = None
+_solver_pool_lock = threading.Lock()
+
+
+def get_solver_pool() -> ProcessPoolExecutor:
+    """Shared process pool for annealing restarts (spawned, so it is safe from threads)"""
+    global _solver_pool
+    with _solver_pool_lock:
+        if _solver_pool is None:
+            _solver_pool = ProcessPoolExecutor(
+                max_workers=SOLVER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _solver_pool
+
+
+def shutdown_solver_pool() -> None:
+    global _solver_pool
+    with _solver_pool_lock:
+        if _solver_pool is not None:
+            _solver_pool.shutdown(wait=False, cancel_futures=True)
+            _solver_pool = None
+
+
+def run_restart(model: ScheduleModel, profile: str, seed: Optional[int], deadline: float) -> Dict:
+    """One annealing run with a weight profile, until `deadline` (wall-clock time.time())"""
+    solver = AnnealingSolver(model.reweighted(WEIGHT_PROFILES[profile]), seed=seed)
+    result = solver.solve(max(deadline - time.time(), 0.1))
+    result['solver']['profile'] = profile
+    return result
+
+
+def pareto_front(results: List[Dict]) -> List[Dict]:
+    """Results no other result beats on every criterion, one per distinct outcome"""
+    keys = ('unassigned', 'shoot_days', 'span_days', 'actor_cost', 'company_moves', 'weather_risk', 'overtime_hours')
+    points = [tuple(result['solver'][key] for key in keys) for result in results]
+    front, seen = [], set()
+    for result, point in zip(results, points):
+        if point in seen:
+            continue
+        dominated = any(
+            other != point and all(o <= p for o, p in zip(other, point))
+            for other in points
+        )
+        if not dominated:
+            seen.add(point)
+            front.append(result)
+    return front
+
+
+def solve_multistart(
+    model: ScheduleModel,
+    time_budget: float,
+    restarts: Optional[int] = None,
+    seed: Optional[int] = None
+) -> Dict:
+    """
+    Independent annealing restarts across the solver pool within a wall-clock budget
+
+    Returns:
+        The best result under the model's own weights, with the other
+        Pareto-optimal results under 'alternatives'
+    """
+    started = time.time()
+    deadline = started + time_budget
+    # By default at least one restart per weight profile, so the Pareto alternatives exist even on one CPU
+    restarts = max(restarts or max(SOLVER_PROCESSES, len(WEIGHT_PROFILES)), 1)
+    profiles = list(WEIGHT_PROFILES)
+    # Restarts beyond the pool size queue up, so each wave of them gets its own share of the budget
+    waves = -(-restarts // SOLVER_PROCESSES)
+    jobs = [
+        (
+            profiles[i % len(profiles)],
+            None if seed is None else seed * 1000 + i,
+            started + time_budget * (i // SOLVER_PROCESSES + 1) / waves
+        )
+        for i in range(restarts)
+    ]
+
+    results = []
+    if restarts > 1:
+        try:
+            pool = get_solver_pool()
+            futures = [pool.submit(run_restart, model, *job) for job in jobs]
+            done, pending = wait(futures, timeout=time_budget + RESTART_GRACE_SECONDS)
+            for future in pending:
+                future.cancel()
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    results.append(future.result())
+                else:
+                    logger.warning(f"Schedule annealing restart failed: {error}")
+                    if isinstance(error, BrokenProcessPool):
+                        raise error
+        except BrokenProcessPool:
+            # A crashed worker poisons the pool; solve here and start a fresh pool next time
+            shutdown_solver_pool()
+    if not results:
+        results = [run_restart(model, jobs[0][0], jobs[0][1], max(deadline, time.time() + 1.0))]
+
+    results.sort(key=lambda result: model.weighted_objective(result['solver']))
+    best = results[0]
+    alternatives = [result for result in pareto_front(results) if result is not best]
+    best['solver'].update({
+        'objective': round(model.weighted_objective(best['solver']), 2),
+        'restarts': len(results),
+        'elapsed_seconds': round(time.time() - started, 3)
+    })
+    for result in alternatives:
+        result['solver']['objective'] = round(model.weighted_objective(result['solver']), 2)
+    best['alternatives'] = alternatives
+    return best
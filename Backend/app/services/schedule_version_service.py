@@ -0,0 +1,261 @@
+"""
+Schedule Version Service
+Caches scheduler previews by a fingerprint of their inputs (the project's
+unplanned scenes, actor availability, actor costs and the location catalog),
+and stores scheduler outputs as named versions to compare and apply later
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session
+
+from app.models import Scene, ActorAvailability, GlobalCost, Location, ScheduleVersion
+from app.services.scheduling_service import SchedulingEngine
+
+PREVIEW_CACHE_SECONDS = int(os.getenv("SCHEDULE_PREVIEW_CACHE_SECONDS", "600"))
+PREVIEW_CACHE_SIZE = int(os.getenv("SCHEDULE_PREVIEW_CACHE_SIZE", "128"))
+
+UNPLANNED = or_(Scene.status == 'unplanned', Scene.status.is_(None))
+
+
+def _jsonable(value: Any) -> Any:
+    """Scheduler output with dates as ISO strings, for JSON columns and cache keys"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+def _parse_datetime(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class SchedulePreviewCache:
+    """Scheduler results by (project, input fingerprint, mode, params), least recently used first out"""
+
+    def __init__(self, ttl_seconds: int = PREVIEW_CACHE_SECONDS, max_entries: int = PREVIEW_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict]]" = OrderedDict()
+
+    def get(self, key: Tuple) -> Optional[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if not cached:
+                return None
+            if now - cached[0] >= self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return cached[1]
+
+    def put(self, key: Tuple, result: Dict) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, project_id: Optional[int] = None) -> None:
+        """Drop one project's previews, or all of them"""
+        with self._lock:
+            if project_id is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == project_id]:
+                    del self._entries[key]
+
+
+preview_cache = SchedulePreviewCache()
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_previews(session: Session, flush_context) -> None:
+    """Scene, availability or actor cost writes make that project's cached previews stale"""
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Scene, ActorAvailability)):
+            preview_cache.invalidate(obj.project_id)
+        elif isinstance(obj, GlobalCost) and obj.category == 'actor':
+            # Actor costs are shared by every project
+            preview_cache.invalidate()
+        elif isinstance(obj, Location):
+            preview_cache.invalidate()
+
+
+def schedule_fingerprint(db: Session, project_id: int) -> str:
+    """Hash of everything the scheduler reads for a project's unplanned scenes"""
+    digest = hashlib.sha256()
+    inputs = (
+        db.query(
+            Scene.id, Scene.scene_number, Scene.location_name, Scene.location_type,
+            Scene.time_of_day, Scene.estimated_duration, Scene.actors_data, Scene.time_data
+        ).filter(Scene.project_id == project_id, UNPLANNED).order_by(Scene.id),
+        db.query(
+            ActorAvailability.id, ActorAvailability.actor_id, ActorAvailability.role_character,
+            ActorAvailability.start_date, ActorAvailability.end_date,
+            ActorAvailability.availability_status, ActorAvailability.conflicting_project
+        ).filter(ActorAvailability.project_id == project_id).order_by(ActorAvailability.id),
+        db.query(
+            GlobalCost.id, GlobalCost.name, GlobalCost.billing_cycle, GlobalCost.cost
+        ).filter(GlobalCost.category == 'actor').order_by(GlobalCost.id),
+        db.query(Location.name, Location.availability, Location.coordinates).order_by(Location.id)
+    )
+    for query in inputs:
+        rows = [tuple(row) for row in query.all()]
+        digest.update(json.dumps(rows, default=str, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def get_schedule_preview(
+    db: Session,
+    project_id: int,
+    mode: str,
+    start_date: datetime,
+    end_date: datetime,
+    config: Dict
+) -> Tuple[str, Dict, bool]:
+    """
+    Scheduler output for the project's unplanned scenes, computed once per input fingerprint
+
+    Returns:
+        Tuple of (fingerprint, result, cached); the result is shared, so treat it as read-only
+    """
+    fingerprint = schedule_fingerprint(db, project_id)
+    params = json.dumps(_jsonable({'start_date': start_date, 'end_date': end_date, **config}), sort_keys=True)
+    key: Tuple[Hashable, ...] = (project_id, fingerprint, mode, params)
+    result = preview_cache.get(key)
+    if result is not None:
+        return fingerprint, result, True
+
+    scenes = db.query(Scene).filter(Scene.project_id == project_id, UNPLANNED).all()
+    actors = db.query(ActorAvailability).filter(ActorAvailability.project_id == project_id).all()
+    global_costs = db.query(GlobalCost).filter(GlobalCost.category == 'actor').all()
+    locations = db.query(Location).all()
+    engine = SchedulingEngine(scenes, actors, dict(config), global_costs, locations)
+    result = engine.schedule_scenes(start_date, end_date, mode)
+    preview_cache.put(key, result)
+    return fingerprint, result, False
+
+
+def save_version(
+    db: Session,
+    project_id: int,
+    name: str,
+    mode: str,
+    start_date: datetime,
+    end_date: datetime,
+    config: Dict
+) -> ScheduleVersion:
+    """Store a scheduler output as a named version (reusing a cached preview when there is one)"""
+    fingerprint, result, _ = get_schedule_preview(db, project_id, mode, start_date, end_date, config)
+    version = ScheduleVersion(
+        project_id=project_id,
+        name=name,
+        mode=mode,
+        params=_jsonable({'start_date': start_date, 'end_date': end_date, **config}),
+        fingerprint=fingerprint,
+        schedule=_jsonable(result['schedule']),
+        conflicts=_jsonable(result.get('conflicts', [])),
+        summary=_jsonable(result.get('solver')),
+        total_days=result['total_days'],
+        completion_date=result['completion_date']
+    )
+    db.add(version)
+    db.commit()
+    db.refresh(version)
+    return version
+
+
+def version_is_current(db: Session, version: ScheduleVersion) -> bool:
+    """Whether the scenes and costs a version was computed from are unchanged"""
+    return version.fingerprint == schedule_fingerprint(db, version.project_id)
+
+
+def _version_dates(version: ScheduleVersion) -> Dict[int, Optional[datetime]]:
+    return {item['scene_id']: _parse_datetime(item['scheduled_date']) for item in version.schedule or []}
+
+
+def compare_versions(db: Session, left: ScheduleVersion, right: Optional[ScheduleVersion] = None) -> Dict:
+    """
+    Scene-by-scene differences between two versions, or between a version
+    and the project's current schedule when `right` is None
+    """
+    left_dates = _version_dates(left)
+    if right is not None:
+        right_dates = _version_dates(right)
+    else:
+        rows = db.query(Scene.id, Scene.scheduled_date).filter(
+            Scene.project_id == left.project_id,
+            Scene.id.in_(list(left_dates)),
+            Scene.scheduled_date.isnot(None)
+        ).all() if left_dates else []
+        right_dates = {row.id: row.scheduled_date for row in rows}
+
+    moved = []
+    for scene_id in sorted(set(left_dates) & set(right_dates)):
+        before, after = left_dates[scene_id], right_dates[scene_id]
+        if before != after:
+            moved.append({
+                'scene_id': scene_id,
+                'left_date': before,
+                'right_date': after,
+                'days': (after.date() - before.date()).days if before and after else None
+            })
+
+    right_total = right.total_days if right is not None else None
+    return {
+        'left_version_id': left.id,
+        'right_version_id': right.id if right is not None else None,
+        'moved': moved,
+        'unchanged_count': len(set(left_dates) & set(right_dates)) - len(moved),
+        'only_in_left': sorted(set(left_dates) - set(right_dates)),
+        'only_in_right': sorted(set(right_dates) - set(left_dates)),
+        'total_days_delta': right_total - left.total_days if right_total is not None else None,
+        'completion_delta_days': (
+            (right.completion_date - left.completion_date).days
+            if right is not None and right.completion_date and left.completion_date else None
+        )
+    }
+
+
+def apply_version(db: Session, version: ScheduleVersion) -> List[int]:
+    """
+    Write a version's dates to its scenes and mark them planned, in one bulk UPDATE
+
+    Returns:
+        Ids of the scenes updated (scenes deleted since the version was saved are skipped)
+    """
+    dates = _version_dates(version)
+    existing = {
+        row.id for row in db.query(Scene.id).filter(
+            Scene.project_id == version.project_id,
+            Scene.id.in_(list(dates))
+        ).all()
+    } if dates else set()
+    updates = [
+        {'id': scene_id, 'scheduled_date': scheduled_date, 'status': 'planned'}
+        for scene_id, scheduled_date in dates.items() if scene_id in existing
+    ]
+    if updates:
+        db.bulk_update_mappings(Scene, updates)
+    version.status = 'applied'
+    version.applied_at = datetime.now()
+    db.commit()
+    # Bulk updates skip the flush hooks, so drop the project's previews here
+    preview_cache.invalidate(version.project_id)
+    return [update['id'] for update in updates]
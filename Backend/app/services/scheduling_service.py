@@ -10,20 +10,93 @@ Intelligently schedules scenes based on multiple factors:
 """
 
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Optional, Tuple
 from collections import defaultdict
 import json
 
+from app.services.location_routing import SAME_DAY_MOVE_KM, LocationRouter, catalog_coordinates
+from app.services.weather_service import WeatherSuitability, forecast_suitability, weather_forecasts
+
+WEATHER_PROBE_DAYS = 30  # How far an outdoor scene may slip looking for good weather
+
+
+def billing_cost(billing_cycle: str, daily_rate: float, days: int) -> float:
+    """Cost of engaging an actor for a number of days under their billing cycle"""
+    if billing_cycle == 'daily':
+        return daily_rate * days
+    elif billing_cycle == 'weekly':
+        weeks = (days + 6) // 7  # Round up to nearest week
+        return daily_rate * weeks * 0.85  # 15% discount for weekly
+    elif billing_cycle == 'monthly':
+        months = (days + 29) // 30  # Round up to nearest month
+        return daily_rate * months * 0.7  # 30% discount for monthly
+    return 0.0
+
+
+def parse_scene_number(scene_number: Optional[str]) -> int:
+    """Numeric scene number, 0 for non-numeric ones such as "12A" """
+    return int(scene_number) if scene_number and scene_number.isdigit() else 0
+
+
+class SchedulingIndex:
+    """
+    Read-only lookups over one engine's scenes and actor billing, built once in O(n)
+
+    Actor names are case-folded; billing keeps the first global_costs row per actor.
+    """
+    
+    def __init__(self, scenes: List, global_costs: List):
+        scenes_by_id = {}
+        scenes_by_actor = defaultdict(list)
+        scenes_by_location = defaultdict(list)
+        scene_numbers = {}
+        for scene in scenes:
+            scenes_by_id.setdefault(scene.id, scene)
+            scene_numbers[scene.id] = parse_scene_number(scene.scene_number)
+            scenes_by_location[scene.location_name].append(scene)
+            seen = set()
+            for actor_info in scene.actors_data or []:
+                name = (actor_info.get('name') or '').casefold() if isinstance(actor_info, dict) else ''
+                if name and name not in seen:
+                    seen.add(name)
+                    scenes_by_actor[name].append(scene)
+        
+        actor_billing = {}
+        for cost in global_costs:
+            if cost.category == 'actor' and cost.name:
+                actor_billing.setdefault(cost.name.casefold(), (cost.billing_cycle, cost.cost or 0))
+        
+        self.scenes_by_id: Mapping[int, object] = MappingProxyType(scenes_by_id)
+        self.scenes_by_actor: Mapping[str, Tuple] = MappingProxyType({k: tuple(v) for k, v in scenes_by_actor.items()})
+        self.scenes_by_location: Mapping[Optional[str], Tuple] = MappingProxyType(
+            {k: tuple(v) for k, v in scenes_by_location.items()}
+        )
+        self.scene_numbers: Mapping[int, int] = MappingProxyType(scene_numbers)
+        self.actor_billing: Mapping[str, Tuple[str, float]] = MappingProxyType(actor_billing)
+
+
 class SchedulingEngine:
     """Core scheduling engine with multiple optimization strategies"""
     
-    def __init__(self, scenes: List, actors: List, project_config: Dict, global_costs: List = None):
+    def __init__(
+        self,
+        scenes: List,
+        actors: List,
+        project_config: Dict,
+        global_costs: List = None,
+        locations: List = None
+    ):
         self.scenes = scenes
         self.actors = actors
         self.global_costs = global_costs or []
+        self.location_coordinates = catalog_coordinates(locations or [])
         self.config = project_config
         self.schedule = {}
         self.conflicts = []
+        self.index = SchedulingIndex(self.scenes, self.global_costs)
+        self.weather: Optional[WeatherSuitability] = None
+        self.route: Optional[Dict] = None
         
     def calculate_scene_priority(self, scene) -> float:
         """Calculate priority score for a scene (higher = schedule earlier)"""
@@ -62,87 +135,102 @@ class SchedulingEngine:
     
     def get_actor_payment_type(self, actor_name: str) -> str:
         """Get actor's payment type from global_costs (daily/weekly/monthly)"""
-        # Check global costs for this actor
-        for cost in self.global_costs:
-            if (cost.category == 'actor' and 
-                cost.name.lower() == actor_name.lower()):
-                return cost.billing_cycle  # daily/weekly/monthly
-        
+        billing = self.get_actor_billing(actor_name)
         # Default to daily if not found
-        return 'daily'
+        return billing[0] if billing else 'daily'
+    
+    def get_actor_billing(self, actor_name: str) -> Optional[Tuple[str, float]]:
+        """Actor's (billing_cycle, rate) from global_costs, if they have one"""
+        return self.index.actor_billing.get(actor_name.casefold())
     
     def calculate_actor_cost(self, actor_name: str, days: int) -> float:
         """Calculate cost for an actor based on billing cycle from global_costs"""
-        # Find actor in global costs
-        for cost in self.global_costs:
-            if (cost.category == 'actor' and 
-                cost.name.lower() == actor_name.lower()):
-                
-                daily_rate = cost.cost or 0
-                billing_cycle = cost.billing_cycle
-                
-                if billing_cycle == 'daily':
-                    return daily_rate * days
-                elif billing_cycle == 'weekly':
-                    weeks = (days + 6) // 7  # Round up to nearest week
-                    return daily_rate * weeks * 0.85  # 15% discount for weekly
-                elif billing_cycle == 'monthly':
-                    months = (days + 29) // 30  # Round up to nearest month
-                    return daily_rate * months * 0.7  # 30% discount for monthly
-                    
-        return 0.0
+        billing = self.get_actor_billing(actor_name)
+        if not billing:
+            return 0.0
+        return billing_cost(billing[0], billing[1], days)
     
     def optimize_for_actor_costs(self, location_clusters: Dict) -> Dict[str, List]:
         """Optimize schedule to minimize actor costs based on billing cycles from global_costs"""
-        optimized = {}
+        clustered = {id(scene) for scenes in location_clusters.values() for scene in scenes}
         
-        for location, scenes in location_clusters.items():
-            # Group scenes by actors
-            actor_scenes = defaultdict(list)
-            
-            for scene in scenes:
-                if scene.actors_data:
-                    for actor_info in scene.actors_data:
-                        actor_name = actor_info.get('name', '')
-                        if actor_name:
-                            actor_scenes[actor_name].append(scene)
-            
-            # For actors with weekly/monthly billing, schedule their scenes consecutively
-            for actor_name, actor_scene_list in actor_scenes.items():
-                billing_cycle = self.get_actor_payment_type(actor_name)
-                
-                if billing_cycle in ['weekly', 'monthly']:
-                    # Prioritize these scenes to be scheduled together
-                    for scene in actor_scene_list:
-                        if hasattr(scene, '_priority_boost'):
-                            scene._priority_boost += 2.0
-                        else:
-                            scene._priority_boost = 2.0
+        # For actors with weekly/monthly billing, schedule their scenes consecutively
+        for actor_name, actor_scene_list in self.index.scenes_by_actor.items():
+            billing_cycle = self.get_actor_payment_type(actor_name)
             
-            optimized[location] = sorted(
+            if billing_cycle in ['weekly', 'monthly']:
+                # Prioritize these scenes to be scheduled together
+                for scene in actor_scene_list:
+                    if id(scene) in clustered:
+                        scene._priority_boost = getattr(scene, '_priority_boost', 0) + 2.0
+        
+        return {
+            location: sorted(
                 scenes,
                 key=lambda s: self.calculate_scene_priority(s) + getattr(s, '_priority_boost', 0),
                 reverse=True
             )
-        
-        return optimized
+            for location, scenes in location_clusters.items()
+        }
+    
+    def route_locations(self, location_blocks: List[Tuple[str, List]], start_date: datetime, daily_capacity: int) -> Dict:
+        """Order location blocks by travel between their catalog coordinates, respecting location availability"""
+        router = LocationRouter(
+            self.location_coordinates,
+            self.config.get('location_availability'),
+            self.config.get('skip_weekends', False)
+        )
+        self.route = router.route(
+            [(location, len(scenes) / daily_capacity) for location, scenes in location_blocks],
+            start_date.date()
+        )
+        return self.route
+    
+    def next_shoot_day(self, current_date: datetime) -> datetime:
+        """The day after current_date, past the weekend if configured"""
+        current_date += timedelta(days=1)
+        if self.config.get('skip_weekends', False):
+            while current_date.weekday() >= 5:  # Saturday = 5, Sunday = 6
+                current_date += timedelta(days=1)
+        return current_date
+    
+    def prepare_weather(self, start_date: datetime, end_date: datetime) -> None:
+        """Prefetch forecasts for every non-indoor location and build the suitability bitmap"""
+        locations = [
+            location for location, scenes in self.index.scenes_by_location.items()
+            if any(scene.location_type != 'indoor' for scene in scenes)
+        ]
+        self.weather = weather_forecasts.suitability(locations, start_date.date(), end_date.date())
     
     def check_weather_suitability(self, date: datetime, scene) -> Tuple[bool, str]:
-        """Check if weather is suitable for the scene (placeholder for API integration)"""
-        # This will be replaced with actual weather API call
-        # For now, simulate weather prediction
+        """Check if weather is suitable for the scene (bitmap lookup once prepare_weather has run)"""
         
         if scene.location_type == 'indoor':
             return True, "Indoor scene - weather independent"
         
-        # Simulate weather check (will integrate real API)
-        day_of_year = date.timetuple().tm_yday
-        
-        # Simple heuristic: avoid rainy season
-        if 150 <= day_of_year <= 250:  # Roughly Jun-Sep (rainy season in many places)
-            return False, "Rainy season - not ideal for outdoor shoot"
+        if self.weather:
+            checked = self.weather.check(scene.location_name, date.date())
+            if checked:
+                return checked
         
-        return True, "Weather suitable"
+        # Outside the prefetched window: one cached forecast lookup
+        return forecast_suitability(weather_forecasts.forecast(scene.location_name, date.date()))
+    
+    def next_weather_day(self, current_date: datetime, scene) -> Tuple[datetime, str]:
+        """First suitable day after current_date, or WEATHER_PROBE_DAYS later if none is"""
+        offset = self.weather.next_suitable(scene.location_name, current_date.date(), WEATHER_PROBE_DAYS) \
+            if self.weather else None
+        if offset is not None:
+            current_date += timedelta(days=offset or WEATHER_PROBE_DAYS)
+            return current_date, self.check_weather_suitability(current_date, scene)[1]
+        
+        weather_msg = ''
+        for _ in range(WEATHER_PROBE_DAYS):
+            current_date += timedelta(days=1)
+            weather_ok, weather_msg = self.check_weather_suitability(current_date, scene)
+            if weather_ok:
+                break
+        return current_date, weather_msg
     
     def schedule_scenes(
         self,
@@ -156,9 +244,17 @@ class SchedulingEngine:
         Args:
             start_date: Project start date
             end_date: Project end date
-            optimization_mode: 'cost', 'speed', 'balanced', 'quality'
+            optimization_mode: 'cost', 'speed', 'balanced', 'quality', 'solver', 'anneal'
         """
         
+        # One batch of forecasts up front; scenes may slip past end_date looking for good weather
+        self.prepare_weather(start_date, end_date + timedelta(days=WEATHER_PROBE_DAYS + 1))
+        
+        if optimization_mode == 'solver':
+            return self.solve_with_constraints(start_date, end_date)
+        if optimization_mode == 'anneal':
+            return self.anneal_schedule(start_date, end_date)
+        
         # Step 1: Cluster scenes by location
         location_clusters = self.cluster_scenes_by_location()
         
@@ -173,9 +269,6 @@ class SchedulingEngine:
             reverse=True
         )
         
-        # Step 4: Assign dates to scenes
-        current_date = start_date
-        schedule_result = []
         daily_capacity = 5  # Default: 5 scenes per day
         
         if optimization_mode == 'speed':
@@ -183,7 +276,21 @@ class SchedulingEngine:
         elif optimization_mode == 'quality':
             daily_capacity = 3  # Fewer scenes per day for better quality
         
-        for location, scenes in sorted_locations:
+        # Step 4: Route from the biggest location through the nearest ones (unchanged without coordinates)
+        route = self.route_locations(sorted_locations, start_date, daily_capacity)
+        sorted_locations = [(location, location_clusters[location]) for location in route['order']]
+        same_day_move_km = self.config.get('same_day_move_km', SAME_DAY_MOVE_KM)
+        
+        # Step 5: Assign dates to scenes
+        current_date = start_date
+        schedule_result = []
+        
+        for position, (location, scenes) in enumerate(sorted_locations):
+            # A long company move doesn't fit after a part day's work at the last location
+            leg = route['legs'][position]
+            if leg is not None and leg > same_day_move_km and len(sorted_locations[position - 1][1]) % daily_capacity:
+                current_date = self.next_shoot_day(current_date)
+            
             for i, scene in enumerate(scenes):
                 # Check if we exceeded end date
                 if current_date > end_date:
@@ -199,13 +306,7 @@ class SchedulingEngine:
                 
                 if not weather_ok and scene.location_type == 'outdoor':
                     # Try next available good weather day
-                    attempts = 0
-                    while attempts < 30:  # Try for 30 days
-                        current_date += timedelta(days=1)
-                        weather_ok, weather_msg = self.check_weather_suitability(current_date, scene)
-                        if weather_ok:
-                            break
-                        attempts += 1
+                    current_date, weather_msg = self.next_weather_day(current_date, scene)
                 
                 # Assign scene to date
                 schedule_result.append({
@@ -219,20 +320,78 @@ class SchedulingEngine:
                 
                 # Move to next day after reaching daily capacity
                 if (i + 1) % daily_capacity == 0:
-                    current_date += timedelta(days=1)
-                    
-                    # Skip weekends if configured
-                    if self.config.get('skip_weekends', False):
-                        while current_date.weekday() >= 5:  # Saturday = 5, Sunday = 6
-                            current_date += timedelta(days=1)
+                    current_date = self.next_shoot_day(current_date)
         
         return {
             'schedule': schedule_result,
             'total_days': (current_date - start_date).days,
             'conflicts': self.conflicts,
-            'completion_date': current_date
+            'completion_date': current_date,
+            'route': route
         }
     
+    def weather_risk(self, start_date: datetime, end_date: datetime) -> Dict[str, Dict]:
+        """Days with weather unfit for outdoor work, as {location: {date: risk}}"""
+        if not (self.weather and self.weather.covers_range(start_date.date(), end_date.date())):
+            self.prepare_weather(start_date, end_date)
+        risk = {}
+        for location, scenes in self.index.scenes_by_location.items():
+            if not location or not any(scene.location_type == 'outdoor' for scene in scenes):
+                continue
+            days = {
+                day: 1.0 for day in self.weather.unsuitable_days(location)
+                if start_date.date() <= day <= end_date.date()
+            }
+            if days:
+                risk[location] = days
+        return risk
+    
+    def _solver_model(self, start_date: datetime, end_date: datetime):
+        from app.services.schedule_solver import ScheduleModel, availability_windows
+        
+        return ScheduleModel(
+            self.scenes,
+            start_date,
+            end_date,
+            actor_availability=availability_windows(self.actors),
+            location_availability=self.config.get('location_availability'),
+            actor_billing=self.index.actor_billing,
+            config=self.config,
+            weather_risk=self.weather_risk(start_date, end_date)
+        )
+    
+    def solve_with_constraints(self, start_date: datetime, end_date: datetime) -> Dict:
+        """
+        Constraint solver mode: honours actor availability (self.actors),
+        location availability, day/night shifts and daily hours, and minimises
+        shoot days, company moves, actor cost, weather risk and overtime
+        within config['solver_time_limit']
+        """
+        from app.services.schedule_solver import ScheduleSolver
+        
+        result = ScheduleSolver(self._solver_model(start_date, end_date), seed=self.config.get('seed')).solve(
+            self.config.get('solver_time_limit', 10.0)
+        )
+        self.conflicts.extend(result['conflicts'])
+        return result
+    
+    def anneal_schedule(self, start_date: datetime, end_date: datetime) -> Dict:
+        """
+        Annealing mode: the solver's constraints and objective, searched by
+        simulated annealing restarts in parallel within config['time_budget']
+        seconds; the result carries the Pareto-optimal alternatives
+        """
+        from app.services.schedule_solver import solve_multistart
+        
+        result = solve_multistart(
+            self._solver_model(start_date, end_date),
+            self.config.get('time_budget', 30.0),
+            restarts=self.config.get('restarts'),
+            seed=self.config.get('seed')
+        )
+        self.conflicts.extend(result['conflicts'])
+        return result
+    
     def detect_conflicts(self, schedule: List[Dict]) -> List[Dict]:
         """Detect scheduling conflicts"""
         conflicts = []
@@ -249,7 +408,7 @@ class SchedulingEngine:
             actor_scenes = defaultdict(list)
             
             for item in day_scenes:
-                scene = next((s for s in self.scenes if s.id == item['scene_id']), None)
+                scene = self.index.scenes_by_id.get(item['scene_id'])
                 if scene and scene.actors_data:
                     for actor_info in scene.actors_data:
                         actor_name = actor_info.get('name', '')
@@ -278,10 +437,8 @@ class SchedulingEngine:
         """Reschedule a single scene and cascade changes if needed"""
         
         # Find the scene in schedule
-        scene_index = next(
-            (i for i, item in enumerate(current_schedule) if item['scene_id'] == scene_id),
-            None
-        )
+        positions = {item['scene_id']: i for i, item in enumerate(current_schedule)}
+        scene_index = positions.get(scene_id)
         
         if scene_index is None:
             return {'success': False, 'message': 'Scene not found in schedule'}
@@ -295,12 +452,9 @@ class SchedulingEngine:
             affected_scenes = self._get_dependent_scenes(scene_id)
             
             for affected_scene_id in affected_scenes:
-                affected_index = next(
-                    (i for i, item in enumerate(current_schedule) if item['scene_id'] == affected_scene_id),
-                    None
-                )
+                affected_index = positions.get(affected_scene_id)
                 
-                if affected_index and current_schedule[affected_index]['scheduled_date'] < new_date:
+                if affected_index is not None and current_schedule[affected_index]['scheduled_date'] < new_date:
                     # Move dependent scene to after the rescheduled scene
                     current_schedule[affected_index]['scheduled_date'] = new_date + timedelta(days=1)
         
@@ -320,22 +474,20 @@ class SchedulingEngine:
         # This could be enhanced with actual dependency tracking
         # For now, return scenes with higher scene numbers in same location
         
-        scene = next((s for s in self.scenes if s.id == scene_id), None)
+        scene = self.index.scenes_by_id.get(scene_id)
         if not scene:
             return []
         
         dependent = []
-        scene_num = int(scene.scene_number) if scene.scene_number and scene.scene_number.isdigit() else 0
+        scene_num = self.index.scene_numbers[scene_id]
         
-        for other_scene in self.scenes:
-            other_num = int(other_scene.scene_number) if other_scene.scene_number and other_scene.scene_number.isdigit() else 0
-            
-            if (other_scene.location_name == scene.location_name and 
-                other_num > scene_num and 
-                other_scene.id != scene_id):
+        for other_scene in self.index.scenes_by_location.get(scene.location_name, ()):
+            if self.index.scene_numbers[other_scene.id] > scene_num and other_scene.id != scene_id:
                 dependent.append(other_scene.id)
+                if len(dependent) == 3:
+                    break
         
-        return dependent[:3]  # Limit to 3 most immediate dependent scenes
+        return dependent  # Limit to 3 most immediate dependent scenes
 
 
 class WeatherService:
@@ -345,23 +497,12 @@ class WeatherService:
     async def get_weather_forecast(location: str, date: datetime) -> Dict:
         """
         Get weather forecast for a location and date
-        This is a placeholder - integrate with OpenWeatherMap, WeatherAPI, etc.
+        from the configured WeatherProvider, through the forecast cache
         """
         
-        # TODO: Integrate real weather API
-        # Example with OpenWeatherMap:
-        # api_key = os.getenv('WEATHER_API_KEY')
-        # url = f'https://api.openweathermap.org/data/2.5/forecast?q={location}&appid={api_key}'
-        
-        # For now, return mock data
-        return {
-            'temperature': 25,
-            'conditions': 'partly_cloudy',
-            'precipitation_chance': 20,
-            'suitable_for_outdoor': True,
-            'wind_speed': 10,
-            'humidity': 65
-        }
+        forecast = dict(weather_forecasts.forecast(location, date.date()))
+        forecast['suitable_for_outdoor'] = forecast_suitability(forecast)[0]
+        return forecast
     
     @staticmethod
     def is_suitable_for_scene(weather: Dict, scene) -> Tuple[bool, str]:
@@ -370,13 +511,10 @@ class WeatherService:
         if scene.location_type == 'indoor':
             return True, "Indoor scene"
         
-        # Check precipitation
-        if weather['precipitation_chance'] > 60:
-            return False, "High chance of rain"
-        
-        # Check wind for outdoor scenes
-        if weather['wind_speed'] > 30:
-            return False, "Strong winds"
+        # Check precipitation and wind
+        suitable, reason = forecast_suitability(weather)
+        if not suitable:
+            return False, reason
         
         # Check if scene requires specific weather
         if scene.time_data:
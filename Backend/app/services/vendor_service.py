@@ -0,0 +1,401 @@
+"""
+Vendor Service
+Resolves the free-text vendor details on invoices, purchases, catering orders
+and rentals to one row in the vendor master (GSTIN exact match first, then
+name trigram similarity), and answers cross-project spend and history
+questions through the indexed vendor_id columns
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import Vendor, UploadedInvoice, Purchase, FoodCatering, RentalItem, Project
+
+logger = logging.getLogger(__name__)
+
+# Minimum trigram similarity (0-1) for two names to be treated as the same vendor
+MATCH_THRESHOLD = float(os.getenv("VENDOR_MATCH_THRESHOLD", "0.65"))
+INDEX_CACHE_SECONDS = int(os.getenv("VENDOR_INDEX_CACHE_SECONDS", "300"))
+
+GSTIN_RE = re.compile(r"^\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z]$")
+# Words that do not distinguish one vendor from another
+NAME_STOPWORDS = {
+    "the", "pvt", "private", "ltd", "limited", "llp", "inc", "co", "company", "corp", "corporation", "and",
+}
+
+# Tables carrying free-text vendor details: model -> columns for
+# (name, gstin, contact, email, address, vendor_type)
+LINKED_MODELS = {
+    UploadedInvoice: ("vendor_name", "vendor_gstin", "vendor_contact", None, "vendor_address", None),
+    Purchase: ("vendor_name", None, "vendor_contact", None, None, None),
+    FoodCatering: ("vendor_name", None, "vendor_contact", None, None, "vendor_type"),
+    RentalItem: ("vendor_name", None, "vendor_contact", "vendor_email", "vendor_address", None),
+}
+
+# Spend sources: (label, model, amount, date, description, extra filters)
+SPEND_SOURCES = (
+    (
+        "invoice", UploadedInvoice,
+        func.coalesce(UploadedInvoice.amount_in_base_currency, UploadedInvoice.total_amount),
+        func.coalesce(UploadedInvoice.invoice_date, UploadedInvoice.created_at),
+        UploadedInvoice.invoice_number,
+        (UploadedInvoice.approval_status != "rejected",)
+    ),
+    ("purchase", Purchase, Purchase.final_amount, Purchase.purchase_date, Purchase.item_name, ()),
+    ("catering", FoodCatering, FoodCatering.total_cost, FoodCatering.catering_date, FoodCatering.meal_type, ()),
+    (
+        "rental", RentalItem,
+        RentalItem.total_cost + func.coalesce(RentalItem.penalty_charges, 0.0),
+        RentalItem.rental_start_date,
+        RentalItem.item_name,
+        ()
+    ),
+)
+
+
+def normalize_vendor_name(name: Optional[str]) -> str:
+    """Lowercase, drop "M/s", punctuation and legal suffixes: "M/s. Sri Krishna Caterers Pvt. Ltd." -> "sri krishna caterers" """
+    if not name:
+        return ""
+    name = re.sub(r"^\s*m/s\.?\s*", "", name.lower())
+    name = name.replace("&", " and ")
+    words = re.sub(r"[^a-z0-9]+", " ", name).split()
+    kept = [word for word in words if word not in NAME_STOPWORDS]
+    return " ".join(kept or words)
+
+
+def normalize_gstin(gstin: Optional[str]) -> Optional[str]:
+    """Upper-cased GSTIN without spaces, or None if it is not a well-formed GSTIN"""
+    if not gstin:
+        return None
+    gstin = re.sub(r"\s+", "", gstin).upper()
+    return gstin if GSTIN_RE.match(gstin) else None
+
+
+def name_trigrams(normalized_name: str) -> FrozenSet[str]:
+    """pg_trgm-style trigrams: each word padded with two leading spaces and one trailing"""
+    grams: Set[str] = set()
+    for word in normalized_name.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class VendorIndex:
+    """In-memory trigram index over vendor names, reloaded periodically for other worker processes"""
+
+    def __init__(self, ttl_seconds: int = INDEX_CACHE_SECONDS, threshold: float = MATCH_THRESHOLD):
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._loaded_at: Optional[float] = None
+        self._by_name: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}  # vendor_id -> normalized name, so removal needn't scan _by_name
+        self._trigrams: Dict[int, FrozenSet[str]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+    def _ensure_loaded(self, db: Session) -> None:
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.ttl_seconds:
+            return
+        rows = db.query(Vendor.id, Vendor.normalized_name).all()
+        with self._lock:
+            self._by_name, self._names, self._trigrams, self._postings = {}, {}, {}, {}
+            # Rebuilding from empty, so there is nothing to remove first
+            for vendor_id, normalized_name in rows:
+                self._insert(vendor_id, normalized_name)
+            self._loaded_at = now
+
+    def _insert(self, vendor_id: int, normalized_name: str) -> None:
+        grams = name_trigrams(normalized_name)
+        self._by_name.setdefault(normalized_name, vendor_id)
+        self._names[vendor_id] = normalized_name
+        self._trigrams[vendor_id] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(vendor_id)
+
+    def _add(self, vendor_id: int, normalized_name: str) -> None:
+        self._remove(vendor_id)
+        self._insert(vendor_id, normalized_name)
+
+    def _remove(self, vendor_id: int) -> None:
+        for gram in self._trigrams.pop(vendor_id, ()):
+            self._postings.get(gram, set()).discard(vendor_id)
+        name = self._names.pop(vendor_id, None)
+        if name is not None and self._by_name.get(name) == vendor_id:
+            del self._by_name[name]
+
+    def add(self, vendor_id: int, normalized_name: str) -> None:
+        with self._lock:
+            self._add(vendor_id, normalized_name)
+
+    def remove(self, vendor_id: int) -> None:
+        with self._lock:
+            self._remove(vendor_id)
+
+    def search(self, db: Session, normalized_name: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Vendor ids ranked by trigram similarity to a normalized name (exact name first)"""
+        self._ensure_loaded(db)
+        grams = name_trigrams(normalized_name)
+        if not grams:
+            return []
+        with self._lock:
+            exact = self._by_name.get(normalized_name)
+            shared = Counter(
+                vendor_id for gram in grams for vendor_id in self._postings.get(gram, ())
+            )
+            scored = [
+                (vendor_id, count / (len(grams) + len(self._trigrams[vendor_id]) - count))
+                for vendor_id, count in shared.items()
+            ]
+        scored.sort(key=lambda item: (item[0] != exact, -item[1]))
+        return scored[:limit]
+
+    def match(self, db: Session, normalized_name: str) -> Optional[Tuple[int, float]]:
+        """Best vendor for a name if it is similar enough"""
+        ranked = self.search(db, normalized_name, limit=1)
+        if ranked and ranked[0][1] >= self.threshold:
+            return ranked[0]
+        return None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+
+def _pending_vendors(db: Session) -> Dict[str, Vendor]:
+    """Vendors created in this session but not flushed yet, by normalized name and GSTIN"""
+    return db.info.setdefault("pending_vendors", {})
+
+
+def _insert_gstin_vendor(db: Session, name: str, normalized_name: str, gstin: str) -> Vendor:
+    """
+    Insert a vendor keyed by GSTIN, or load the one another session inserted first
+
+    gstin is unique, so a plain check-then-insert races with concurrent
+    sessions (batch upload workers) and fails the whole flush. This runs as
+    INSERT ... ON CONFLICT DO NOTHING (a savepoint elsewhere) and re-selects,
+    and is safe to call from before_flush.
+    """
+    values = {"name": name, "normalized_name": normalized_name, "gstin": gstin}
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        db.execute(insert(Vendor).values(**values).on_conflict_do_nothing(index_elements=[Vendor.gstin]))
+    else:
+        try:
+            # Connection-level, so rolling back leaves the ORM's pending objects alone
+            with db.connection().begin_nested():
+                db.execute(Vendor.__table__.insert().values(**values))
+        except IntegrityError:
+            pass
+    vendor = db.query(Vendor).filter(Vendor.gstin == gstin).one()
+    vendor_index.add(vendor.id, vendor.normalized_name)
+    return vendor
+
+
+def resolve_vendor(
+    db: Session,
+    name: Optional[str],
+    gstin: Optional[str] = None,
+    contact: Optional[str] = None,
+    email: Optional[str] = None,
+    address: Optional[str] = None,
+    vendor_type: Optional[str] = None,
+    create: bool = True
+) -> Optional[Vendor]:
+    """
+    Find the vendor for free-text details, creating one if nothing matches
+
+    GSTIN is matched exactly; otherwise the closest name by trigram similarity
+    is used, unless both sides carry different GSTINs. Blank details missing
+    on the matched vendor are filled in.
+    """
+    gstin = normalize_gstin(gstin)
+    normalized = normalize_vendor_name(name)
+    if not normalized and not gstin:
+        return None
+
+    pending = _pending_vendors(db)
+    with db.no_autoflush:
+        vendor = pending.get(gstin) if gstin else None
+        if vendor is None and gstin:
+            vendor = db.query(Vendor).filter(Vendor.gstin == gstin).first()
+        if vendor is None and normalized:
+            candidate = pending.get(normalized)
+            if candidate is None:
+                match = vendor_index.match(db, normalized)
+                candidate = db.get(Vendor, match[0]) if match else None
+            if candidate is not None and not (gstin and candidate.gstin and candidate.gstin != gstin):
+                vendor = candidate
+
+        if vendor is None:
+            if not create:
+                return None
+            if gstin:
+                vendor = _insert_gstin_vendor(db, (name or "").strip() or gstin, normalized or gstin.lower(), gstin)
+            else:
+                vendor = Vendor(name=(name or "").strip(), normalized_name=normalized)
+                db.add(vendor)
+
+        if gstin and not vendor.gstin:
+            vendor.gstin = gstin
+        for field, value in (("contact", contact), ("email", email), ("address", address), ("vendor_type", vendor_type)):
+            if value and not getattr(vendor, field):
+                setattr(vendor, field, value)
+
+    if vendor.id is None:
+        pending[vendor.normalized_name] = vendor
+        if vendor.gstin:
+            pending[vendor.gstin] = vendor
+    return vendor
+
+
+def link_vendor(db: Session, record: Any) -> Optional[Vendor]:
+    """Point an invoice, purchase, catering order or rental at its vendor"""
+    columns = LINKED_MODELS[type(record)]
+    values = [getattr(record, column) if column else None for column in columns]
+    vendor = resolve_vendor(db, *values)
+    record.vendor = vendor
+    return vendor
+
+
+def _vendor_details_changed(record: Any) -> bool:
+    state = inspect(record)
+    return any(
+        state.attrs[column].history.has_changes()
+        for column in LINKED_MODELS[type(record)][:2] if column
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _link_vendors(session: Session, flush_context, instances) -> None:
+    """Resolve vendor_id for new rows, and for rows whose vendor name or GSTIN changed"""
+    for record in list(session.new) + list(session.dirty):
+        if type(record) not in LINKED_MODELS:
+            continue
+        if record in session.new:
+            if record.vendor_id is not None or record.vendor is not None:
+                continue
+        elif not _vendor_details_changed(record):
+            continue
+        try:
+            # A connection-level savepoint, so a failed statement rolls back only this lookup
+            # and PostgreSQL can still run the flush. Session.begin_nested() would also
+            # expunge every pending object in the flush when it rolls back.
+            with session.connection().begin_nested():
+                link_vendor(session, record)
+        except Exception as e:
+            # Never block the write; migrate_vendors.py can link it later
+            logger.warning(f"Vendor resolution failed for {type(record).__name__}: {e}")
+
+
+@event.listens_for(Session, "after_flush")
+def _index_vendors(session: Session, flush_context) -> None:
+    session.info.pop("pending_vendors", None)
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Vendor):
+            vendor_index.add(obj.id, obj.normalized_name)
+    for obj in session.deleted:
+        if isinstance(obj, Vendor):
+            vendor_index.remove(obj.id)
+
+
+def vendor_spend(db: Session, vendor_id: int) -> Dict[str, Any]:
+    """Spend with a vendor across all projects, per source table and per project"""
+    by_source: Dict[str, Dict[str, Any]] = {}
+    by_project: Dict[int, Dict[str, Any]] = {}
+
+    for label, model, amount, _, _, extra in SPEND_SOURCES:
+        rows = db.query(
+            model.project_id,
+            func.count(model.id),
+            func.coalesce(func.sum(amount), 0.0)
+        ).filter(model.vendor_id == vendor_id, *extra).group_by(model.project_id).all()
+
+        count = sum(row[1] for row in rows)
+        total = sum((row[2] or 0.0 for row in rows), 0.0)
+        by_source[label] = {"count": count, "amount": round(total, 2)}
+        for project_id, project_count, project_amount in rows:
+            entry = by_project.setdefault(project_id, {"project_id": project_id, "count": 0, "amount": 0.0})
+            entry["count"] += project_count
+            entry["amount"] = round(entry["amount"] + (project_amount or 0.0), 2)
+
+    if by_project:
+        names = dict(db.query(Project.id, Project.name).filter(Project.id.in_(list(by_project))).all())
+        for project_id, entry in by_project.items():
+            entry["project_name"] = names.get(project_id)
+
+    return {
+        "vendor_id": vendor_id,
+        "total_spend": round(sum(source["amount"] for source in by_source.values()), 2),
+        "by_source": by_source,
+        "by_project": sorted(by_project.values(), key=lambda entry: -entry["amount"])
+    }
+
+
+def vendor_history(db: Session, vendor_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+    """Most recent invoices, purchases, catering orders and rentals with a vendor"""
+    history = []
+    for label, model, amount, date, description, extra in SPEND_SOURCES:
+        rows = db.query(
+            model.id,
+            model.project_id,
+            date.label("date"),
+            amount.label("amount"),
+            description.label("description")
+        ).filter(model.vendor_id == vendor_id, *extra).order_by(date.desc()).limit(limit).all()
+        history.extend(
+            {
+                "type": label,
+                "id": row.id,
+                "project_id": row.project_id,
+                "date": row.date.isoformat() if row.date else None,
+                "amount": row.amount,
+                "description": row.description
+            }
+            for row in rows
+        )
+    history.sort(key=lambda entry: entry["date"] or "", reverse=True)
+    return history[:limit]
+
+
+def merge_vendors(db: Session, source_id: int, target_id: int) -> Vendor:
+    """Move every record from one vendor to another and delete the first"""
+    source = db.get(Vendor, source_id)
+    target = db.get(Vendor, target_id)
+    if source is None or target is None:
+        raise ValueError("Vendor not found")
+    if source_id == target_id:
+        raise ValueError("Cannot merge a vendor into itself")
+
+    for model in LINKED_MODELS:
+        db.query(model).filter(model.vendor_id == source_id).update(
+            {model.vendor_id: target_id}, synchronize_session=False
+        )
+    gstin = source.gstin
+    for field in ("contact", "email", "address", "vendor_type"):
+        if not getattr(target, field) and getattr(source, field):
+            setattr(target, field, getattr(source, field))
+    db.delete(source)
+    db.flush()
+    # The GSTIN is unique, so it can only move once the source row is gone
+    if gstin and not target.gstin:
+        target.gstin = gstin
+    db.commit()
+    db.refresh(target)
+    return target
+
+
+# Singleton instance
+vendor_index = VendorIndex()
@@ -0,0 +1,332 @@
+"""
+Weather Forecast Service
+Forecasts come from a pluggable WeatherProvider (a local file-backed one by
+default) through an in-memory and on-disk cache with a TTL. Before scheduling,
+forecasts for every (location, date range) are prefetched in one batch and
+turned into a per-location bitmask of days fit for outdoor shooting.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WEATHER_PROVIDER = os.getenv("WEATHER_PROVIDER", "file")
+WEATHER_DATA_DIR = Path(os.getenv("WEATHER_DATA_DIR", "weather_data"))
+WEATHER_CACHE_DIR = Path(os.getenv("WEATHER_CACHE_DIR", "weather_cache"))
+WEATHER_CACHE_SECONDS = int(os.getenv("WEATHER_CACHE_SECONDS", "21600"))
+PREFETCH_WORKERS = int(os.getenv("WEATHER_PREFETCH_WORKERS", "4"))
+MASK_MEMO_SIZE = 1024
+
+# Limits for outdoor work
+MAX_PRECIPITATION_CHANCE = 60
+MAX_WIND_SPEED = 30
+
+Forecast = Dict
+
+
+def location_key(location: Optional[str]) -> str:
+    return (location or "").strip().casefold()
+
+
+def seasonal_forecast(day: date) -> Forecast:
+    """Climatology used when no forecast is known: Jun-Sep is the rainy season"""
+    rainy = 150 <= day.timetuple().tm_yday <= 250
+    return {
+        'temperature': 25,
+        'conditions': 'rain' if rainy else 'partly_cloudy',
+        'precipitation_chance': 80 if rainy else 20,
+        'wind_speed': 10,
+        'humidity': 85 if rainy else 65,
+        'source': 'seasonal'
+    }
+
+
+def forecast_suitability(forecast: Forecast) -> Tuple[bool, str]:
+    """Whether a forecast allows outdoor shooting, and why not"""
+    if forecast.get('precipitation_chance', 0) > MAX_PRECIPITATION_CHANCE:
+        if forecast.get('source') == 'seasonal':
+            return False, "Rainy season - not ideal for outdoor shoot"
+        return False, "High chance of rain"
+    if forecast.get('wind_speed', 0) > MAX_WIND_SPEED:
+        return False, "Strong winds"
+    return True, "Weather suitable"
+
+
+class WeatherProvider(ABC):
+    """Source of daily forecasts; implementations should fetch a whole date range per call"""
+
+    name = "provider"
+
+    @abstractmethod
+    def get_forecasts(self, location: str, start: date, end: date) -> Dict[date, Forecast]:
+        """Forecasts for each known day from start to end inclusive (days may be missing)"""
+
+
+class FileWeatherProvider(WeatherProvider):
+    """
+    Forecasts read from JSON files, one per location: <data_dir>/<location slug>.json
+    holding {"YYYY-MM-DD": {"precipitation_chance": 70, "wind_speed": 12, ...}}.
+    Days without an entry fall back to the seasonal forecast.
+    """
+
+    name = "file"
+
+    def __init__(self, data_dir: Path = WEATHER_DATA_DIR):
+        self.data_dir = Path(data_dir)
+        self._lock = threading.Lock()
+        self._files: Dict[Path, Tuple[float, Dict[str, Forecast]]] = {}
+
+    @staticmethod
+    def slug(location: str) -> str:
+        return re.sub(r"[^a-z0-9]+", "-", location_key(location)).strip("-") or "default"
+
+    def _load(self, location: str) -> Dict[str, Forecast]:
+        path = self.data_dir / f"{self.slug(location)}.json"
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return {}
+        with self._lock:
+            cached = self._files.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable weather file {path}: {e}")
+            data = {}
+        with self._lock:
+            self._files[path] = (mtime, data)
+        return data
+
+    def get_forecasts(self, location: str, start: date, end: date) -> Dict[date, Forecast]:
+        data = self._load(location)
+        forecasts = {}
+        day = start
+        while day <= end:
+            entry = data.get(day.isoformat())
+            forecasts[day] = {**seasonal_forecast(day), **entry, 'source': 'file'} if entry else seasonal_forecast(day)
+            day += timedelta(days=1)
+        return forecasts
+
+
+PROVIDERS = {
+    FileWeatherProvider.name: FileWeatherProvider,
+}
+
+
+class ForecastCache:
+    """Forecasts by (location, day) in memory, persisted per location as JSON, expiring after the TTL"""
+
+    def __init__(self, cache_dir: Path = WEATHER_CACHE_DIR, ttl_seconds: int = WEATHER_CACHE_SECONDS):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # (provider, location key) -> {iso day: (fetched_at, forecast)}
+        self._entries: Dict[Tuple[str, str], Dict[str, Tuple[float, Forecast]]] = {}
+
+    def _path(self, provider: str, key: str) -> Path:
+        return self.cache_dir / provider / f"{FileWeatherProvider.slug(key)}.json"
+
+    def _location(self, provider: str, key: str) -> Dict[str, Tuple[float, Forecast]]:
+        """Entries for one location, read from disk on first use (caller holds the lock)"""
+        entries = self._entries.get((provider, key))
+        if entries is None:
+            entries = {}
+            try:
+                with open(self._path(provider, key)) as f:
+                    entries = {day: (fetched_at, forecast) for day, (fetched_at, forecast) in json.load(f).items()}
+            except (OSError, ValueError):
+                pass
+            self._entries[(provider, key)] = entries
+        return entries
+
+    def get_range(self, provider: str, key: str, start: date, end: date) -> Tuple[Dict[date, Forecast], List[date]]:
+        """Fresh cached forecasts in the range, and the days that still need fetching"""
+        now = time.time()
+        found, missing = {}, []
+        with self._lock:
+            entries = self._location(provider, key)
+            day = start
+            while day <= end:
+                cached = entries.get(day.isoformat())
+                if cached and now - cached[0] < self.ttl_seconds:
+                    found[day] = cached[1]
+                else:
+                    missing.append(day)
+                day += timedelta(days=1)
+        return found, missing
+
+    def put_range(self, provider: str, key: str, forecasts: Dict[date, Forecast]) -> None:
+        # Seasonal fallbacks are cheap to recompute, and caching them would hide forecasts added later
+        forecasts = {day: forecast for day, forecast in forecasts.items() if forecast.get('source') != 'seasonal'}
+        if not forecasts:
+            return
+        now = time.time()
+        with self._lock:
+            entries = self._location(provider, key)
+            for day, forecast in forecasts.items():
+                entries[day.isoformat()] = (now, forecast)
+            # Expired entries are not worth writing back
+            snapshot = {day: list(entry) for day, entry in entries.items() if now - entry[0] < self.ttl_seconds}
+        path = self._path(provider, key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not persist weather cache {path}: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class WeatherSuitability:
+    """
+    Days fit for outdoor shooting as one integer bitmask per location:
+    bit i is set when start + i days is suitable
+    """
+
+    def __init__(self, start: date, day_count: int):
+        self.start = start
+        self.day_count = day_count
+        self.masks: Dict[str, int] = {}
+        self.reasons: Dict[Tuple[str, int], str] = {}  # Only unsuitable days are listed
+
+    def _index(self, location: Optional[str], day: date) -> Optional[int]:
+        index = (day - self.start).days
+        if location_key(location) not in self.masks or not 0 <= index < self.day_count:
+            return None
+        return index
+
+    def covers(self, location: Optional[str], day: date) -> bool:
+        return self._index(location, day) is not None
+
+    def covers_range(self, start: date, end: date) -> bool:
+        return self.start <= start and (end - self.start).days < self.day_count
+
+    def check(self, location: Optional[str], day: date) -> Optional[Tuple[bool, str]]:
+        """(suitable, reason), or None when the day or location was not prefetched"""
+        index = self._index(location, day)
+        if index is None:
+            return None
+        key = location_key(location)
+        if self.masks[key] >> index & 1:
+            return True, "Weather suitable"
+        return False, self.reasons.get((key, index), "Weather unsuitable")
+
+    def next_suitable(self, location: Optional[str], day: date, limit: int) -> Optional[int]:
+        """Days from `day` (exclusive) to the next suitable one within `limit`, if the window covers them"""
+        index = self._index(location, day)
+        if index is None or index + limit >= self.day_count:
+            return None
+        window = self.masks[location_key(location)] >> (index + 1) & ((1 << limit) - 1)
+        return (window & -window).bit_length() if window else 0
+
+    def unsuitable_days(self, location: Optional[str]) -> List[date]:
+        mask = self.masks.get(location_key(location))
+        if mask is None:
+            return []
+        return [self.start + timedelta(days=i) for i in range(self.day_count) if not mask >> i & 1]
+
+
+class WeatherForecastService:
+    """Provider + cache, with batch prefetch and the suitability bitmap for the scheduler"""
+
+    def __init__(self, provider: Optional[WeatherProvider] = None, cache: Optional[ForecastCache] = None):
+        self.provider = provider or PROVIDERS[WEATHER_PROVIDER]()
+        self.cache = cache or ForecastCache()
+        self._lock = threading.Lock()
+        # (location key, start, end) -> (computed_at, mask, {day index: reason}), so repeat runs skip the day scan
+        self._masks: "OrderedDict[Tuple[str, date, date], Tuple[float, int, Dict[int, str]]]" = OrderedDict()
+
+    def forecasts(self, location: Optional[str], start: date, end: date) -> Dict[date, Forecast]:
+        """Forecasts for one location and range, fetching only the days not cached"""
+        key = location_key(location)
+        found, missing = self.cache.get_range(self.provider.name, key, start, end)
+        if missing:
+            try:
+                fetched = self.provider.get_forecasts(location or "", missing[0], missing[-1])
+                self.cache.put_range(self.provider.name, key, fetched)
+            except Exception as e:
+                # A provider outage should not stop scheduling
+                logger.warning(f"Weather provider failed for {location}: {e}")
+                fetched = {}
+            for day in missing:
+                found[day] = fetched.get(day) or seasonal_forecast(day)
+        return found
+
+    def forecast(self, location: Optional[str], day: date) -> Forecast:
+        return self.forecasts(location, day, day)[day]
+
+    def prefetch(self, locations: Iterable[Optional[str]], start: date, end: date) -> Dict[str, Dict[date, Forecast]]:
+        """Forecasts for many locations over one range, fetched in parallel"""
+        names = {location_key(location): location for location in locations}
+        if len(names) > 1 and PREFETCH_WORKERS > 1:
+            with ThreadPoolExecutor(max_workers=min(PREFETCH_WORKERS, len(names))) as pool:
+                results = pool.map(lambda location: self.forecasts(location, start, end), names.values())
+                return dict(zip(names, results))
+        return {key: self.forecasts(location, start, end) for key, location in names.items()}
+
+    def suitability(self, locations: Iterable[Optional[str]], start: date, end: date) -> WeatherSuitability:
+        """Prefetch the range for these locations and build the outdoor suitability bitmap"""
+        bitmap = WeatherSuitability(start, (end - start).days + 1)
+        now = time.time()
+        pending = {}
+        with self._lock:
+            for location in locations:
+                key = location_key(location)
+                memo = self._masks.get((key, start, end))
+                if memo and now - memo[0] < self.cache.ttl_seconds:
+                    self._masks.move_to_end((key, start, end))
+                    self._add(bitmap, key, memo[1], memo[2])
+                else:
+                    pending[key] = location
+
+        for key, forecasts in self.prefetch(pending.values(), start, end).items():
+            mask, reasons = 0, {}
+            for day, forecast in forecasts.items():
+                index = (day - start).days
+                suitable, reason = forecast_suitability(forecast)
+                if suitable:
+                    mask |= 1 << index
+                else:
+                    reasons[index] = reason
+            self._add(bitmap, key, mask, reasons)
+            if any(forecast.get('source') == 'seasonal' for forecast in forecasts.values()):
+                continue  # Not memoized, like the seasonal forecasts themselves
+            with self._lock:
+                self._masks[(key, start, end)] = (now, mask, reasons)
+                while len(self._masks) > MASK_MEMO_SIZE:
+                    self._masks.popitem(last=False)
+        return bitmap
+
+    @staticmethod
+    def _add(bitmap: WeatherSuitability, key: str, mask: int, reasons: Dict[int, str]) -> None:
+        bitmap.masks[key] = mask
+        bitmap.reasons.update({(key, index): reason for index, reason in reasons.items()})
+
+    def clear(self) -> None:
+        """Forget cached forecasts and bitmaps (the disk cache is kept until it expires)"""
+        self.cache.clear()
+        with self._lock:
+            self._masks.clear()
+
+
+# Singleton instance
+weather_forecasts = WeatherForecastService()
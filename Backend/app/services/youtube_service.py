@@ -66,21 +66,10 @@ class YouTubeService:
             video = items[0]
 
             # Get top 3 comments for the video
-            comments_url = "https://www.googleapis.com/youtube/v3/commentThreads"
-            comments_params = {
-                "part": "snippet",
-                "videoId": video_id,
-                "maxResults": 3,
-                "order": "relevance",
-                "key": self.api_key
-            }
-            comments_response = requests.get(comments_url, params=comments_params).json()
-            top_comments = [
-                comment["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
-                for comment in comments_response.get("items", [])
-            ]
+            top_comments = self.top_comments(video_id)
 
             videos_info.append({
+                "video_id": video_id,
                 "video_title": video["snippet"].get("title"),
                 "video_description": video["snippet"].get("description"),
                 "views": int(video.get("statistics", {}).get("viewCount", 0)),
@@ -105,5 +94,44 @@ class YouTubeService:
 
         return report
 
+    def video_statistics(self, video_ids: list) -> dict:
+        """Fetch view/like/comment counts for known videos, 50 IDs per request."""
+        if not self.api_key:
+            raise RuntimeError("YouTube API key not configured")
+
+        stats = {}
+        video_url = "https://www.googleapis.com/youtube/v3/videos"
+        for start in range(0, len(video_ids), 50):
+            video_params = {
+                "part": "statistics",
+                "id": ",".join(video_ids[start:start + 50]),
+                "key": self.api_key
+            }
+            video_response = requests.get(video_url, params=video_params).json()
+            for item in video_response.get("items") or []:
+                statistics = item.get("statistics", {})
+                stats[item["id"]] = {
+                    "views": int(statistics.get("viewCount", 0)),
+                    "likes": int(statistics.get("likeCount", 0)),
+                    "comments_count": int(statistics.get("commentCount", 0)),
+                }
+        return stats
+
+    def top_comments(self, video_id: str, max_results: int = 3) -> list:
+        """Fetch the most relevant top-level comments for a video."""
+        comments_url = "https://www.googleapis.com/youtube/v3/commentThreads"
+        comments_params = {
+            "part": "snippet",
+            "videoId": video_id,
+            "maxResults": max_results,
+            "order": "relevance",
+            "key": self.api_key
+        }
+        comments_response = requests.get(comments_url, params=comments_params).json()
+        return [
+            comment["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
+            for comment in comments_response.get("items", [])
+        ]
+
 # global instance
 youtube_service = YouTubeService()
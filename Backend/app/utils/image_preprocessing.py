@@ -0,0 +1,94 @@
+import io
+from typing import Optional, Tuple
+
+from PIL import Image, ImageFilter, ImageOps
+
+# Long edge of an A4 page in inches; used to turn a target DPI into pixels
+A4_LONG_EDGE_INCHES = 11.69
+
+OUTPUT_MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+}
+
+
+def _document_bounds(img: Image.Image) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Find the bounding box of the bright paper area in a grayscale photo.
+    Returns None when no clear document edge is found.
+    """
+    # Work on a small copy; the box is scaled back up afterwards
+    probe = img.copy()
+    probe.thumbnail((400, 400))
+    scale_x = img.width / probe.width
+    scale_y = img.height / probe.height
+
+    mask = ImageOps.autocontrast(probe).point(lambda p: 255 if p > 160 else 0)
+    mask = mask.filter(ImageFilter.MedianFilter(5))
+    bbox = mask.getbbox()
+    if not bbox:
+        return None
+
+    left, top, right, bottom = bbox
+    area_ratio = ((right - left) * (bottom - top)) / float(probe.width * probe.height)
+    # Too small is probably glare, nearly full means there is nothing to crop
+    if area_ratio < 0.3 or area_ratio > 0.95:
+        return None
+
+    margin = 4
+    return (
+        max(0, int((left - margin) * scale_x)),
+        max(0, int((top - margin) * scale_y)),
+        min(img.width, int((right + margin) * scale_x)),
+        min(img.height, int((bottom + margin) * scale_y)),
+    )
+
+
+def preprocess_invoice_image(
+    file_path: str,
+    target_dpi: int = 150,
+    output_format: str = "JPEG",
+    quality: int = 75,
+    crop_to_document: bool = True,
+) -> Tuple[bytes, str, dict]:
+    """
+    Prepare an invoice photo for AI extraction without touching the original file.
+
+    EXIF-rotates, converts to grayscale, optionally crops to the detected paper,
+    downscales so the long edge matches target_dpi on an A4 page and re-encodes
+    compactly. Safe to run in a worker process.
+
+    Returns:
+        Tuple of (image_bytes, mime_type, info)
+    """
+    output_format = output_format.upper()
+    max_long_edge = int(target_dpi * A4_LONG_EDGE_INCHES)
+
+    with Image.open(file_path) as original:
+        original_size = original.size
+        img = ImageOps.exif_transpose(original)
+        img = img.convert("L")
+
+        cropped = False
+        if crop_to_document:
+            bbox = _document_bounds(img)
+            if bbox:
+                img = img.crop(bbox)
+                cropped = True
+
+        # thumbnail() only ever shrinks
+        img.thumbnail((max_long_edge, max_long_edge), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        if output_format == "WEBP":
+            img.save(buffer, format="WEBP", quality=quality, method=4)
+        else:
+            img.save(buffer, format="JPEG", quality=quality, optimize=True)
+
+    info = {
+        "original_size": list(original_size),
+        "processed_size": list(img.size),
+        "cropped": cropped,
+        "format": output_format,
+    }
+    return buffer.getvalue(), OUTPUT_MIME_TYPES.get(output_format, "image/jpeg"), info
@@ -0,0 +1,136 @@
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+try:
+    from fpdf import FPDF
+    FPDF_AVAILABLE = True
+except ImportError:
+    FPDF_AVAILABLE = False
+    FPDF = None
+
+logger = logging.getLogger(__name__)
+
+# Plain-text invoice written when fpdf2 is missing or PDF rendering fails
+TEXT_TEMPLATE = """
+INVOICE: {invoice_id}
+Date: {invoice_date}
+
+Company: {company_name}
+Address: {company_address}
+GSTIN: {company_gstin}
+
+Bank Details:
+{bank_name}
+Account: {bank_ac}
+IFSC: {bank_ifsc}
+
+Actor: {actor_name}
+PAN: {actor_pan}
+Address: {actor_address}
+
+Acting Fee: Rs. {acting_fee_display}
+TDS ({tds_percent}%): Rs. {tds_amount_display}
+Net Amount: Rs. {net_amount_display}
+"""
+
+
+@lru_cache(maxsize=1)
+def invoice_layout() -> Tuple[Tuple[Any, ...], ...]:
+    """
+    Actor invoice layout as drawing operations with {field} placeholders.
+
+    Built once per process; rendering only formats the text and replays it.
+    """
+    return (
+        # Company Header
+        ("font", "B", 16),
+        ("cell", 0, 10, "{company_name}", 1, "C", 0),
+        ("font", "", 10),
+        ("cell", 0, 8, "{company_address} | GSTIN: {company_gstin}", 1, "C", 0),
+        ("cell", 0, 8, "", 1, "", 0),  # blank line
+
+        # Invoice Info
+        ("font", "B", 12),
+        ("cell", 90, 8, "Invoice No: {invoice_id}", 0, "", 0),
+        ("cell", 0, 8, "Date: {invoice_date}", 1, "", 0),
+        ("font", "", 12),
+        ("cell", 0, 8, "Billing To:", 1, "", 0),
+        ("cell", 0, 7, "{actor_name}", 1, "", 0),
+        ("cell", 0, 7, "PAN: {actor_pan}", 1, "", 0),
+        ("cell", 0, 7, "Address: {actor_address}", 1, "", 0),
+        ("cell", 0, 8, "", 1, "", 0),  # blank line
+
+        # Table header
+        ("font", "B", 12),
+        ("cell", 10, 8, "Sl", 0, "", 1),
+        ("cell", 120, 8, "Description", 0, "", 1),
+        ("cell", 35, 8, "Amount (Rs.)", 1, "", 1),
+
+        # Table rows
+        ("font", "", 12),
+        ("cell", 10, 8, "1", 0, "", 1),
+        ("cell", 120, 8, "Acting Fee for Feature Film", 0, "", 1),
+        ("cell", 35, 8, "{acting_fee:.2f}", 1, "", 1),
+        ("cell", 130, 8, "(-) TDS @ {tds_percent:.2f}%", 0, "", 1),
+        ("cell", 35, 8, "{tds_amount:.2f}", 1, "", 1),
+        ("cell", 130, 8, "Net Amount Payable", 0, "", 1),
+        ("cell", 35, 8, "{net_amount:.2f}", 1, "", 1),
+
+        # Payment info and terms
+        ("ln", 12),
+        ("font", "", 11),
+        ("cell", 0, 7, "Payment Terms: Net 15 days", 1, "", 0),
+        ("cell", 0, 7, "Bank Details: {bank_name}, A/c No: {bank_ac}, IFSC: {bank_ifsc}", 1, "", 0),
+
+        ("ln", 15),
+        ("font", "", 12),
+        ("cell", 0, 10, "For {company_name}", 1, "", 0),
+        ("cell", 0, 5, "(Authorized Signatory)", 1, "", 0),
+    )
+
+
+def _write_text_invoice(fields: Dict[str, Any], path_stem: str) -> str:
+    filename = f"{path_stem}.txt"
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(TEXT_TEMPLATE.format(
+            acting_fee_display=f"{fields['acting_fee']:,.2f}",
+            tds_amount_display=f"{fields['tds_amount']:,.2f}",
+            net_amount_display=f"{fields['net_amount']:,.2f}",
+            **fields
+        ))
+    return filename
+
+
+def render_invoice(fields: Dict[str, Any], path_stem: str) -> str:
+    """
+    Render one actor invoice to path_stem + ".pdf" and return the written path.
+
+    Falls back to a text file (path_stem + ".txt") if fpdf2 is unavailable or fails.
+    """
+    if not FPDF_AVAILABLE:
+        logger.warning("fpdf2 not available, creating text file instead of PDF")
+        return _write_text_invoice(fields, path_stem)
+
+    try:
+        pdf = FPDF('P', 'mm', 'A4')
+        pdf.add_page()
+        for op in invoice_layout():
+            if op[0] == "font":
+                pdf.set_font("Arial", op[1], op[2])
+            elif op[0] == "ln":
+                pdf.ln(op[1])
+            else:
+                _, width, height, text, ln, align, border = op
+                pdf.cell(width, height, text.format(**fields), border=border, ln=ln, align=align)
+        filename = f"{path_stem}.pdf"
+        pdf.output(filename)
+        return filename
+    except Exception as e:
+        logger.error(f"PDF generation failed: {str(e)}, falling back to text file")
+        return _write_text_invoice(fields, path_stem)
+
+
+def render_invoices(jobs: List[Tuple[Dict[str, Any], str]]) -> List[str]:
+    """Render a chunk of (fields, path_stem) jobs; used as one process-pool task"""
+    return [render_invoice(fields, path_stem) for fields, path_stem in jobs]
@@ -0,0 +1,206 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from PyPDF2 import PdfReader
+
+GSTIN_RE = re.compile(r"\b(\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z])\b")
+INVOICE_NUMBER_RE = re.compile(
+    r"(?:invoice|bill|inv)\s*(?:no|number|num|#)\.?\s*[:#\-]?\s*([A-Z0-9][A-Z0-9\-/]{1,30})",
+    re.IGNORECASE
+)
+
+_AMOUNT = r"(?:₹|rs\.?|inr|\$|usd|€|eur)?\s*([\d,]+(?:\.\d{1,2})?)"
+TOTAL_RE = re.compile(
+    r"(?:grand\s+total|total\s+amount|amount\s+payable|net\s+payable|invoice\s+total|total\s+due|balance\s+due)"
+    r"[^\d\n]{0,20}" + _AMOUNT,
+    re.IGNORECASE
+)
+PLAIN_TOTAL_RE = re.compile(
+    r"^\s*total\b(?!\s*(?:tax|gst|qty|quantity|items))[^\d\n]{0,20}" + _AMOUNT,
+    re.IGNORECASE | re.MULTILINE
+)
+SUBTOTAL_RE = re.compile(r"(?:sub\s*-?\s*total|taxable\s+(?:value|amount))[^\d\n]{0,20}" + _AMOUNT, re.IGNORECASE)
+DISCOUNT_RE = re.compile(r"discount[^\d\n]{0,20}" + _AMOUNT, re.IGNORECASE)
+TOTAL_TAX_RE = re.compile(r"(?:total\s+(?:tax|gst)|tax\s+amount|gst\s+amount)[^\d\n]{0,20}" + _AMOUNT, re.IGNORECASE)
+# "CGST @ 9%  450.00" -> the amount is the last number on the line
+COMPONENT_TAX_RE = re.compile(
+    r"^\s*(cgst|sgst|utgst|igst|vat)\b[^\n]*?([\d,]+\.\d{1,2})\s*$",
+    re.IGNORECASE | re.MULTILINE
+)
+
+_DATE = (
+    r"(\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4}|\d{4}-\d{2}-\d{2}"
+    r"|\d{1,2}[\s\-][A-Za-z]{3,9},?[\s\-]\d{4}|[A-Za-z]{3,9}\s+\d{1,2},?\s+\d{4})"
+)
+INVOICE_DATE_RE = re.compile(
+    r"(?:invoice\s+date|bill\s+date|date\s+of\s+issue|dated|(?<!due )date)\s*[:\-]?\s*" + _DATE,
+    re.IGNORECASE
+)
+DUE_DATE_RE = re.compile(r"(?:due\s+date|payment\s+due|due\s+by)\s*[:\-]?\s*" + _DATE, re.IGNORECASE)
+DATE_FORMATS = (
+    "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%m-%y", "%Y-%m-%d",
+    "%d %b %Y", "%d %B %Y", "%d-%b-%Y", "%d-%B-%Y", "%b %d %Y", "%B %d %Y",
+)
+
+# "2  Camera rental (day)  2  1,500.00  3,000.00" -> description, quantity, unit price, amount
+LINE_ITEM_RE = re.compile(
+    r"^\s*(?:\d+[.)]?\s+)?(.*?[A-Za-z].*?)\s+(\d+(?:\.\d+)?)\s+(?:x\s+)?[₹$]?\s*([\d,]+\.\d{2})\s+[₹$]?\s*([\d,]+\.\d{2})\s*$",
+    re.MULTILINE
+)
+
+CATEGORY_KEYWORDS = {
+    "catering": ("catering", "meal", "lunch", "dinner", "breakfast", "food", "snacks", "tea"),
+    "transport": ("taxi", "cab", "fuel", "diesel", "petrol", "transport", "travel", "vehicle"),
+    "accommodation": ("hotel", "room", "stay", "lodging", "accommodation"),
+    "equipment": ("camera", "lens", "light", "generator", "equipment", "rental", "crane", "drone"),
+    "props": ("props", "costume", "set", "furniture"),
+}
+
+# Points towards the local confidence score
+CONFIDENCE_WEIGHTS = {
+    "invoice_number": 0.2,
+    "total_amount": 0.2,
+    "invoice_date": 0.2,
+    "vendor_gstin": 0.1,
+    "vendor_name": 0.05,
+    "arithmetic": 0.25,
+}
+
+
+def extract_pdf_text(file_path: str, max_pages: int = 3) -> str:
+    """Text layer of the first pages of a PDF ("" for scanned PDFs)"""
+    reader = PdfReader(file_path)
+    return "\n".join((page.extract_text() or "") for page in reader.pages[:max_pages])
+
+
+def _amount(value: str) -> Optional[float]:
+    try:
+        return float(value.replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _date(value: str) -> Optional[str]:
+    value = re.sub(r"\s+", " ", value.replace(",", " ")).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def _first_amount(pattern: re.Pattern, text: str, last: bool = False) -> Optional[float]:
+    matches = pattern.findall(text)
+    if not matches:
+        return None
+    return _amount(matches[-1] if last else matches[0])
+
+
+def _close(a: Optional[float], b: Optional[float], tolerance: float = 1.0) -> bool:
+    return a is not None and b is not None and abs(a - b) <= tolerance
+
+
+def _vendor_name(lines: List[str]) -> Optional[str]:
+    for line in lines[:8]:
+        if re.match(r"^(tax\s+)?invoice\b|^bill\b|^original\b", line, re.IGNORECASE):
+            continue
+        if GSTIN_RE.search(line) or not re.search(r"[A-Za-z]{3}", line):
+            continue
+        return line[:120]
+    return None
+
+
+def _line_items(text: str) -> List[Dict[str, Any]]:
+    items = []
+    for description, quantity, unit_price, amount in LINE_ITEM_RE.findall(text):
+        quantity, unit_price, amount = float(quantity), _amount(unit_price), _amount(amount)
+        # Only accept rows whose arithmetic checks out, so totals rows are skipped
+        if unit_price is None or amount is None or not _close(quantity * unit_price, amount, max(1.0, amount * 0.01)):
+            continue
+        items.append({
+            "description": description.strip(),
+            "quantity": int(quantity) if quantity.is_integer() else quantity,
+            "unit_price": unit_price,
+            "amount": amount,
+        })
+    return items
+
+
+def _category(text: str) -> Optional[str]:
+    lowered = text.lower()
+    scores = {
+        category: sum(lowered.count(word) for word in words)
+        for category, words in CATEGORY_KEYWORDS.items()
+    }
+    best = max(scores, key=scores.get)
+    return best if scores[best] else None
+
+
+def parse_invoice_text(text: str) -> Dict[str, Any]:
+    """
+    Parse invoice fields from a PDF text layer with regex and table heuristics.
+
+    Returns the same keys as the Gemini extraction, plus a confidence score
+    that is only high when the amounts cross-check.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+
+    gstins = GSTIN_RE.findall(text)
+    number_match = INVOICE_NUMBER_RE.search(text)
+    date_match = INVOICE_DATE_RE.search(text)
+    due_match = DUE_DATE_RE.search(text)
+
+    total = _first_amount(TOTAL_RE, text, last=True) or _first_amount(PLAIN_TOTAL_RE, text, last=True)
+    subtotal = _first_amount(SUBTOTAL_RE, text)
+    discount = _first_amount(DISCOUNT_RE, text) or 0.0
+    tax = _first_amount(TOTAL_TAX_RE, text)
+    if tax is None:
+        components = [_amount(amount) for _, amount in COMPONENT_TAX_RE.findall(text)]
+        tax = round(sum(a for a in components if a is not None), 2) if components else None
+
+    line_items = _line_items(text)
+    items_total = round(sum(item["amount"] for item in line_items), 2) if line_items else None
+    if subtotal is None and items_total is not None and tax is not None and _close(items_total + tax - discount, total):
+        subtotal = items_total
+
+    if re.search(r"₹|\brs\.?\s|\binr\b", text, re.IGNORECASE) or gstins:
+        currency = "INR"
+    elif re.search(r"\$|\busd\b", text, re.IGNORECASE):
+        currency = "USD"
+    elif re.search(r"€|\beur\b", text, re.IGNORECASE):
+        currency = "EUR"
+    else:
+        currency = None
+
+    data = {
+        "vendor_name": _vendor_name(lines),
+        "vendor_address": None,
+        "vendor_contact": None,
+        # The first GSTIN on an invoice is normally the supplier's
+        "vendor_gstin": gstins[0] if gstins else None,
+        "invoice_number": number_match.group(1) if number_match else None,
+        "invoice_date": _date(date_match.group(1)) if date_match else None,
+        "due_date": _date(due_match.group(1)) if due_match else None,
+        "subtotal": subtotal,
+        "tax_amount": tax,
+        "discount_amount": discount,
+        "total_amount": total,
+        "currency": currency,
+        "line_items": line_items,
+        "category": _category(text),
+        "payment_terms": None,
+        "notes": None,
+    }
+
+    arithmetic_ok = (
+        _close((subtotal or 0) + (tax or 0) - discount, total) if subtotal is not None
+        else _close(items_total, total)
+    )
+    confidence = sum(
+        weight for field, weight in CONFIDENCE_WEIGHTS.items()
+        if (arithmetic_ok if field == "arithmetic" else data.get(field))
+    )
+    data["confidence"] = round(min(confidence, 1.0), 2)
+    return data
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+
+def render_thumbnail(source_path: str, target_path: str, size: int, quality: int = 70) -> None:
+    """Write a WebP thumbnail whose long edge is at most size pixels"""
+    with Image.open(source_path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        img.thumbnail((size, size), Image.LANCZOS)
+        # A unique temp file per render, so concurrent misses for one key never share it
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(target_path) or ".", suffix=".tmp", delete=False
+        ) as tmp:
+            tmp_path = tmp.name
+        try:
+            img.save(tmp_path, format="WEBP", quality=quality, method=4)
+            os.replace(tmp_path, target_path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+
+class ThumbnailCache:
+    """
+    On-disk thumbnail cache bounded by total size, evicting least recently used files.
+    Recency survives restarts through file mtimes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+
+        existing = sorted(
+            (p for p in self.directory.glob("*.webp") if p.is_file()),
+            key=lambda p: p.stat().st_mtime
+        )
+        for path in existing:
+            size = path.stat().st_size
+            self._entries[path.name] = size
+            self._total += size
+
+    def get_or_create(self, key: str, source_path: str, size: int) -> str:
+        """Return the cached thumbnail for key/size, rendering it from source_path on a miss"""
+        name = f"{key}_{size}.webp"
+        path = self.directory / name
+
+        with self._lock:
+            if name in self._entries and path.exists():
+                self._entries.move_to_end(name)
+                os.utime(path)
+                return str(path)
+
+        # Render outside the lock; concurrent misses for one key just render twice
+        render_thumbnail(source_path, str(path), size)
+        file_size = path.stat().st_size
+
+        with self._lock:
+            self._total -= self._entries.pop(name, 0)
+            self._entries[name] = file_size
+            self._total += file_size
+            self._evict()
+        return str(path)
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            name, file_size = self._entries.popitem(last=False)
+            self._total -= file_size
+            (self.directory / name).unlink(missing_ok=True)
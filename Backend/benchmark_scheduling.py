@@ -0,0 +1,159 @@
+"""
+Benchmark for the indexed SchedulingEngine
+Builds a synthetic 5000-scene project and times the engine methods against
+the previous linear-scan implementations (kept below as NaiveSchedulingEngine),
+checking both return the same results
+
+Usage: python benchmark_scheduling.py [--scenes 5000] [--actors 400] [--seed 7]
+"""
+
+import argparse
+import random
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.scheduling_service import SchedulingEngine, billing_cost
+
+
+class NaiveSchedulingEngine(SchedulingEngine):
+    """The engine's lookups as they were before SchedulingIndex: a scan per call"""
+
+    def get_actor_payment_type(self, actor_name):
+        for cost in self.global_costs:
+            if cost.category == 'actor' and cost.name.lower() == actor_name.lower():
+                return cost.billing_cycle
+        return 'daily'
+
+    def get_actor_billing(self, actor_name):
+        for cost in self.global_costs:
+            if cost.category == 'actor' and cost.name.lower() == actor_name.lower():
+                return cost.billing_cycle, cost.cost or 0
+        return None
+
+    def calculate_actor_cost(self, actor_name, days):
+        billing = self.get_actor_billing(actor_name)
+        return billing_cost(billing[0], billing[1], days) if billing else 0.0
+
+    def detect_conflicts(self, schedule):
+        # Same as the indexed version except for the per-item scene scan
+        original = self.index
+        self.index = SimpleNamespace(scenes_by_id=_ScanById(self.scenes))
+        try:
+            return super().detect_conflicts(schedule)
+        finally:
+            self.index = original
+
+    def _get_dependent_scenes(self, scene_id):
+        scene = next((s for s in self.scenes if s.id == scene_id), None)
+        if not scene:
+            return []
+        dependent = []
+        scene_num = int(scene.scene_number) if scene.scene_number and scene.scene_number.isdigit() else 0
+        for other_scene in self.scenes:
+            other_num = int(other_scene.scene_number) if other_scene.scene_number and other_scene.scene_number.isdigit() else 0
+            if (other_scene.location_name == scene.location_name and
+                    other_num > scene_num and
+                    other_scene.id != scene_id):
+                dependent.append(other_scene.id)
+        return dependent[:3]
+
+
+class _ScanById:
+    def __init__(self, scenes):
+        self.scenes = scenes
+
+    def get(self, scene_id):
+        return next((s for s in self.scenes if s.id == scene_id), None)
+
+
+def build_project(scene_count, actor_count, seed):
+    rng = random.Random(seed)
+    actors = [f"Actor {i}" for i in range(actor_count)]
+    locations = [f"Location {i}" for i in range(max(scene_count // 40, 1))]
+    scenes = [
+        SimpleNamespace(
+            id=i + 1,
+            scene_number=str(i + 1) if rng.random() > 0.05 else f"{i + 1}A",
+            location_name=rng.choice(locations),
+            location_type=rng.choice(['indoor', 'outdoor']),
+            time_of_day=rng.choice(['day', 'night', 'dawn', 'dusk']),
+            estimated_duration=rng.choice(['1 hour', '2 hours', '3 hours']),
+            actors_data=[{'name': name} for name in rng.sample(actors, rng.randint(1, 5))],
+            technical_notes=None,
+            time_data={}
+        )
+        for i in range(scene_count)
+    ]
+    global_costs = [
+        SimpleNamespace(
+            category='actor',
+            name=name.upper() if rng.random() < 0.3 else name,
+            billing_cycle=rng.choice(['daily', 'weekly', 'monthly']),
+            cost=rng.choice([5000, 15000, 40000])
+        )
+        for name in actors
+    ]
+    start = datetime(2025, 1, 6, 9)
+    schedule = [
+        {
+            'scene_id': scene.id,
+            'scene_number': scene.scene_number,
+            'scheduled_date': start + timedelta(days=i // 5),
+            'location': scene.location_name
+        }
+        for i, scene in enumerate(scenes)
+    ]
+    return scenes, global_costs, schedule, actors
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def run(scene_count, actor_count, seed):
+    scenes, global_costs, schedule, actors = build_project(scene_count, actor_count, seed)
+    config = {'auto_cascade': True}
+
+    naive_build, naive = _timed(lambda: NaiveSchedulingEngine(scenes, [], config, global_costs))
+    indexed_build, indexed = _timed(lambda: SchedulingEngine(scenes, [], config, global_costs))
+    sample = random.Random(seed).sample([s.id for s in scenes], min(500, scene_count))
+
+    cases = [
+        ("actor billing lookups (all scene actors)", lambda e: [
+            (e.get_actor_payment_type(a['name']), e.calculate_actor_cost(a['name'], 10))
+            for s in scenes for a in s.actors_data
+        ]),
+        ("detect_conflicts (full schedule)", lambda e: e.detect_conflicts(schedule)),
+        (f"_get_dependent_scenes x{len(sample)}", lambda e: [e._get_dependent_scenes(i) for i in sample]),
+        ("reschedule_scene with cascade", lambda e: e.reschedule_scene(
+            sample[0], schedule[0]['scheduled_date'] + timedelta(days=30), [dict(item) for item in schedule]
+        )['affected_scenes']),
+    ]
+
+    print(f"🎬 {scene_count} scenes, {actor_count} actors, {len(global_costs)} billing records")
+    print(f"   index build: {indexed_build * 1000:.1f} ms (naive engine: {naive_build * 1000:.1f} ms)\n")
+    print(f"{'case':45} {'naive':>10} {'indexed':>10} {'speedup':>9}")
+    for name, case in cases:
+        naive_time, naive_result = _timed(lambda: case(naive))
+        indexed_time, indexed_result = _timed(lambda: case(indexed))
+        if naive_result != indexed_result:
+            print(f"❌ {name}: results differ")
+            return False
+        print(f"{name:45} {naive_time:9.3f}s {indexed_time:9.3f}s {naive_time / max(indexed_time, 1e-9):8.0f}x")
+    print("\n✅ Indexed and naive engines returned identical results")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SchedulingEngine lookups")
+    parser.add_argument("--scenes", type=int, default=5000)
+    parser.add_argument("--actors", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.scenes, args.actors, args.seed) else 1)
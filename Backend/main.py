@@ -2,6 +2,8 @@
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from contextlib import asynccontextmanager
+import os
+import threading
 
 from app.config.database import get_db, create_tables
 from app.controllers import projects
@@ -21,13 +23,32 @@ from app.controllers import invoice
 from app.controllers import promotions
 from app.controllers import tickets
 from app.controllers import operations
+from app.controllers import vendors
+from app.services.promotion_tracking_service import promotion_tracker
+from app.services.invoice_worker import invoice_worker
+from app.services.invoice_service import shutdown_pdf_pool
+from app.services.schedule_solver import shutdown_solver_pool
+from app.services.invoice_processing_service import (
+    shutdown_preprocess_pool, warm_up_invoice_service, close_invoice_processing_service
+)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     create_tables()
+    if os.getenv("PROMOTION_TRACKER_ENABLED", "true").lower() == "true":
+        promotion_tracker.start()
+    # Open the Gemini connection in the background so startup is not blocked on the network
+    threading.Thread(target=warm_up_invoice_service, name="invoice-warmup", daemon=True).start()
+    invoice_worker.requeue_pending()
     yield
-    # Shutdown (if needed)
+    # Shutdown
+    promotion_tracker.stop()
+    invoice_worker.shutdown()
+    shutdown_preprocess_pool()
+    shutdown_pdf_pool()
+    shutdown_solver_pool()
+    close_invoice_processing_service()
 
 app = FastAPI(title="Cinehack Celluloid API", version="1.0.0", lifespan=lifespan)
 
@@ -57,6 +78,7 @@ app.include_router(invoice.router, prefix="/api/invoice", tags=["invoice"])
 app.include_router(promotions.router, prefix="/api", tags=["promotions"])
 app.include_router(tickets.router, prefix="/api", tags=["tickets"])
 app.include_router(operations.router, prefix="/api/operations", tags=["operations"])
+app.include_router(vendors.router, prefix="/api", tags=["vendors"])
 
 @app.get("/")
 def root():
@@ -0,0 +1,88 @@
+"""
+Migration script for effective-dated currency rates
+Adds: currency_rates table (seeded with the previous fixed rates),
+uploaded_invoices.exchange_rate and the indexed uploaded_invoices.amount_in_base_currency,
+then backfills the converted amount for existing invoices
+"""
+
+import sys
+import os
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.config.database import engine, Base, SessionLocal
+from app.models import CurrencyRate, UploadedInvoice
+from app.services.approval_policy_service import DEFAULT_RATES_TO_BASE, BASE_CURRENCY, currency_rates
+
+def migrate_currency_rates():
+    """Create currency_rates, add the base-currency columns and backfill them"""
+    print("🚀 Starting Currency Rate Migration...")
+
+    try:
+        Base.metadata.create_all(bind=engine, tables=[CurrencyRate.__table__])
+        print("✅ currency_rates table is present")
+
+        with engine.connect() as connection:
+            existing = {
+                row[0] for row in connection.execute(text("""
+                    SELECT column_name
+                    FROM information_schema.columns
+                    WHERE table_name = 'uploaded_invoices'
+                    AND column_name IN ('exchange_rate', 'amount_in_base_currency')
+                """))
+            }
+            if 'exchange_rate' not in existing:
+                connection.execute(text("ALTER TABLE uploaded_invoices ADD COLUMN exchange_rate FLOAT"))
+            if 'amount_in_base_currency' not in existing:
+                connection.execute(text("ALTER TABLE uploaded_invoices ADD COLUMN amount_in_base_currency FLOAT"))
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_uploaded_invoices_amount_in_base_currency
+                ON uploaded_invoices (amount_in_base_currency)
+            """))
+            connection.commit()
+        print("✅ exchange_rate / amount_in_base_currency columns are present")
+
+        db = SessionLocal()
+        try:
+            # Seed the old hard-coded rates so existing behaviour is unchanged
+            if db.query(CurrencyRate.id).first() is None:
+                db.add_all([
+                    CurrencyRate(
+                        currency=currency,
+                        rate_to_base=rate,
+                        effective_from=datetime(2000, 1, 1),
+                        source="default"
+                    )
+                    for currency, rate in DEFAULT_RATES_TO_BASE.items()
+                    if currency != BASE_CURRENCY
+                ])
+                db.commit()
+                print(f"✅ Seeded {len(DEFAULT_RATES_TO_BASE) - 1} default currency rates")
+
+            invoices = db.query(UploadedInvoice).filter(
+                UploadedInvoice.amount_in_base_currency.is_(None)
+            ).all()
+            for invoice in invoices:
+                invoice.amount_in_base_currency, invoice.exchange_rate = currency_rates.to_base(
+                    db, invoice.total_amount or 0.0, invoice.currency, invoice.invoice_date
+                )
+            db.commit()
+            print(f"✅ Backfilled base-currency amounts for {len(invoices)} invoices")
+        finally:
+            db.close()
+        return True
+
+    except Exception as e:
+        print(f"❌ Error during migration: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    success = migrate_currency_rates()
+    if success:
+        print("\n✨ Migration completed successfully!")
+    else:
+        print("\n⚠️  Migration failed. Please check the errors above.")
+        sys.exit(1)
@@ -0,0 +1,46 @@
+"""
+Migration script for SQL-side invoice analytics
+Adds: invoice_project_summaries table (materialized per-project totals)
+and a (project_id, id) index on uploaded_invoices for keyset-paginated listing
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.config.database import engine, Base
+from app.models import InvoiceProjectSummary
+
+def migrate_invoice_analytics():
+    """Create invoice_project_summaries and the listing index"""
+    print("🚀 Starting Invoice Analytics Migration...")
+
+    try:
+        Base.metadata.create_all(bind=engine, tables=[InvoiceProjectSummary.__table__])
+        print("✅ invoice_project_summaries table is present")
+
+        with engine.connect() as connection:
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_uploaded_invoices_project_id_id
+                ON uploaded_invoices (project_id, id)
+            """))
+            connection.commit()
+        print("✅ ix_uploaded_invoices_project_id_id index is present")
+
+        # Summaries are built lazily on first read, so nothing to backfill
+        return True
+
+    except Exception as e:
+        print(f"❌ Error during migration: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    success = migrate_invoice_analytics()
+    if success:
+        print("\n✨ Migration completed successfully!")
+    else:
+        print("\n⚠️  Migration failed. Please check the errors above.")
+        sys.exit(1)
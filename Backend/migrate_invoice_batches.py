@@ -0,0 +1,35 @@
+"""
+Migration script to add batch upload tracking to uploaded_invoices
+"""
+from sqlalchemy import create_engine, text
+from app.config.database import DATABASE_URL
+
+def migrate_add_invoice_batch_id():
+    """Add indexed batch_id column to uploaded_invoices table"""
+    engine = create_engine(DATABASE_URL)
+    
+    with engine.connect() as connection:
+        # Check if column already exists
+        check_query = text("""
+            SELECT COUNT(*) 
+            FROM information_schema.columns 
+            WHERE table_name = 'uploaded_invoices' 
+            AND column_name = 'batch_id'
+        """)
+        
+        column_exists = connection.execute(check_query).scalar() > 0
+        
+        if column_exists:
+            print("✓ batch_id column already exists in uploaded_invoices table")
+            return
+        
+        connection.execute(text("ALTER TABLE uploaded_invoices ADD COLUMN batch_id VARCHAR(32)"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS ix_uploaded_invoices_batch_id ON uploaded_invoices (batch_id)"))
+        connection.commit()
+        
+        print("✓ Successfully added batch_id column to uploaded_invoices table")
+
+if __name__ == "__main__":
+    print("Starting migration to add invoice batch tracking...")
+    migrate_add_invoice_batch_id()
+    print("Migration completed!")
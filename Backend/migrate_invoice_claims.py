@@ -0,0 +1,34 @@
+"""
+Migration script to record when the extraction worker claims an invoice
+"""
+from sqlalchemy import create_engine, text
+from app.config.database import DATABASE_URL
+
+def migrate_add_extraction_claimed_at():
+    """Add extraction_claimed_at column to uploaded_invoices table"""
+    engine = create_engine(DATABASE_URL)
+    
+    with engine.connect() as connection:
+        # Check if column already exists
+        check_query = text("""
+            SELECT COUNT(*) 
+            FROM information_schema.columns 
+            WHERE table_name = 'uploaded_invoices' 
+            AND column_name = 'extraction_claimed_at'
+        """)
+        
+        column_exists = connection.execute(check_query).scalar() > 0
+        
+        if column_exists:
+            print("✓ extraction_claimed_at column already exists in uploaded_invoices table")
+            return
+        
+        connection.execute(text("ALTER TABLE uploaded_invoices ADD COLUMN extraction_claimed_at TIMESTAMP"))
+        connection.commit()
+        
+        print("✓ Successfully added extraction_claimed_at column to uploaded_invoices table")
+
+if __name__ == "__main__":
+    print("Starting migration to add invoice extraction claims...")
+    migrate_add_extraction_claimed_at()
+    print("Migration completed!")
@@ -0,0 +1,45 @@
+"""
+Migration script for scheduled promotion tracking
+Adds: promotion_trackings, promotion_snapshots
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.database import engine, Base
+from app.models import PromotionTracking, PromotionSnapshot
+
+def migrate_promotion_tracking_tables():
+    """Create the promotion tracking tables"""
+    print("🚀 Starting Promotion Tracking Migration...")
+    
+    try:
+        Base.metadata.create_all(
+            bind=engine,
+            tables=[
+                PromotionTracking.__table__,
+                PromotionSnapshot.__table__
+            ]
+        )
+        
+        print("✅ Successfully created the following tables:")
+        print("   - promotion_trackings")
+        print("   - promotion_snapshots")
+        print("\nTrack a film with POST /api/promotions/tracking and query")
+        print("growth with GET /api/promotions/tracking/{id}/timeseries")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error during migration: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    success = migrate_promotion_tracking_tables()
+    if success:
+        print("\n✨ Migration completed successfully!")
+    else:
+        print("\n⚠️  Migration failed. Please check the errors above.")
+        sys.exit(1)
@@ -0,0 +1,68 @@
+"""
+Migration script for SQL-side schedule conflicts
+Adds: scene_actors table (one row per actor in Scene.actors_data) and an
+index on scenes (project_id, scheduled_date), then fills scene_actors from
+the existing scenes
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from sqlalchemy.orm import selectinload
+from app.config.database import engine, Base, SessionLocal
+from app.models import Scene, SceneActor
+from app.services.schedule_conflict_service import sync_scene_actors
+
+BATCH_SIZE = 500
+
+def migrate_scene_actors():
+    """Create scene_actors and the schedule index, and backfill scene_actors"""
+    print("🚀 Starting Scene Actors Migration...")
+
+    try:
+        Base.metadata.create_all(bind=engine, tables=[SceneActor.__table__])
+        print("✅ scene_actors table is present")
+
+        with engine.connect() as connection:
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_scenes_project_id_scheduled_date "
+                "ON scenes (project_id, scheduled_date)"
+            ))
+            connection.commit()
+        print("✅ scenes (project_id, scheduled_date) index is present")
+
+        db = SessionLocal()
+        try:
+            synced = 0
+            last_id = 0
+            while True:
+                scenes = db.query(Scene).options(selectinload(Scene.actor_links)).filter(
+                    Scene.id > last_id
+                ).order_by(Scene.id).limit(BATCH_SIZE).all()
+                if not scenes:
+                    break
+                for scene in scenes:
+                    sync_scene_actors(scene)
+                last_id = scenes[-1].id
+                synced += len(scenes)
+                db.commit()
+            print(f"✅ Synced actors for {synced} scenes ({db.query(SceneActor).count()} scene_actors rows)")
+        finally:
+            db.close()
+        return True
+
+    except Exception as e:
+        print(f"❌ Error during migration: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    success = migrate_scene_actors()
+    if success:
+        print("\n✨ Migration completed successfully!")
+    else:
+        print("\n⚠️  Migration failed. Please check the errors above.")
+        sys.exit(1)
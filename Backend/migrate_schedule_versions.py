@@ -0,0 +1,35 @@
+"""
+Migration script for schedule versions
+Adds: schedule_versions table (named scheduler outputs that can be compared
+and applied later without recomputing them)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.database import engine, Base
+from app.models import ScheduleVersion
+
+def migrate_schedule_versions():
+    """Create the schedule_versions table"""
+    print("🚀 Starting Schedule Versions Migration...")
+
+    try:
+        Base.metadata.create_all(bind=engine, tables=[ScheduleVersion.__table__])
+        print("✅ schedule_versions table is present")
+        return True
+
+    except Exception as e:
+        print(f"❌ Error during migration: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    success = migrate_schedule_versions()
+    if success:
+        print("\n✨ Migration completed successfully!")
+    else:
+        print("\n⚠️  Migration failed. Please check the errors above.")
+        sys.exit(1)
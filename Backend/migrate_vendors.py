@@ -0,0 +1,82 @@
+"""
+Migration script for the vendor master
+Adds: vendors table and an indexed vendor_id on uploaded_invoices, purchases,
+food_catering and rental_items, then links every existing row to a vendor
+(GSTIN exact match first, then vendor name trigram similarity)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.config.database import engine, Base, SessionLocal
+from app.models import Vendor
+from app.services.vendor_service import LINKED_MODELS, link_vendor
+
+BATCH_SIZE = 500
+
+def migrate_vendors():
+    """Create vendors, add the vendor_id foreign keys and backfill them"""
+    print("🚀 Starting Vendor Master Migration...")
+
+    try:
+        Base.metadata.create_all(bind=engine, tables=[Vendor.__table__])
+        print("✅ vendors table is present")
+
+        with engine.connect() as connection:
+            for model in LINKED_MODELS:
+                table = model.__tablename__
+                has_column = connection.execute(text("""
+                    SELECT 1
+                    FROM information_schema.columns
+                    WHERE table_name = :table AND column_name = 'vendor_id'
+                """), {"table": table}).first()
+                if not has_column:
+                    connection.execute(text(
+                        f"ALTER TABLE {table} ADD COLUMN vendor_id INTEGER REFERENCES vendors(id)"
+                    ))
+                connection.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table}_vendor_id ON {table} (vendor_id)"
+                ))
+            connection.commit()
+        print("✅ vendor_id columns and indexes are present")
+
+        db = SessionLocal()
+        try:
+            for model in LINKED_MODELS:
+                linked = 0
+                last_id = 0
+                # Walk by id so rows whose vendor cannot be resolved are not revisited
+                while True:
+                    records = db.query(model).filter(
+                        model.vendor_id.is_(None),
+                        model.id > last_id
+                    ).order_by(model.id).limit(BATCH_SIZE).all()
+                    if not records:
+                        break
+                    for record in records:
+                        if link_vendor(db, record):
+                            linked += 1
+                    last_id = records[-1].id
+                    db.commit()
+                print(f"✅ Linked {linked} {model.__tablename__} rows to vendors")
+
+            print(f"✅ {db.query(Vendor).count()} vendors in the master")
+        finally:
+            db.close()
+        return True
+
+    except Exception as e:
+        print(f"❌ Error during migration: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    success = migrate_vendors()
+    if success:
+        print("\n✨ Migration completed successfully!")
+    else:
+        print("\n⚠️  Migration failed. Please check the errors above.")
+        sys.exit(1)
@@ -23,7 +23,7 @@ import {
   Meh
 } from 'lucide-react';
 import { apiClient } from '@/services/api/client';
-import { Promotion, VideoAnalytics } from '@/lib/types';
+import { Promotion, PromotionSummary, VideoAnalytics } from '@/lib/types';
 
 interface PromotionsTabProps {
   projectId: string;
@@ -31,21 +31,34 @@ interface PromotionsTabProps {
 }
 
 export default function PromotionsTab({ projectId, projectName }: PromotionsTabProps) {
-  const [promotions, setPromotions] = useState<Promotion[]>([]);
+  const [promotions, setPromotions] = useState<PromotionSummary[]>([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState<number | null>(null);
   const [creating, setCreating] = useState(false);
   const [filmName, setFilmName] = useState(projectName || '');
   const [selectedPromotion, setSelectedPromotion] = useState<Promotion | null>(null);
 
+  // List entries are summaries; videos and sentiment detail are fetched on selection
+  const selectPromotion = async (promotionId: number) => {
+    try {
+      const detail = await apiClient.getPromotion(String(promotionId));
+      setSelectedPromotion(detail);
+    } catch (error) {
+      console.error('Error loading promotion details:', error);
+    }
+  };
+
   const loadPromotions = async () => {
     try {
       setLoading(true);
       const data = await apiClient.getPromotions(projectId);
-      setPromotions(data);
+      setPromotions(data.promotions);
+      setNextCursor(data.next_cursor);
       
       // Auto-select the latest promotion
-      if (data.length > 0) {
-        setSelectedPromotion(data[0]);
+      if (data.promotions.length > 0) {
+        await selectPromotion(data.promotions[0].id);
       }
     } catch (error) {
       console.error('Error loading promotions:', error);
@@ -54,6 +67,21 @@ export default function PromotionsTab({ projectId, projectName }: PromotionsTabP
     }
   };
 
+  // Listings come a page at a time; append the page after the last one shown
+  const loadMorePromotions = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const data = await apiClient.getPromotions(projectId, nextCursor);
+      setPromotions((current) => [...current, ...data.promotions]);
+      setNextCursor(data.next_cursor);
+    } catch (error) {
+      console.error('Error loading more promotions:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     loadPromotions();
     // eslint-disable-next-line react-hooks/exhaustive-deps
@@ -187,7 +215,7 @@ export default function PromotionsTab({ projectId, projectName }: PromotionsTabP
       {promotions.length > 0 && (
         <>
           {/* Promotion Selector */}
-          {promotions.length > 1 && (
+          {(promotions.length > 1 || nextCursor) && (
             <Card className="bg-gray-900/50 border-gray-700">
               <CardHeader>
                 <CardTitle className="text-white text-sm">Analysis History</CardTitle>
@@ -197,7 +225,7 @@ export default function PromotionsTab({ projectId, projectName }: PromotionsTabP
                   {promotions.map((promo) => (
                     <Button
                       key={promo.id}
-                      onClick={() => setSelectedPromotion(promo)}
+                      onClick={() => selectPromotion(promo.id)}
                       variant={selectedPromotion?.id === promo.id ? "default" : "outline"}
                       size="sm"
                       className={
@@ -210,6 +238,18 @@ export default function PromotionsTab({ projectId, projectName }: PromotionsTabP
                       {formatDate(promo.created_at)}
                     </Button>
                   ))}
+                  {nextCursor && (
+                    <Button
+                      onClick={loadMorePromotions}
+                      disabled={loadingMore}
+                      variant="ghost"
+                      size="sm"
+                      className="text-gray-400 hover:text-white"
+                    >
+                      {loadingMore ? <Loader2 className="w-3 h-3 mr-2 animate-spin" /> : null}
+                      Load older
+                    </Button>
+                  )}
                 </div>
               </CardContent>
             </Card>
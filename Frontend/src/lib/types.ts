@@ -163,6 +163,17 @@ export interface SentimentAnalysis {
   total_comments: number;
 }
 
+export interface PromotionSummary {
+  id: number;
+  project_id: number;
+  film: string;
+  total_views: number;
+  total_likes: number;
+  total_comments: number;
+  overall_sentiment?: SentimentAnalysis['overall_sentiment'] | null;
+  created_at: string;
+}
+
 export interface Promotion {
   id: number;
   project_id: number;
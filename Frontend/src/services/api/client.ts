@@ -689,9 +689,18 @@ class ApiClient {
     return this.request<any>(`/api/promotions/${promotionId}`);
   }
 
-  async getPromotions(projectId: string) {
-    const response = await this.request<any>(`/api/promotions/projects/${projectId}`);
-    return response.promotions || [];
+  // Newest first, one page at a time; pass next_cursor back as cursor for the following page
+  async getPromotions(projectId: string, cursor?: number | null) {
+    const params = new URLSearchParams();
+    if (cursor) params.append('cursor', cursor.toString());
+    const query = params.toString();
+    const response = await this.request<any>(
+      `/api/promotions/projects/${projectId}${query ? `?${query}` : ''}`
+    );
+    return {
+      promotions: response.promotions || [],
+      next_cursor: response.next_cursor ?? null,
+    };
   }
 
   // ============= Ticket System Methods =============
@@ -23,6 +23,7 @@ interface Invoice {
   created_at: string;
   ai_confidence_score: number;
   file_path: string;
+  thumbnail_url: string | null;
 }
 
 interface UploadInvoiceResponse {
@@ -112,12 +113,16 @@ export async function getProjectInvoices(
   filters?: {
     status?: string;
     approval_status?: string;
+    limit?: number;
+    cursor?: number | null;
   }
-): Promise<{ invoices: Invoice[]; total_count: number; pending_approval_count: number }> {
+): Promise<{ invoices: Invoice[]; total_count: number; pending_approval_count: number; next_cursor?: number | null }> {
   try {
     const params = new URLSearchParams();
     if (filters?.status) params.append('status', filters.status);
     if (filters?.approval_status) params.append('approval_status', filters.approval_status);
+    if (filters?.limit) params.append('limit', String(filters.limit));
+    if (filters?.cursor) params.append('cursor', String(filters.cursor));
 
     const url = `${API_BASE}/api/invoice/invoices/${projectId}${params.toString() ? '?' + params.toString() : ''}`;
     const response = await fetch(url);
@@ -521,18 +526,24 @@ export function InvoiceUploadForm({ projectId, userId, onSuccess }: {
 export function InvoiceList({ projectId }: { projectId: number }) {
   const [invoices, setInvoices] = React.useState<Invoice[]>([]);
   const [loading, setLoading] = React.useState(true);
+  const [loadingMore, setLoadingMore] = React.useState(false);
+  const [nextCursor, setNextCursor] = React.useState<number | null>(null);
+  const [totalCount, setTotalCount] = React.useState(0);
   const [filter, setFilter] = React.useState<string>('all');
 
   React.useEffect(() => {
     loadInvoices();
   }, [projectId, filter]);
 
+  const filterParams = () => (filter === 'pending' ? { approval_status: 'pending' } : {});
+
   const loadInvoices = async () => {
     setLoading(true);
     try {
-      const filterParams = filter === 'pending' ? { approval_status: 'pending' } : undefined;
-      const data = await getProjectInvoices(projectId, filterParams);
+      const data = await getProjectInvoices(projectId, filterParams());
       setInvoices(data.invoices);
+      setNextCursor(data.next_cursor ?? null);
+      setTotalCount(data.total_count);
     } catch (error) {
       console.error('Failed to load invoices:', error);
     } finally {
@@ -540,6 +551,21 @@ export function InvoiceList({ projectId }: { projectId: number }) {
     }
   };
 
+  // Listings are paged (newest first); fetch the page after the last one shown
+  const loadMoreInvoices = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const data = await getProjectInvoices(projectId, { ...filterParams(), cursor: nextCursor });
+      setInvoices((current) => [...current, ...data.invoices]);
+      setNextCursor(data.next_cursor ?? null);
+    } catch (error) {
+      console.error('Failed to load more invoices:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (loading) return (
     <div className="flex items-center justify-center py-8">
       <div className="flex items-center gap-3 text-accent-secondary">
@@ -579,6 +605,18 @@ export function InvoiceList({ projectId }: { projectId: number }) {
           <InvoiceCard key={invoice.id} invoice={invoice} onUpdate={loadInvoices} />
         ))}
       </div>
+
+      {nextCursor && (
+        <div className="mt-4 flex justify-center">
+          <button
+            onClick={loadMoreInvoices}
+            disabled={loadingMore}
+            className="px-4 py-2 rounded-lg font-medium transition-all duration-300 bg-secondary-bg/60 text-text-secondary hover:bg-accent-brown/20 hover:text-accent-secondary disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : `Load more (${invoices.length} of ${totalCount})`}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -606,7 +644,15 @@ function InvoiceCard({ invoice, onUpdate }: { invoice: Invoice; onUpdate: () =>
   return (
     <div className="border border-accent-brown/30 rounded-lg p-5 hover:shadow-xl transition-all duration-300 hover:scale-[1.01] bg-gradient-to-br from-secondary-bg/80 to-primary-bg/60">
       {/* Header Section */}
-      <div className="flex justify-between items-start mb-4">
+      <div className="flex justify-between items-start mb-4 gap-4">
+        {invoice.thumbnail_url && (
+          <img
+            src={`${API_BASE}${invoice.thumbnail_url}?size=128`}
+            alt={invoice.invoice_number}
+            loading="lazy"
+            className="w-16 h-20 object-cover rounded border border-accent-brown/30"
+          />
+        )}
         <div className="flex-1">
           <div className="flex items-center gap-2 mb-1">
             <h3 className="font-bold text-lg text-accent-primary">{invoice.invoice_number}</h3>